@@ -0,0 +1,324 @@
+"""
+Асинхронные представления для горячих эндпоинтов чтения.
+
+Работают на асинхронном ORM Django под ASGI-сервером и подключаются
+настройкой ASYNC_READ_VIEWS. GET-запросы, которые асинхронный путь не
+обслуживает сам (запись, ошибки валидации, неверный токен, превышение
+лимита), передаются синхронным вьюсетам, поэтому ответы совпадают с DRF.
+"""
+import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.filters import COOKING_TIME_BUCKETS
+from recipes.models import Ingredient, Recipe, Tag
+from .authentication import cache_token, get_cached_token
+from .cache import cache_response, get_cached_response, response_cache_key
+from .fast_read import INGREDIENT_FIELDS, TAG_FIELDS
+from .fieldsets import only_fields, parse_fieldset
+from .pagination import Pagination
+from .renderers import FastJSONRenderer
+from .serializers import RecipeReadSerializer, represent_recipes
+from .views import (
+    CachedListMixin,
+    IngredientViewSet,
+    RecipeViewSet,
+    TagViewSet,
+)
+
+User = get_user_model()
+
+# Параметры списка рецептов, которые асинхронный путь разбирает сам
+RECIPE_LIST_PARAMS = {
+    'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'cooking_time',
+    'page', Pagination.page_size_query_param, 'fields', 'omit',
+}
+
+
+def _json_response(data, status=200):
+    response = HttpResponse(
+        FastJSONRenderer().render(data),
+        content_type='application/json',
+        status=status
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+def _not_found(model):
+    return _json_response(
+        {'detail': f'No {model._meta.object_name} matches the given query.'},
+        status=404
+    )
+
+
+def _positive_int(value, cutoff=None):
+    value = int(value)
+    if value <= 0:
+        raise ValueError
+    return min(value, cutoff) if cutoff else value
+
+
+async def _authenticate(request):
+    """Аналог TokenAuthentication. None — пусть разбирается DRF."""
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if not auth or auth[0].lower() != 'token':
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    token = await sync_to_async(get_cached_token)(auth[1])
+    if token is not None:
+        return copy.copy(token.user)
+    token = await Token.objects.select_related('user').filter(
+        key=auth[1]
+    ).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    await sync_to_async(cache_token)(token)
+    return token.user
+
+
+def _allow_request(request, viewset, action):
+    """Лимиты запросов вьюсета, как в APIView.check_throttles."""
+    view = viewset(action=action, request=request)
+    return all(
+        throttle.allow_request(request, view)
+        for throttle in view.get_throttles()
+    )
+
+
+def _list_cache_key(request, viewset):
+    """Ключ ответа в кэше, как в CachedListMixin, или None."""
+    if (
+        not issubclass(viewset, CachedListMixin)
+        or not settings.RESPONSE_CACHE_TIMEOUT
+        or viewset.cache_anonymous_only and request.user.is_authenticated
+    ):
+        return None
+    return response_cache_key(request, viewset.response_version_key)
+
+
+def read_view(handler, viewset, actions):
+    """
+    Отдаёт GET асинхронному handler, остальное — синхронному вьюсету.
+
+    Как и вьюсет, GET сначала проходит его лимиты запросов, а ответы
+    списков берутся из кэша ответов и сохраняются в него. Обращения к
+    кэшу блокирующие и идут в потоке, а не в цикле событий.
+    """
+    fallback = sync_to_async(viewset.as_view(actions))
+    # GET, уже учтённый лимитами, не списывается с корзины второй раз
+    counted_fallback = sync_to_async(
+        viewset.as_view(actions, throttle_classes=())
+    )
+    action = actions['get']
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await fallback(request, *args, **kwargs)
+        user = await _authenticate(request)
+        # Неверный токен и превышение лимита отвечает вьюсет
+        if user is None:
+            return await fallback(request, *args, **kwargs)
+        request.user = user
+        if not await sync_to_async(_allow_request)(
+            request, viewset, action
+        ):
+            return await fallback(request, *args, **kwargs)
+        key = None
+        if action == 'list':
+            key = await sync_to_async(_list_cache_key)(request, viewset)
+        if key is not None:
+            cached = await sync_to_async(get_cached_response)(key)
+            if cached is not None:
+                return cached
+        response = await handler(request, *args, **kwargs)
+        if response is None:
+            return await counted_fallback(request, *args, **kwargs)
+        if key is not None and response.status_code == 200:
+            await sync_to_async(cache_response)(key, response)
+        return response
+
+    # csrf_exempt в Django 4.2 не умеет оборачивать корутины.
+    view.csrf_exempt = True
+    return view
+
+
+def _recipe_fieldset(request):
+    """Поля из ?fields= и ?omit=; ошибки разбирает синхронный вьюсет."""
+    try:
+        return True, parse_fieldset(
+            request.GET, RecipeReadSerializer.Meta.fields
+        )
+    except ValidationError:
+        return False, None
+
+
+def _project(recipes, fields):
+    if fields is None:
+        return recipes
+    if 'author' not in fields:
+        recipes = recipes.select_related(None)
+    return only_fields(recipes, fields)
+
+
+async def _recipe_queryset(request, user, fields):
+    params = request.GET
+    # Остальные параметры, в том числе новые фильтры RecipeFilter,
+    # разбирает синхронный вьюсет
+    if not params.keys() <= RECIPE_LIST_PARAMS:
+        return None
+    recipes = _project(Recipe.objects.select_related('author'), fields)
+    if 'author' in params:
+        try:
+            author_id = int(params['author'])
+        except ValueError:
+            return None
+        if not await User.objects.filter(pk=author_id).aexists():
+            return None
+        recipes = recipes.filter(author_id=author_id)
+    slugs = set(params.getlist('tags'))
+    if slugs:
+        if await Tag.objects.filter(slug__in=slugs).acount() != len(slugs):
+            return None
+        recipes = recipes.filter(tags__slug__in=slugs).distinct()
+    cooking_time = params.get('cooking_time')
+    if cooking_time:
+        if cooking_time not in COOKING_TIME_BUCKETS:
+            return None
+        recipes = recipes.filter(COOKING_TIME_BUCKETS[cooking_time])
+    for param, lookup in (
+        ('is_favorited', 'favorites__owner'),
+        ('is_in_shopping_cart', 'shopping_carts__owner'),
+    ):
+        if param not in params:
+            continue
+        try:
+            value = float(params[param])
+        except ValueError:
+            return None
+        if user.is_anonymous:
+            return recipes.none()
+        if value:
+            recipes = recipes.filter(**{lookup: user})
+    return recipes
+
+
+async def recipe_list(request):
+    valid, fields = _recipe_fieldset(request)
+    if not valid:
+        return None
+    recipes = await _recipe_queryset(request, request.user, fields)
+    if recipes is None:
+        return None
+    page_size = Pagination.page_size
+    try:
+        page_size = _positive_int(
+            request.GET[Pagination.page_size_query_param],
+            cutoff=Pagination.max_page_size
+        )
+    except (KeyError, ValueError):
+        pass
+    try:
+        page = _positive_int(request.GET.get('page', 1))
+    except ValueError:
+        return None
+    count = await recipes.acount()
+    num_pages = max(1, -(-count // page_size))
+    if page > num_pages:
+        return None
+    offset = (page - 1) * page_size
+    results = [
+        recipe async for recipe in recipes[offset:offset + page_size]
+    ]
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = (
+            remove_query_param(url, 'page') if page == 2
+            else replace_query_param(url, 'page', page - 1)
+        )
+    return _json_response({
+        'count': count,
+        'next': (
+            replace_query_param(url, 'page', page + 1)
+            if page < num_pages else None
+        ),
+        'previous': previous,
+        'results': await sync_to_async(represent_recipes)(
+            results, {'request': request, 'fields': fields}
+        ),
+    })
+
+
+async def recipe_detail(request, pk):
+    valid, fields = _recipe_fieldset(request)
+    if not valid:
+        return None
+    recipe = await _project(
+        Recipe.objects.select_related('author'), fields
+    ).filter(pk=pk).afirst()
+    if recipe is None:
+        return _not_found(Recipe)
+    return _json_response(
+        (await sync_to_async(represent_recipes)(
+            [recipe], {'request': request, 'fields': fields}
+        ))[0]
+    )
+
+
+async def tag_list(request):
+    return _json_response(
+        [row async for row in Tag.objects.values(*TAG_FIELDS)]
+    )
+
+
+async def tag_detail(request, pk):
+    row = await Tag.objects.filter(pk=pk).values(*TAG_FIELDS).afirst()
+    return _not_found(Tag) if row is None else _json_response(row)
+
+
+async def ingredient_list(request):
+    ingredients = Ingredient.objects.all()
+    if request.GET.get('name'):
+        ingredients = ingredients.filter(
+            name__istartswith=request.GET['name']
+        )
+    return _json_response(
+        [row async for row in ingredients.values(*INGREDIENT_FIELDS)]
+    )
+
+
+async def ingredient_detail(request, pk):
+    row = await Ingredient.objects.filter(pk=pk).values(
+        *INGREDIENT_FIELDS
+    ).afirst()
+    return _not_found(Ingredient) if row is None else _json_response(row)
+
+
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+recipe_list_view = read_view(
+    recipe_list, RecipeViewSet, {'get': 'list', 'post': 'create'}
+)
+recipe_detail_view = read_view(recipe_detail, RecipeViewSet, DETAIL_ACTIONS)
+tag_list_view = read_view(tag_list, TagViewSet, {'get': 'list'})
+tag_detail_view = read_view(tag_detail, TagViewSet, {'get': 'retrieve'})
+ingredient_list_view = read_view(
+    ingredient_list, IngredientViewSet, {'get': 'list'}
+)
+ingredient_detail_view = read_view(
+    ingredient_detail, IngredientViewSet, {'get': 'retrieve'}
+)
@@ -0,0 +1,98 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+
+class LRUCache:
+    """Ограниченный по размеру потокобезопасный кэш с временем жизни."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+tokens = LRUCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def _shared_key(key):
+    # Сами токены в ключи общего кэша не попадают
+    return f'auth-token:{sha256(key.encode()).hexdigest()}'
+
+
+def get_cached_token(key):
+    """Токен с пользователем из кэша процесса или общего кэша."""
+    token = tokens.get(key)
+    if token is None and settings.TOKEN_CACHE_SHARED:
+        token = cache.get(_shared_key(key))
+        if token is not None:
+            tokens.set(key, token)
+    return token
+
+
+def cache_token(token):
+    tokens.set(token.key, token)
+    if settings.TOKEN_CACHE_SHARED:
+        cache.set(_shared_key(token.key), token, settings.TOKEN_CACHE_TTL)
+
+
+def forget_token(key):
+    """
+    Удаляет токен из кэша этого процесса и общего кэша.
+
+    В кэшах других процессов токен живёт не дольше TOKEN_CACHE_TTL.
+    """
+    tokens.delete(key)
+    if settings.TOKEN_CACHE_SHARED:
+        cache.delete(_shared_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к БД на каждый вызов API.
+
+    Пара токен-пользователь кэшируется на TOKEN_CACHE_TTL секунд и
+    сбрасывается сигналами при выходе, смене пароля и блокировке.
+    """
+
+    def authenticate_credentials(self, key):
+        token = get_cached_token(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache_token(token)
+        # Копия, чтобы запросы в разных потоках не делили объект
+        return copy.copy(token.user), token
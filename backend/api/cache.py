@@ -0,0 +1,188 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .compression import compress_variants
+
+GLOBAL_VERSION_KEY = 'recipe-fragment:version'
+RECIPE_LIST_VERSION_KEY = 'recipe-list:version'
+
+
+def _version_key(recipe_id):
+    return f'recipe-fragment:version:{recipe_id}'
+
+
+def _fragment_key(recipe_id, version, global_version, base_url, fields):
+    return (
+        f'recipe-fragment:{global_version}:{recipe_id}:{version}:'
+        f'{",".join(fields or ())}:{base_url}'
+    )
+
+
+def _new_version():
+    # Версия из времени, а не с единицы: если ключ версии вытеснен из кэша,
+    # новая версия не совпадёт со старыми фрагментами.
+    return time.time_ns()
+
+
+_pending = threading.local()
+
+
+def bump_recipe_versions(recipe_ids):
+    """
+    Делает недействительными фрагменты указанных рецептов после коммита.
+
+    До коммита другие запросы ещё читают старые строки и сохранили бы их
+    под новой версией. Рецепты за одну транзакцию сбрасываются вместе.
+    """
+    pending = getattr(_pending, 'recipe_ids', None)
+    if pending is None:
+        pending = _pending.recipe_ids = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(_bump_pending)
+
+
+def _bump_pending():
+    recipe_ids = getattr(_pending, 'recipe_ids', None)
+    if not recipe_ids:
+        return
+    _pending.recipe_ids = set()
+    for recipe_id in recipe_ids:
+        try:
+            cache.incr(_version_key(recipe_id))
+        except ValueError:
+            cache.set(_version_key(recipe_id), _new_version(), None)
+    cache.set(RECIPE_LIST_VERSION_KEY, _new_version(), None)
+
+
+def bump_global_version():
+    """Делает недействительными фрагменты всех рецептов после коммита."""
+    transaction.on_commit(_bump_global)
+
+
+def _bump_global():
+    cache.set_many(
+        {
+            GLOBAL_VERSION_KEY: _new_version(),
+            RECIPE_LIST_VERSION_KEY: _new_version(),
+        },
+        None
+    )
+
+
+def _get_versions(recipe_ids):
+    keys = {_version_key(recipe_id): recipe_id for recipe_id in recipe_ids}
+    keys[GLOBAL_VERSION_KEY] = None
+    found = cache.get_many(keys)
+    missing = {
+        key: _new_version() for key in keys if key not in found
+    }
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    global_version = found.pop(GLOBAL_VERSION_KEY)
+    return global_version, {
+        keys[key]: version for key, version in found.items()
+    }
+
+
+def get_fragments(recipes, base_url, build, fields=None):
+    """
+    Возвращает независимые от пользователя фрагменты рецептов.
+
+    Фрагменты хранятся в кэше уже закодированными в JSON, отдельно для
+    каждого набора полей fields. Промахи сериализуются одним вызовом
+    build(recipes) в порядке рецептов и сохраняются.
+    """
+    if not settings.RECIPE_FRAGMENT_CACHE_TIMEOUT:
+        return build(recipes)
+    global_version, versions = _get_versions(
+        [recipe.id for recipe in recipes]
+    )
+    keys = {
+        recipe.id: _fragment_key(
+            recipe.id, versions[recipe.id], global_version, base_url, fields
+        )
+        for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {
+        recipe_id: json.loads(cached[key])
+        for recipe_id, key in keys.items() if key in cached
+    }
+    missing = [recipe for recipe in recipes if recipe.id not in fragments]
+    if missing:
+        # build возвращает фрагменты в порядке missing, id в них может
+        # не быть из-за выбора полей
+        built = dict(zip(
+            (recipe.id for recipe in missing), build(missing)
+        ))
+        cache.set_many(
+            {
+                keys[recipe_id]: json.dumps(
+                    fragment, cls=DjangoJSONEncoder, ensure_ascii=False
+                )
+                for recipe_id, fragment in built.items()
+            },
+            settings.RECIPE_FRAGMENT_CACHE_TIMEOUT
+        )
+        fragments.update(built)
+    return [fragments[recipe.id] for recipe in recipes]
+
+
+def response_cache_key(request, version_key):
+    """
+    Ключ готового ответа на запрос.
+
+    Версия читается до выполнения запроса: ответ, собранный во время
+    изменения данных, попадёт под старую версию и читаться не будет.
+    """
+    version = cache.get_or_set(version_key, _new_version, None)
+    url = hashlib.sha256(
+        request.build_absolute_uri().encode()
+    ).hexdigest()
+    return f'response:{version_key}:{version}:{url}'
+
+
+def facets_cache_key(signature):
+    """Ключ счётчиков фасетов для набора фильтров signature."""
+    version = cache.get_or_set(RECIPE_LIST_VERSION_KEY, _new_version, None)
+    digest = hashlib.sha256(
+        json.dumps(signature, sort_keys=True).encode()
+    ).hexdigest()
+    return f'recipe-facets:{version}:{digest}'
+
+
+def get_cached_response(key):
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    response = HttpResponse(cached['content'])
+    for header, value in cached['headers']:
+        response[header] = value
+    response.compressed = cached['compressed']
+    return response
+
+
+def cache_response(key, response):
+    """Сохраняет ответ вместе со сжатыми вариантами содержимого."""
+    response.compressed = compress_variants(response.content)
+    cache.set(
+        key,
+        {
+            'content': response.content,
+            'headers': [
+                (header, value) for header, value in response.items()
+                if header != 'Content-Length'
+            ],
+            'compressed': response.compressed,
+        },
+        settings.RESPONSE_CACHE_TIMEOUT
+    )
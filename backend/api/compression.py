@@ -0,0 +1,157 @@
+import gzip
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from .metrics import track
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Только JSON API: HTML со страницами админки несёт CSRF-токен, и его
+# сжатие вместе с отражённым вводом открывает атаку BREACH
+COMPRESSIBLE_TYPES = ('application/json',)
+# На каждый ответ — быстрые уровни, для ответов из кэша, которые
+# сжимаются один раз, — максимальные
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STORED_GZIP_LEVEL = 9
+STORED_BROTLI_QUALITY = 11
+
+
+def available_encodings():
+    """Поддерживаемые сжатия в порядке предпочтения сервера."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encoding(request):
+    """Сжатие с наибольшим q из Accept-Encoding или None."""
+    accepted = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = item.partition(';')
+        params = params.strip()
+        quality = 1.0
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding, stored=False):
+    if encoding == 'br':
+        return brotli.compress(
+            content,
+            quality=STORED_BROTLI_QUALITY if stored else BROTLI_QUALITY
+        )
+    # mtime=0 делает результат одинаковым для одинакового содержимого
+    return gzip.compress(
+        content,
+        compresslevel=STORED_GZIP_LEVEL if stored else GZIP_LEVEL,
+        mtime=0
+    )
+
+
+def compress_variants(content):
+    """Сжатые варианты содержимого для хранения в кэше."""
+    if len(content) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    with track('compress'):
+        return {
+            encoding: compress(content, encoding, stored=True)
+            for encoding in available_encodings()
+        }
+
+
+def compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(
+            GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(request, response):
+    if (
+        response.has_header('Content-Encoding')
+        or not response.get('Content-Type', '').startswith(
+            COMPRESSIBLE_TYPES
+        )
+    ):
+        return response
+    if response.streaming:
+        if getattr(response, 'is_async', False):
+            return response
+    elif len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = accepted_encoding(request)
+    if encoding is None:
+        return response
+    if response.streaming:
+        response.streaming_content = compress_stream(
+            response.streaming_content, encoding
+        )
+        del response['Content-Length']
+    else:
+        # Ответы из кэша приходят с уже сжатыми вариантами
+        content = getattr(response, 'compressed', {}).get(encoding)
+        if content is None:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    return response
+
+
+class CompressionMiddleware:
+    """
+    Сжимает JSON-ответы API в br или gzip по Accept-Encoding.
+
+    Потоковые ответы сжимаются по мере отдачи.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.API_COMPRESSION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        with track('compress'):
+            return compress_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        with track('compress'):
+            return compress_response(request, response)
@@ -0,0 +1,132 @@
+"""
+Счётчики фасетов для фильтра рецептов.
+
+Фасеты тегов и времени приготовления считаются без собственного
+условия: теги фильтруются по «любому из», и счётчик тега показывает,
+сколько рецептов добавит его выбор. Остальные фильтры применяются как
+в списке. Все счётчики — один запрос с условной агрегацией, часть,
+не зависящая от пользователя, кэшируется по набору фильтров до смены
+версии списка рецептов.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from django_filters.utils import translate_validation
+
+from recipes.filters import COOKING_TIME_BUCKETS, COOKING_TIME_CHOICES
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from .cache import facets_cache_key
+from .filters import RecipeFilter
+
+# Фильтры, по которым строятся фасеты
+FACET_FILTERS = ('tags', 'cooking_time')
+# Фильтры, с которыми результат зависит от пользователя
+USER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def _in_relation(model, user):
+    return Q(Exists(
+        model.objects.filter(owner=user, recipe_id=OuterRef('pk'))
+    ))
+
+
+def _count(condition, distinct=True):
+    return Count('pk', filter=condition, distinct=distinct)
+
+
+def _user_aggregates(user, selected):
+    return {
+        'is_favorited': _count(_in_relation(Favorite, user) & selected),
+        'is_in_shopping_cart': _count(
+            _in_relation(ShoppingCart, user) & selected
+        ),
+    }
+
+
+def recipe_facets(request):
+    """
+    Счётчики рецептов по тегам, времени приготовления, избранному и
+    корзине для фильтров из параметров запроса.
+    """
+    params = request.query_params
+    filterset = RecipeFilter(
+        params, queryset=Recipe.objects.all(), request=request
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    data = filterset.form.cleaned_data
+    tag_ids = sorted(tag.id for tag in data.get('tags') or ())
+    cooking_time = data.get('cooking_time') or None
+    base = params.copy()
+    for name in FACET_FILTERS:
+        base.pop(name, None)
+    recipes = RecipeFilter(
+        base, queryset=Recipe.objects.all(), request=request
+    ).qs
+    tags_selected = Q(Exists(
+        Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+        )
+    )) if tag_ids else Q()
+    time_selected = (
+        COOKING_TIME_BUCKETS[cooking_time] if cooking_time else Q()
+    )
+    selected = tags_selected & time_selected
+    user = request.user if request.user.is_authenticated else None
+
+    key = None
+    if settings.RESPONSE_CACHE_TIMEOUT and not any(
+        name in params for name in USER_FILTERS
+    ):
+        author = data.get('author')
+        key = facets_cache_key({
+            'author': author.pk if author else None,
+            'tags': tag_ids,
+            'cooking_time': cooking_time,
+        })
+        shared = cache.get(key)
+        if shared is not None:
+            if user is None:
+                return {
+                    **shared, 'is_favorited': 0, 'is_in_shopping_cart': 0
+                }
+            return {**shared, **recipes.aggregate(
+                **_user_aggregates(user, selected)
+            )}
+
+    tags = list(Tag.objects.values('id', 'name', 'slug'))
+    aggregates = {'count': _count(selected)}
+    # Строки рецепта размножаются по его тегам, поэтому остальные
+    # счётчики считают различные рецепты
+    for tag in tags:
+        aggregates[f'tag_{tag["id"]}'] = _count(
+            Q(tags__id=tag['id']) & time_selected, distinct=False
+        )
+    for value, _ in COOKING_TIME_CHOICES:
+        aggregates[f'cooking_time_{value}'] = _count(
+            COOKING_TIME_BUCKETS[value] & tags_selected
+        )
+    if user is not None:
+        aggregates.update(_user_aggregates(user, selected))
+    counts = recipes.aggregate(**aggregates)
+    shared = {
+        'count': counts['count'],
+        'tags': [
+            {**tag, 'count': counts[f'tag_{tag["id"]}']} for tag in tags
+        ],
+        'cooking_time': [
+            {
+                'value': value,
+                'name': name,
+                'count': counts[f'cooking_time_{value}'],
+            }
+            for value, name in COOKING_TIME_CHOICES
+        ],
+    }
+    if key is not None:
+        cache.set(key, shared, settings.RESPONSE_CACHE_TIMEOUT)
+    return {
+        **shared,
+        'is_favorited': counts.get('is_favorited', 0),
+        'is_in_shopping_cart': counts.get('is_in_shopping_cart', 0),
+    }
@@ -0,0 +1,92 @@
+"""
+Быстрое чтение без полей ModelSerializer.
+
+Словари строятся прямо из строк .values() и совпадают с выводом
+IngredientSerializer, TagSerializer и RecipeReadSerializer.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from recipes.models import Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+TAG_FIELDS = ('id', 'name', 'slug')
+AUTHOR_FIELDS = ('first_name', 'last_name', 'username', 'id', 'email')
+RECIPE_FIELDS = (
+    'id', 'tags', 'author', 'ingredients', 'is_favorited',
+    'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+)
+
+
+def _file_url(model, field_name, name, request):
+    if not name:
+        return None
+    url = model._meta.get_field(field_name).storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def build_recipe_fragments(recipes, request, fields=None):
+    """
+    Фрагменты рецептов без флагов пользователя, как у represent_recipes.
+
+    Связанные данные, не попавшие в fields, не запрашиваются.
+    """
+    fields = fields or RECIPE_FIELDS
+    recipe_ids = [recipe.id for recipe in recipes]
+    tags = defaultdict(list)
+    if 'tags' in fields:
+        for row in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by(
+            *(f'tag__{field}' for field in Tag._meta.ordering)
+        ).values('recipe_id', *(f'tag__{field}' for field in TAG_FIELDS)):
+            tags[row['recipe_id']].append(
+                {field: row[f'tag__{field}'] for field in TAG_FIELDS}
+            )
+    ingredients = defaultdict(list)
+    if 'ingredients' in fields:
+        for row in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('pk').values(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        ):
+            ingredients[row['recipe_id']].append({
+                'id': row['ingredient_id'],
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            })
+    authors = {}
+    if 'author' in fields:
+        authors = {
+            row['id']: {
+                **{field: row[field] for field in AUTHOR_FIELDS},
+                'is_subscribed': False,
+                'avatar': _file_url(User, 'avatar', row['avatar'], request),
+            }
+            for row in User.objects.filter(
+                pk__in={recipe.author_id for recipe in recipes}
+            ).values(*AUTHOR_FIELDS, 'avatar')
+        }
+    values = {
+        'id': lambda recipe: recipe.id,
+        'tags': lambda recipe: tags[recipe.id],
+        'author': lambda recipe: authors.get(recipe.author_id),
+        'ingredients': lambda recipe: ingredients[recipe.id],
+        'is_favorited': lambda recipe: False,
+        'is_in_shopping_cart': lambda recipe: False,
+        'name': lambda recipe: recipe.name,
+        'image': lambda recipe: _file_url(
+            Recipe, 'image', recipe.image.name, request
+        ),
+        'text': lambda recipe: recipe.text,
+        'cooking_time': lambda recipe: recipe.cooking_time,
+    }
+    return [
+        {field: values[field](recipe) for field in fields}
+        for recipe in recipes
+    ]
@@ -0,0 +1,66 @@
+"""
+Выборочные поля ответа: параметры ?fields= и ?omit=.
+
+Набор полей сужает и вывод сериализатора, и выборку из БД.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def parse_fieldset(params, available):
+    """
+    Поля ответа в порядке available или None, если параметров нет.
+
+    Неизвестные имена полей — ошибка валидации.
+    """
+    if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+        return None
+    fields = _split(params.get(FIELDS_PARAM, ''))
+    omit = _split(params.get(OMIT_PARAM, ''))
+    unknown = (fields | omit) - set(available)
+    if unknown:
+        raise serializers.ValidationError({
+            FIELDS_PARAM: f'Неизвестные поля: {", ".join(sorted(unknown))}'
+        })
+    return tuple(
+        name for name in available
+        if (not fields or name in fields) and name not in omit
+    )
+
+
+def only_fields(queryset, fields):
+    """Загружает только первичный ключ и столбцы полей fields."""
+    model = queryset.model
+    columns = [model._meta.pk.name]
+    for name in fields:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.many_to_many:
+            columns.append(name)
+    return queryset.only(*columns)
+
+
+class FieldsetSerializerMixin:
+    """Оставляет в корневом сериализаторе только поля context['fields']."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        parent = getattr(self, 'parent', None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if selected is None or parent is not None:
+            return fields
+        return {
+            name: field for name, field in fields.items()
+            if name in selected
+        }
@@ -1,10 +1,12 @@
 from django_filters import (
+    ChoiceFilter,
     FilterSet,
     ModelMultipleChoiceFilter,
     NumberFilter,
     CharFilter,
 )
 
+from recipes.filters import COOKING_TIME_BUCKETS, COOKING_TIME_CHOICES
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -19,7 +21,10 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    """Фильтр для рецептов по автору, тегам, наличию в корзине и избранному."""
+    """
+    Фильтр для рецептов по автору, тегам, времени приготовления,
+    наличию в корзине и избранному.
+    """
 
     tags = ModelMultipleChoiceFilter(
         field_name='tags__slug',
@@ -32,6 +37,10 @@ class RecipeFilter(FilterSet):
     is_favorited = NumberFilter(
         method='filter_is_favorited'
     )
+    cooking_time = ChoiceFilter(
+        choices=COOKING_TIME_CHOICES,
+        method='filter_cooking_time'
+    )
 
     class Meta:
         model = Recipe
@@ -54,3 +63,6 @@ class RecipeFilter(FilterSet):
                 favorites__owner=self.request.user
             )
         return recipe
+
+    def filter_cooking_time(self, recipe, name, value):
+        return recipe.filter(COOKING_TIME_BUCKETS[value])
@@ -0,0 +1,90 @@
+import json
+from functools import wraps
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+MAX_KEY_LENGTH = 255
+# Сколько держать блокировку, если обработчик упал, не сняв её
+LOCK_TIMEOUT = 30
+
+
+def _cache_key(request, key):
+    digest = sha256(
+        f'{request.user.pk}:{request.method}:{request.path}:{key}'.encode()
+    ).hexdigest()
+    return f'idempotency:{digest}'
+
+
+def _payload_digest(request):
+    """Отпечаток параметров и тела запроса."""
+    data = request.data
+    if isinstance(data, QueryDict):
+        data = dict(data.lists())
+    return sha256(
+        json.dumps(
+            [dict(request.query_params.lists()), data],
+            sort_keys=True, default=str
+        ).encode()
+    ).hexdigest()
+
+
+def idempotent(view):
+    """
+    Поддержка заголовка Idempotency-Key для действий вьюсета.
+
+    Успешный ответ сохраняется в кэше, и повтор запроса с тем же ключом
+    и телом получает его без повторного выполнения. Пока первый запрос не
+    завершён, повтор получает 409, а тот же ключ с другим телом — 422.
+    Ответы хранятся в общем кэше CACHES, без него заголовок не учитывается
+    (IDEMPOTENCY_KEY_TIMEOUT = 0).
+    """
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if (
+            not key or not request.user.is_authenticated
+            or not settings.IDEMPOTENCY_KEY_TIMEOUT
+        ):
+            return view(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({
+                'error': f'Idempotency-Key длиннее {MAX_KEY_LENGTH} символов'
+            })
+        cache_key = _cache_key(request, key)
+        digest = _payload_digest(request)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            stored_digest, data, status_code = stored
+            if stored_digest != digest:
+                return Response(
+                    {'error': 'Idempotency-Key уже использован для запроса '
+                              'с другим телом'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            response = Response(data, status=status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, True, LOCK_TIMEOUT):
+            return Response(
+                {'error': 'Запрос с этим Idempotency-Key ещё выполняется'},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            response = view(self, request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                cache.set(
+                    cache_key, (digest, response.data, response.status_code),
+                    settings.IDEMPOTENCY_KEY_TIMEOUT
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
@@ -0,0 +1,76 @@
+"""
+Отдача файлов из MEDIA_ROOT.
+
+Закрытые файлы: Django только проверяет доступ, а сам файл отдаёт nginx
+из internal-локации MEDIA_ACCEL_PREFIX по заголовку X-Accel-Redirect.
+"""
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header
+
+from recipes.uploads import UNIQUE_NAME
+
+# Каталоги, файлы из которых видны всем: фото рецептов и аватары
+PUBLIC_DIRS = ('recipes/images/', 'users/')
+# Файл со случайным именем из UniqueUploadTo никогда не меняется
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Старые имена вроде image.png хранилище могло отдать другому файлу,
+# их кэш перепроверяется
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+
+def media_response(name, filename=None, cache_control=None):
+    """
+    Ответ с файлом name из хранилища.
+
+    Без MEDIA_ACCEL_REDIRECT (разработка без nginx) файл отдаёт Django.
+    С filename файл отдаётся как вложение.
+    """
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(
+            content_type=(
+                mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            )
+        )
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(name)
+        )
+        if filename is not None:
+            response['Content-Disposition'] = content_disposition_header(
+                True, filename
+            )
+    else:
+        response = FileResponse(
+            default_storage.open(name, 'rb'),
+            as_attachment=filename is not None,
+            filename=filename
+        )
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def serve_media(request, path):
+    """
+    Публичные файлы из MEDIA_ROOT; в продакшене их отдаёт nginx напрямую.
+    """
+    name = posixpath.normpath(path)
+    if (
+        name != path
+        or not name.startswith(PUBLIC_DIRS)
+        or not default_storage.exists(name)
+    ):
+        raise Http404
+    return media_response(
+        name,
+        cache_control=(
+            IMMUTABLE_CACHE_CONTROL
+            if UNIQUE_NAME.fullmatch(posixpath.basename(name))
+            else REVALIDATE_CACHE_CONTROL
+        )
+    )
@@ -0,0 +1,123 @@
+"""
+Метрики производительности запросов.
+
+Гистограммы копятся в памяти процесса по маршрутам и отдаются
+в текстовом формате Prometheus.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+METRICS = {
+    'foodgram_request_duration_seconds': (
+        'Полное время обработки запроса', DURATION_BUCKETS
+    ),
+    'foodgram_request_db_seconds': (
+        'Время запросов к БД', DURATION_BUCKETS
+    ),
+    'foodgram_request_serializer_seconds': (
+        'Время сериализации', DURATION_BUCKETS
+    ),
+    'foodgram_request_db_queries': (
+        'Количество запросов к БД', QUERY_BUCKETS
+    ),
+    'foodgram_response_size_bytes': (
+        'Размер тела ответа', SIZE_BUCKETS
+    ),
+}
+
+_timings = ContextVar('timings', default=None)
+
+
+def start_timings():
+    """Начинает сбор таймингов текущего запроса."""
+    timings = {}
+    return timings, _timings.set(timings)
+
+
+def stop_timings(token):
+    _timings.reset(token)
+
+
+@contextmanager
+def track(name):
+    """Добавляет время выполнения блока к таймингу name."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (
+            timings.get(name, 0.0) + time.perf_counter() - start
+        )
+
+
+class Histogram:
+    """Кумулятивная гистограмма Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Registry:
+    """Гистограммы по метрикам и меткам (метод, маршрут)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in METRICS}
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            histograms = self._histograms[name]
+            if labels not in histograms:
+                histograms[labels] = Histogram(METRICS[name][1])
+            histograms[labels].observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, histograms in self._histograms.items():
+                lines.append(f'# HELP {name} {METRICS[name][0]}')
+                lines.append(f'# TYPE {name} histogram')
+                for (method, route), histogram in sorted(
+                    histograms.items()
+                ):
+                    labels = f'method="{method}",route="{route}"'
+                    for bound, count in zip(
+                        histogram.buckets, histogram.counts
+                    ):
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+                        )
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="+Inf"}} '
+                        f'{histogram.count}'
+                    )
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{labels}}} {histogram.count}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.db import connections
+
+from .metrics import registry, start_timings, stop_timings
+
+logger = logging.getLogger('api.performance')
+
+
+def _db_stats():
+    """Счётчики запросов к БД и обёртка execute, которая их ведёт."""
+    stats = {'queries': 0, 'db': 0.0}
+
+    def execute_wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats['queries'] += 1
+            stats['db'] += time.perf_counter() - start
+
+    return stats, execute_wrapper
+
+
+def _wrap_connections(stack, execute_wrapper):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(execute_wrapper))
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет время запроса, число и время запросов к БД, время
+    сериализации и размер ответа.
+
+    Результат уходит в заголовок Server-Timing, строку лога
+    api.performance и гистограммы для /metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, execute_wrapper = _db_stats()
+        timings, token = start_timings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                _wrap_connections(stack, execute_wrapper)
+                response = self.get_response(request)
+        finally:
+            stop_timings(token)
+        self.report(request, response, stats, timings, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, execute_wrapper = _db_stats()
+        timings, token = start_timings()
+        start = time.perf_counter()
+        # Синхронный код и асинхронный ORM запроса выполняются в одном
+        # потоке, обёртки ставятся на соединения этого потока
+        stack = ExitStack()
+        try:
+            await sync_to_async(_wrap_connections)(stack, execute_wrapper)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            stop_timings(token)
+        self.report(request, response, stats, timings, start)
+        return response
+
+    def report(self, request, response, stats, timings, start):
+        total = time.perf_counter() - start
+        serializer = timings.get('serializer', 0.0)
+        render = timings.get('render', 0.0)
+        compress = timings.get('compress', 0.0)
+        size = (
+            None if response.streaming else len(response.content)
+        )
+        route = (
+            request.resolver_match.view_name
+            if request.resolver_match else 'unmatched'
+        )
+
+        response['Server-Timing'] = ', '.join((
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={stats["db"] * 1000:.1f};'
+            f'desc="{stats["queries"]} queries"',
+            f'serializer;dur={serializer * 1000:.1f}',
+            f'render;dur={render * 1000:.1f}',
+            f'compress;dur={compress * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_queries': stats['queries'],
+            'db_ms': round(stats['db'] * 1000, 1),
+            'serializer_ms': round(serializer * 1000, 1),
+            'render_ms': round(render * 1000, 1),
+            'compress_ms': round(compress * 1000, 1),
+            'size': size,
+        }))
+
+        labels = (request.method, route)
+        registry.observe('foodgram_request_duration_seconds', labels, total)
+        registry.observe('foodgram_request_db_seconds', labels, stats['db'])
+        registry.observe(
+            'foodgram_request_serializer_seconds', labels, serializer
+        )
+        registry.observe(
+            'foodgram_request_db_queries', labels, stats['queries']
+        )
+        if size is not None:
+            registry.observe('foodgram_response_size_bytes', labels, size)
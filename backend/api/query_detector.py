@@ -0,0 +1,132 @@
+"""
+Поиск N+1 запросов.
+
+Выполненный SQL группируется по нормализованному тексту запроса и месту
+вызова в коде проекта. Группы, повторившиеся не меньше порога,
+считаются N+1: в тестах это ошибка, в режиме DEBUG — предупреждение в лог.
+
+    with QueryDetector(threshold=3):
+        client.get('/api/recipes/')
+
+    @QueryDetector()
+    def test_subscriptions(self):
+        ...
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('api.query_detector')
+
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+STACK_DEPTH = 3
+# Обёртки execute_wrapper и middleware сами попадают в стек вызова
+# запроса и место вызова не определяют
+IGNORED_FILES = tuple(
+    str(Path(__file__).resolve().with_name(name))
+    for name in (
+        'query_detector.py', 'middleware.py', 'compression.py', 'replicas.py'
+    )
+)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_PARAM = re.compile(r'%s')
+_SPACES = re.compile(r'\s+')
+
+
+class NPlusOneError(AssertionError):
+    """Найдены повторяющиеся запросы."""
+
+
+def normalize_sql(sql):
+    """Заменяет литералы и параметры на ?, списки IN — на (...)."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PARAM.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _call_site():
+    """Ближайшие к запросу кадры стека из кода проекта."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(PROJECT_DIR)
+        and frame.filename not in IGNORED_FILES
+        and '/site-packages/' not in frame.filename
+    ]
+    return tuple(
+        f'{Path(frame.filename).relative_to(PROJECT_DIR)}:'
+        f'{frame.lineno} in {frame.name}'
+        for frame in reversed(frames[-STACK_DEPTH:])
+    )
+
+
+class QueryDetector(ContextDecorator):
+    """Контекстный менеджер и декоратор для поиска N+1 запросов."""
+
+    def __init__(self, threshold=None, raise_error=True):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.raise_error = raise_error
+        self.queries = Counter()
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        self.queries[(normalize_sql(sql), _call_site())] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = Counter()
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self._execute_wrapper)
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        if exc_type is None and self.raise_error and self.repeated:
+            raise NPlusOneError(self.report())
+        return False
+
+    @property
+    def repeated(self):
+        """Группы запросов, повторившиеся не меньше порога."""
+        return [
+            (sql, call_site, count)
+            for (sql, call_site), count in self.queries.most_common()
+            if count >= self.threshold
+        ]
+
+    def report(self):
+        lines = [
+            f'Повторяющиеся запросы (порог {self.threshold}):'
+        ]
+        for sql, call_site, count in self.repeated:
+            lines.append(f'{count} раз: {sql}')
+            lines.extend(f'    {frame}' for frame in call_site)
+        return '\n'.join(lines)
+
+
+class QueryDetectorMiddleware:
+    """Пишет в лог повторяющиеся запросы каждого запроса. Только для DEBUG."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryDetector(raise_error=False) as detector:
+            response = self.get_response(request)
+        if detector.repeated:
+            logger.warning(
+                '%s %s\n%s', request.method, request.path, detector.report()
+            )
+        return response
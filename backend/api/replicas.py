@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from hashlib import sha256
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger('api.replicas')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Модели, которые всегда читаются с основной БД: токен, выданный при
+# входе, должен работать сразу, не дожидаясь репликации
+PRIMARY_MODELS = {'authtoken.token'}
+LAG_SQL = {
+    'postgresql': (
+        'SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = '
+        'pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT(EPOCH FROM '
+        'now() - pg_last_xact_replay_timestamp()) END, 0)'
+    ),
+}
+
+# База для чтения в текущем запросе; вне запросов — основная
+read_database = ContextVar('read_database', default=DEFAULT_DB_ALIAS)
+# alias -> (время проверки, отставание в секундах или None при ошибке)
+_lag = {}
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах, None — если она недоступна."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL.get(connection.vendor, 'SELECT 0'))
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        logger.warning('Реплика %s недоступна', alias, exc_info=True)
+        return None
+
+
+def healthy_replicas():
+    """Реплики, отставание которых не больше REPLICA_MAX_LAG."""
+    now = time.monotonic()
+    healthy = []
+    for alias in settings.REPLICA_DATABASES:
+        checked_at, lag = _lag.get(alias, (None, None))
+        if checked_at is None or now - checked_at >= (
+            settings.REPLICA_CHECK_INTERVAL
+        ):
+            lag = replica_lag(alias)
+            _lag[alias] = (now, lag)
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            healthy.append(alias)
+    return healthy
+
+
+def _pin_key(request):
+    client = (
+        request.headers.get('Authorization')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return f'replica-pin:{sha256(client.encode()).hexdigest()}'
+
+
+def choose_database(request):
+    """База для чтения в запросе request."""
+    if request.method in SAFE_METHODS and not cache.get(_pin_key(request)):
+        replicas = healthy_replicas()
+        if replicas:
+            return random.choice(replicas)
+    return DEFAULT_DB_ALIAS
+
+
+def pin_after_write(request, response):
+    """Закрепляет клиента за основной БД после успешной записи."""
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        cache.set(_pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaMiddleware:
+    """
+    Выбирает базу для чтения на время запроса.
+
+    Безопасные запросы читают с одной случайной исправной реплики. После
+    записи клиент на REPLICA_PIN_SECONDS закрепляется за основной БД,
+    чтобы видеть свои изменения, пока они доезжают до реплик. Если
+    исправных реплик нет, чтение идёт с основной БД.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = read_database.set(choose_database(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        # Проверка отставания реплик ходит в БД
+        database = await sync_to_async(choose_database)(request)
+        token = read_database.set(database)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        pin_after_write(request, response)
+        return response
+
+
+class ReplicaRouter:
+    """Чтение — с базы, выбранной ReplicaMiddleware, запись — в основную."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,10 +1,15 @@
 from collections import Counter
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import prefetch_related_objects
+from django.urls import reverse
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
-from recipes.constants import MIN_AMOUNT, MIN_COOKING_TIME
+from jobs.models import Job
+from jobs.registry import TASKS, enqueue
+from recipes.constants import MAX_BATCH_SIZE, MIN_AMOUNT, MIN_COOKING_TIME
 from recipes.models import (
     Follow,
     Favorite,
@@ -14,27 +19,60 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.shopping_list import changing_recipe_ingredients
+from recipes.similarity import schedule_similar_update
+from .cache import bump_recipe_versions, get_fragments
+from .fast_read import build_recipe_fragments
 from .fields import Base64Field
+from .fieldsets import FieldsetSerializerMixin
+from .metrics import track
 
 
 User = get_user_model()
 
 
-class FoodgramUserSerializer(UserSerializer):
+class UserListSerializer(serializers.ListSerializer):
+    """Список пользователей с подписками, прочитанными одним запросом."""
+
+    def to_representation(self, data):
+        users = list(data)
+        request = self.context.get('request')
+        if (
+            users
+            and 'is_subscribed' in self.child.fields
+            and request is not None
+            and not request.user.is_anonymous
+        ):
+            self.child.subscribed = set(
+                Follow.objects.filter(
+                    user=request.user,
+                    following_id__in=[user.id for user in users]
+                ).values_list('following_id', flat=True)
+            )
+        return super().to_representation(users)
+
+
+class FoodgramUserSerializer(FieldsetSerializerMixin, UserSerializer):
     """Сериализатор для отображения пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
+    # Подписки, заранее прочитанные UserListSerializer
+    subscribed = None
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + (
             'is_subscribed', 'avatar'
         )
         read_only_fields = fields
+        list_serializer_class = UserListSerializer
 
     def get_is_subscribed(self, user):
         request = self.context.get('request')
+        if self.subscribed is not None:
+            return user.id in self.subscribed
         return (
-            request is not None
+            not self.context.get('fragment')
+            and request is not None
             and not request.user.is_anonymous
             and Follow.objects.filter(
                 user=request.user, following=user
@@ -86,6 +124,16 @@ class SubscribedUserSerializer(FoodgramUserSerializer):
         ).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id рецептов для пакетных операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE
+    )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для тегов."""
 
@@ -190,6 +238,9 @@ class RecipeEditCreateSerializer(serializers.ModelSerializer):
                 amount=ingredient['amount']
             ) for ingredient in ingredients
         )
+        bump_recipe_versions([recipe.id])
+        # bulk_create не шлёт сигналов
+        schedule_similar_update([recipe.id])
         return recipe
 
     def create(self, validated_data):
@@ -204,17 +255,114 @@ class RecipeEditCreateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('recipe_ingredients', None)
         self.validate_recipe_data(tags, ingredients)
-        # Удаляем старые связи перед обновлением
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        return self.create_recipe_relations(
-            super().update(recipe, validated_data), tags, ingredients
-        )
+        with changing_recipe_ingredients([recipe.id]):
+            # Удаляем старые связи перед обновлением
+            RecipeIngredient.objects.filter(recipe=recipe).delete()
+            return self.create_recipe_relations(
+                super().update(recipe, validated_data), tags, ingredients
+            )
 
     def to_representation(self, recipe):
         return RecipeReadSerializer(recipe, context=self.context).data
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+def get_viewer_flags(request, recipes, fields=None):
+    """
+    Избранное, корзина и подписки пользователя для набора рецептов.
+
+    Флаги, которых нет в fields, не запрашиваются.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or user.is_anonymous or not recipes:
+        return set(), set(), set()
+    fields = fields or RecipeReadSerializer.Meta.fields
+    recipe_ids = [recipe.id for recipe in recipes]
+    favorited = in_cart = subscribed = set()
+    if 'is_favorited' in fields:
+        favorited = set(
+            Favorite.objects.filter(
+                owner=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True)
+        )
+    if 'is_in_shopping_cart' in fields:
+        in_cart = set(
+            ShoppingCart.objects.filter(
+                owner=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True)
+        )
+    if 'author' in fields:
+        subscribed = set(
+            Follow.objects.filter(
+                user=user,
+                following_id__in={recipe.author_id for recipe in recipes}
+            ).values_list('following_id', flat=True)
+        )
+    return favorited, in_cart, subscribed
+
+
+def represent_recipes(recipes, context):
+    """
+    Собирает представление рецептов из кэшированных фрагментов.
+
+    Фрагмент не зависит от пользователя, флаги is_favorited,
+    is_in_shopping_cart и is_subscribed накладываются поверх. Набор
+    полей берётся из context['fields'].
+    """
+    with track('serializer'):
+        return _represent_recipes(recipes, context)
+
+
+def _represent_recipes(recipes, context):
+    request = context.get('request')
+    fields = context.get('fields')
+
+    def build(missing):
+        if settings.API_FAST_READ:
+            return build_recipe_fragments(missing, request, fields)
+        prefetch_related_objects(missing, *(
+            lookup for field, lookup in (
+                ('tags', 'tags'),
+                ('ingredients', 'recipe_ingredients__ingredient'),
+            )
+            if fields is None or field in fields
+        ))
+        return RecipeReadSerializer(
+            missing, many=True, context={**context, 'fragment': True}
+        ).data
+
+    fragments = get_fragments(
+        recipes,
+        request.build_absolute_uri('/') if request is not None else '',
+        build,
+        fields
+    )
+    favorited, in_cart, subscribed = get_viewer_flags(
+        request, recipes, fields
+    )
+    for recipe, fragment in zip(recipes, fragments):
+        if 'is_favorited' in fragment:
+            fragment['is_favorited'] = recipe.id in favorited
+        if 'is_in_shopping_cart' in fragment:
+            fragment['is_in_shopping_cart'] = recipe.id in in_cart
+        if fragment.get('author') is not None:
+            fragment['author']['is_subscribed'] = (
+                fragment['author']['id'] in subscribed
+            )
+    return fragments
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Сериализатор списка рецептов на основе кэша фрагментов."""
+
+    def to_representation(self, data):
+        if self.context.get('fragment'):
+            return super().to_representation(data)
+        return represent_recipes(list(data), self.context)
+
+
+class RecipeReadSerializer(
+    FieldsetSerializerMixin, serializers.ModelSerializer
+):
     """Сериализатор для отображения рецептов."""
 
     is_favorited = serializers.SerializerMethodField()
@@ -232,11 +380,18 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
         )
         read_only_fields = fields
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, recipe):
+        if self.context.get('fragment'):
+            return super().to_representation(recipe)
+        return represent_recipes([recipe], self.context)[0]
 
     def get_is_favorited(self, recipe):
         request = self.context.get('request')
         return (
-            request is not None
+            not self.context.get('fragment')
+            and request is not None
             and not request.user.is_anonymous
             and Favorite.objects.filter(
                 owner=request.user, recipe=recipe
@@ -246,9 +401,44 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         return (
-            request is not None
+            not self.context.get('fragment')
+            and request is not None
             and not request.user.is_anonymous
             and ShoppingCart.objects.filter(
                 owner=request.user, recipe=obj
             ).exists()
         )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор фоновой задачи пользователя."""
+
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'task', 'status', 'attempts', 'result', 'created_at',
+            'finished_at', 'download'
+        )
+        read_only_fields = (
+            'status', 'attempts', 'result', 'created_at', 'finished_at'
+        )
+
+    def validate_task(self, name):
+        task = TASKS.get(name)
+        if task is None or not task.allowed_for(self.context['request'].user):
+            raise serializers.ValidationError(f'Задача {name} недоступна')
+        return name
+
+    def get_download(self, job):
+        if job.status != Job.Status.DONE or not job.result_file:
+            return None
+        return self.context['request'].build_absolute_uri(
+            reverse('api:jobs-download', kwargs={'pk': job.id})
+        )
+
+    def create(self, validated_data):
+        return enqueue(
+            validated_data['task'], owner=validated_data['owner']
+        )
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import bulk_changed
+from .authentication import forget_token
+from .cache import bump_global_version, bump_recipe_versions
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    bump_recipe_versions([instance.id])
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    bump_recipe_versions([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_recipe_versions([instance.id])
+    elif pk_set:
+        bump_recipe_versions(pk_set)
+    else:
+        bump_global_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, update_fields=None,
+                              **kwargs):
+    # Вход меняет только last_login, который во фрагменты не попадает
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_recipe_versions(
+        instance.recipes.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Выход через djoser удаляет токен
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Смена пароля, блокировка и правка профиля; вход меняет только
+    # last_login и кэш не трогает
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        forget_token(key)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_all_recipes(sender, **kwargs):
+    bump_global_version()
+
+
+@receiver(bulk_changed)
+def invalidate_after_bulk_change(sender, ids=None, **kwargs):
+    if sender is Recipe and ids is not None:
+        bump_recipe_versions(ids)
+    else:
+        bump_global_version()
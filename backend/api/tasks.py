@@ -0,0 +1,17 @@
+from uuid import uuid4
+
+from django.core.files.base import ContentFile
+
+from jobs.registry import USER, task
+from .utils import generate_shopping_list
+
+
+@task('shopping_list', access=USER)
+def shopping_list(job):
+    """Список покупок владельца задачи в TXT."""
+    job.result_file.save(
+        f'{uuid4().hex}.txt',
+        ContentFile(generate_shopping_list(job.owner).encode()),
+        save=False
+    )
+    return {'filename': 'shopping_list.txt'}
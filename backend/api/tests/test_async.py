@@ -0,0 +1,148 @@
+"""Асинхронные представления чтения и асинхронный режим middleware."""
+import copy
+import threading
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import async_views
+from api.cache import GLOBAL_VERSION_KEY, response_cache_key
+from api.compression import CompressionMiddleware
+from api.middleware import PerformanceMiddleware
+from api.replicas import ReplicaMiddleware
+from api.throttling import store
+from recipes.models import FoodgramUser, Recipe, Tag
+
+
+def _rates(**rates):
+    config = copy.deepcopy(settings.REST_FRAMEWORK)
+    config['DEFAULT_THROTTLE_RATES'].update(rates)
+    return config
+
+
+class AsyncMiddlewareTest(TestCase):
+
+    async def test_async_chain(self):
+        async def view(request):
+            await Tag.objects.acount()
+            return HttpResponse(
+                b'[' + b'0,' * 1000 + b'0]', content_type='application/json'
+            )
+
+        for middleware_class in (
+            PerformanceMiddleware, CompressionMiddleware, ReplicaMiddleware
+        ):
+            self.assertTrue(iscoroutinefunction(middleware_class(view)))
+        middleware = PerformanceMiddleware(
+            CompressionMiddleware(ReplicaMiddleware(view))
+        )
+        response = await middleware(
+            AsyncRequestFactory().get('/', headers={'Accept-Encoding': 'gzip'})
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+
+@override_settings(THROTTLE_ENABLED=False, RESPONSE_CACHE_TIMEOUT=0)
+class AsyncReadViewTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        store._data.clear()
+
+    @override_settings(
+        THROTTLE_ENABLED=True, REST_FRAMEWORK=_rates(anon='1/min')
+    )
+    async def test_throttles(self):
+        response = await async_views.tag_list_view(
+            AsyncRequestFactory().get('/api/tags/')
+        )
+        self.assertEqual(response.status_code, 200)
+        response = await async_views.tag_list_view(
+            AsyncRequestFactory().get('/api/tags/')
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    async def test_response_cache(self):
+        await Tag.objects.acreate(name='Завтрак', slug='breakfast')
+        request = AsyncRequestFactory().get('/api/tags/')
+        response = await async_views.tag_list_view(request)
+        key = response_cache_key(request, GLOBAL_VERSION_KEY)
+        self.assertEqual(cache.get(key)['content'], response.content)
+        # update() не шлёт сигналов, версия та же — ответ из кэша
+        await Tag.objects.all().aupdate(name='Обед')
+        cached = await async_views.tag_list_view(
+            AsyncRequestFactory().get('/api/tags/')
+        )
+        self.assertEqual(cached.content, response.content)
+
+    @override_settings(
+        THROTTLE_ENABLED=True, RESPONSE_CACHE_TIMEOUT=60,
+        REST_FRAMEWORK=_rates(anon='100/min')
+    )
+    async def test_cache_calls_leave_event_loop(self):
+        threads = {}
+
+        def record(name, function):
+            def wrapper(*args, **kwargs):
+                threads[name] = threading.get_ident()
+                return function(*args, **kwargs)
+            return wrapper
+
+        with mock.patch.multiple(async_views, **{
+            name: record(name, getattr(async_views, name))
+            for name in (
+                '_allow_request', '_list_cache_key', 'get_cached_response',
+                'cache_response',
+            )
+        }):
+            response = await async_views.tag_list_view(
+                AsyncRequestFactory().get('/api/tags/')
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(threading.get_ident(), threads.values())
+
+    async def test_recipe_filters_match_sync_views(self):
+        author = await FoodgramUser.objects.acreate(
+            email='author@example.com', username='author',
+            first_name='Анна', last_name='Иванова'
+        )
+        breakfast = await Tag.objects.acreate(
+            name='Завтрак', slug='breakfast'
+        )
+        lunch = await Tag.objects.acreate(name='Обед', slug='lunch')
+        for number, (cooking_time, tags) in enumerate((
+            (10, [breakfast]), (30, [breakfast, lunch]), (45, [lunch]),
+            (60, []), (90, [lunch]),
+        )):
+            recipe = await Recipe.objects.acreate(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=cooking_time, image=f'recipes/images/{number}.png'
+            )
+            await recipe.tags.aset(tags)
+        for query in (
+            'cooking_time=fast', 'cooking_time=medium', 'cooking_time=long',
+            'cooking_time=', 'cooking_time=unknown',
+            f'cooking_time=long&author={author.id}', 'unknown=1',
+            'tags=breakfast&cooking_time=medium',
+            'tags=breakfast&tags=lunch&cooking_time=medium',
+            'tags=lunch&cooking_time=long', 'tags=unknown',
+        ):
+            url = f'/api/recipes/?{query}'
+            response = await async_views.recipe_list_view(
+                AsyncRequestFactory().get(url)
+            )
+            # Ответ синхронного вьюсета рендерит обработчик запросов
+            if hasattr(response, 'render'):
+                response.render()
+            expected = await sync_to_async(APIClient().get)(url)
+            self.assertEqual(response.status_code, expected.status_code, url)
+            self.assertEqual(response.content, expected.content, url)
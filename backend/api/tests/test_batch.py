@@ -0,0 +1,120 @@
+"""Избранное и корзина: по одному рецепту и пачкой."""
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.constants import MAX_BATCH_SIZE
+from recipes.models import Favorite, FoodgramUser, Recipe, ShoppingCart
+
+MISSING_ID = 10 ** 6
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class BatchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = FoodgramUser.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.user, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image=f'recipes/images/{number}.png'
+            )
+            for number in range(30)
+        )
+        cls.ids = [recipe.id for recipe in cls.recipes]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _batch(self, method, url, recipe_ids):
+        return getattr(self.client, method)(
+            url, {'recipes': recipe_ids}, format='json'
+        )
+
+    def test_result_map(self):
+        for url, model in (
+            ('/api/recipes/favorite/batch/', Favorite),
+            ('/api/recipes/shopping_cart/batch/', ShoppingCart),
+        ):
+            first, second, third = self.ids[:3]
+            model.objects.create(owner=self.user, recipe_id=second)
+            response = self._batch(
+                'post', url, [first, second, MISSING_ID, first]
+            )
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json()['results'], [
+                {'id': first, 'status': 'added'},
+                {'id': second, 'status': 'exists'},
+                {'id': MISSING_ID, 'status': 'not_found'},
+            ])
+            self.assertEqual(
+                set(model.objects.values_list('recipe_id', flat=True)),
+                {first, second}
+            )
+            response = self._batch('delete', url, [second, third, second])
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json()['results'], [
+                {'id': second, 'status': 'removed'},
+                {'id': third, 'status': 'absent'},
+            ])
+            self.assertEqual(
+                list(model.objects.values_list('recipe_id', flat=True)),
+                [first]
+            )
+
+    def test_batch_size_limit(self):
+        url = '/api/recipes/favorite/batch/'
+        for method in ('post', 'delete'):
+            response = self._batch(
+                method, url, list(range(1, MAX_BATCH_SIZE + 2))
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('recipes', response.json())
+            self.assertEqual(self._batch(method, url, []).status_code, 400)
+        response = self._batch('post', url, list(range(1, MAX_BATCH_SIZE + 1)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), MAX_BATCH_SIZE)
+
+    def test_constant_query_count(self):
+        for url in (
+            '/api/recipes/favorite/batch/',
+            '/api/recipes/shopping_cart/batch/',
+        ):
+            for method in ('post', 'delete'):
+                counts = []
+                for recipe_ids in (self.ids[:2], self.ids[2:]):
+                    # Половина пачки уже добавлена или удалена
+                    self._batch(method, url, recipe_ids[::2])
+                    with CaptureQueriesContext(connection) as queries:
+                        self._batch(method, url, recipe_ids)
+                    counts.append(len(queries))
+                self.assertEqual(counts[0], counts[1], (url, method))
+
+    def test_single_recipe(self):
+        for url, model in (
+            ('/api/recipes/{}/favorite/', Favorite),
+            ('/api/recipes/{}/shopping_cart/', ShoppingCart),
+        ):
+            recipe = self.recipes[0]
+            response = self.client.post(url.format(recipe.id))
+            self.assertEqual(response.status_code, 201, url)
+            self.assertEqual(response.json()['id'], recipe.id)
+            self.assertEqual(
+                self.client.post(url.format(recipe.id)).status_code, 400
+            )
+            self.assertEqual(
+                self.client.post(url.format(MISSING_ID)).status_code, 404
+            )
+            self.assertEqual(
+                self.client.delete(url.format(recipe.id)).status_code, 204
+            )
+            self.assertEqual(
+                self.client.delete(url.format(recipe.id)).status_code, 404
+            )
+            self.assertFalse(model.objects.exists())
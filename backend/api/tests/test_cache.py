@@ -0,0 +1,157 @@
+"""Кэш фрагментов и ответов, его сброс после коммита, сжатие ответов."""
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.cache import (
+    GLOBAL_VERSION_KEY,
+    _version_key,
+    bump_global_version,
+    bump_recipe_versions,
+)
+from api.compression import compress_response
+from recipes.models import FoodgramUser, Recipe, Tag
+
+
+@override_settings(
+    RECIPE_FRAGMENT_CACHE_TIMEOUT=60, RESPONSE_CACHE_TIMEOUT=0,
+    THROTTLE_ENABLED=False
+)
+class FragmentCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Каша', text='Текст', cooking_time=10,
+            image='recipes/images/porridge.png'
+        )
+        cls.recipe.tags.set([cls.tag])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_bump_waits_for_commit(self):
+        cache.set(_version_key(self.recipe.id), 1, None)
+        cache.set(GLOBAL_VERSION_KEY, 1, None)
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_recipe_versions([self.recipe.id])
+            bump_recipe_versions([self.recipe.id])
+            bump_global_version()
+        self.assertEqual(cache.get(_version_key(self.recipe.id)), 1)
+        self.assertEqual(cache.get(GLOBAL_VERSION_KEY), 1)
+        for callback in callbacks:
+            callback()
+        # Оба вызова за транзакцию сбрасывают версию один раз
+        self.assertEqual(cache.get(_version_key(self.recipe.id)), 2)
+        self.assertNotEqual(cache.get(GLOBAL_VERSION_KEY), 1)
+
+    def test_edit_refreshes_fragment(self):
+        self.assertEqual(
+            self.client.get('/api/recipes/').json()['results'][0]['name'],
+            'Каша'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.recipes.update(name='Суп')
+            self.recipe.refresh_from_db()
+            self.recipe.save()
+        self.assertEqual(
+            self.client.get('/api/recipes/').json()['results'][0]['name'],
+            'Суп'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Обед'
+            self.tag.save()
+        recipe = self.client.get('/api/recipes/').json()['results'][0]
+        self.assertEqual(recipe['tags'][0]['name'], 'Обед')
+
+    def test_cached_and_uncached_match(self):
+        cached = self.client.get('/api/recipes/')
+        self.assertEqual(self.client.get('/api/recipes/').content,
+                         cached.content)
+        with override_settings(RECIPE_FRAGMENT_CACHE_TIMEOUT=0):
+            cache.clear()
+            self.assertEqual(self.client.get('/api/recipes/').content,
+                             cached.content)
+            self.assertEqual(cache.get(GLOBAL_VERSION_KEY), None)
+
+
+@override_settings(
+    RECIPE_FRAGMENT_CACHE_TIMEOUT=0, RESPONSE_CACHE_TIMEOUT=60,
+    THROTTLE_ENABLED=False
+)
+class ResponseCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        Recipe.objects.create(
+            author=cls.author, name='Каша', text='Текст', cooking_time=10,
+            image='recipes/images/porridge.png'
+        )
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _count(self, url):
+        response = self.client.get(url).json()
+        return response['count'] if 'count' in response else len(response)
+
+    def test_write_refreshes_list(self):
+        self.assertEqual(self._count('/api/recipes/'), 1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Recipe.objects.create(
+                author=self.author, name='Суп', text='Текст',
+                cooking_time=20, image='recipes/images/soup.png'
+            )
+            # До коммита версия в кэше прежняя, ответ из кэша
+            self.assertEqual(self._count('/api/recipes/'), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._count('/api/recipes/'), 2)
+
+    def test_tag_write_refreshes_tags(self):
+        self.assertEqual(self._count('/api/tags/'), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Обед', slug='lunch')
+        self.assertEqual(self._count('/api/tags/'), 2)
+
+    def test_authenticated_recipes_are_not_cached(self):
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self._count('/api/recipes/'), 1)
+        # update() не шлёт сигналов и версию не меняет
+        Recipe.objects.update(name='Суп')
+        results = self.client.get('/api/recipes/').json()['results']
+        self.assertEqual(results[0]['name'], 'Суп')
+
+
+class CompressionTest(TestCase):
+
+    def _compress(self, content_type):
+        request = RequestFactory().get(
+            '/', headers={'Accept-Encoding': 'gzip'}
+        )
+        response = HttpResponse(b'a' * 2048, content_type=content_type)
+        return compress_response(request, response)
+
+    def test_json_is_compressed(self):
+        response = self._compress('application/json')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.content), 2048)
+
+    def test_html_and_text_are_not_compressed(self):
+        for content_type in ('text/html; charset=utf-8', 'text/plain'):
+            response = self._compress(content_type)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(response.content, b'a' * 2048)
@@ -0,0 +1,146 @@
+"""Счётчики фасетов совпадают с числом рецептов в отфильтрованном списке."""
+from itertools import product
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.filters import COOKING_TIME_CHOICES
+from recipes.models import Favorite, FoodgramUser, Recipe, ShoppingCart, Tag
+
+# Время приготовления и теги рецептов; границы корзин 30 и 60 включены
+# в средние
+RECIPES = (
+    (10, ('breakfast',)),
+    (29, ('breakfast', 'lunch')),
+    (30, ('lunch',)),
+    (60, ('lunch', 'dinner')),
+    (61, ('dinner',)),
+    (90, ()),
+    (45, ('breakfast', 'lunch', 'dinner')),
+)
+TAG_FILTERS = ((), ('breakfast',), ('lunch', 'dinner'))
+COOKING_TIMES = ('', 'fast', 'medium', 'long')
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False)
+class FacetsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.other = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass'
+            )
+            for name in ('reader', 'author', 'other')
+        )
+        tags = {
+            slug: Tag.objects.create(name=slug, slug=slug)
+            for slug in ('breakfast', 'lunch', 'dinner')
+        }
+        for number, (cooking_time, slugs) in enumerate(RECIPES):
+            recipe = Recipe.objects.create(
+                author=cls.author if number % 2 else cls.other,
+                name=f'Рецепт {number}', text='Текст',
+                cooking_time=cooking_time,
+                image=f'recipes/images/{number}.png'
+            )
+            recipe.tags.set([tags[slug] for slug in slugs])
+            if number % 3 == 0:
+                Favorite.objects.create(owner=cls.reader, recipe=recipe)
+            if number < 3:
+                ShoppingCart.objects.create(owner=cls.reader, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _query(self, tags=(), cooking_time='', extra=''):
+        params = [f'tags={slug}' for slug in tags]
+        if cooking_time:
+            params.append(f'cooking_time={cooking_time}')
+        if extra:
+            params.append(extra)
+        return '&'.join(params)
+
+    def _count(self, query):
+        response = self.client.get(f'/api/recipes/?limit=100&{query}')
+        self.assertEqual(response.status_code, 200, query)
+        return response.json()['count']
+
+    def assertFacetsMatchList(self, tags, cooking_time, extra=''):
+        query = self._query(tags, cooking_time, extra)
+        response = self.client.get(f'/api/recipes/facets/?{query}')
+        self.assertEqual(response.status_code, 200, query)
+        facets = response.json()
+        self.assertEqual(facets['count'], self._count(query), query)
+        # Счётчик тега — без выбранных тегов, но с остальными фильтрами
+        for tag in facets['tags']:
+            self.assertEqual(
+                tag['count'],
+                self._count(
+                    self._query((tag['slug'],), cooking_time, extra)
+                ),
+                f'{query}: {tag["slug"]}'
+            )
+        self.assertEqual(
+            [item['value'] for item in facets['cooking_time']],
+            [value for value, _ in COOKING_TIME_CHOICES]
+        )
+        for item in facets['cooking_time']:
+            self.assertEqual(
+                item['count'],
+                self._count(self._query(tags, item['value'], extra)),
+                f'{query}: {item["value"]}'
+            )
+        for name in ('is_favorited', 'is_in_shopping_cart'):
+            self.assertEqual(
+                facets[name], self._count(f'{query}&{name}=1'),
+                f'{query}: {name}'
+            )
+
+    def test_counts_with_filters(self):
+        self.client.force_authenticate(self.reader)
+        for tags, cooking_time in product(TAG_FILTERS, COOKING_TIMES):
+            self.assertFacetsMatchList(tags, cooking_time)
+        self.assertFacetsMatchList(
+            ('lunch',), 'medium', f'author={self.author.id}'
+        )
+        self.assertFacetsMatchList(('breakfast',), '', 'is_favorited=1')
+
+    def test_known_counts(self):
+        facets = self.client.get(
+            '/api/recipes/facets/?tags=lunch&cooking_time=medium'
+        ).json()
+        # Средние с обедом: 30, 60 и 45 минут
+        self.assertEqual(facets['count'], 3)
+        self.assertEqual(
+            {tag['slug']: tag['count'] for tag in facets['tags']},
+            {'breakfast': 1, 'lunch': 3, 'dinner': 2}
+        )
+        self.assertEqual(
+            {item['value']: item['count'] for item in facets['cooking_time']},
+            {'fast': 1, 'medium': 3, 'long': 0}
+        )
+        self.assertEqual(facets['is_favorited'], 0)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60)
+    def test_cached_counts(self):
+        for user in (None, self.reader):
+            self.client.force_authenticate(user)
+            for tags, cooking_time in product(TAG_FILTERS, COOKING_TIMES):
+                # Второй проход берёт общую часть из кэша
+                for _ in range(2):
+                    self.assertFacetsMatchList(tags, cooking_time)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                author=self.author, name='Суп', text='Текст',
+                cooking_time=5, image='recipes/images/soup.png'
+            )
+        self.assertFacetsMatchList((), 'fast')
+
+    def test_invalid_filter(self):
+        for query in ('cooking_time=unknown', 'tags=unknown'):
+            response = self.client.get(f'/api/recipes/facets/?{query}')
+            self.assertEqual(response.status_code, 400, query)
@@ -0,0 +1,133 @@
+"""
+Паритет быстрого пути чтения.
+
+Ответы FastReadMixin, фрагментов build_recipe_fragments и
+FastJSONRenderer должны побайтно совпадать с выводом сериализаторов,
+отрендеренным JSONRenderer.
+"""
+import datetime
+from contextlib import ExitStack
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.renderers import FastJSONRenderer
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from recipes.models import (
+    Favorite,
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+
+VIEWSETS = (TagViewSet, IngredientViewSet, RecipeViewSet)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False)
+class FastReadParityTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Анна', last_name='Иванова', password='pass',
+            avatar='users/avatar.png'
+        )
+        cls.reader = FoodgramUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Борис', last_name='Петров', password='pass'
+        )
+        cls.tags = [
+            Tag.objects.create(name='Завтрак', slug='breakfast'),
+            Tag.objects.create(name='Обед "бизнес"', slug='lunch'),
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name='соль', measurement_unit='г'),
+            Ingredient.objects.create(
+                name='мука высшего сорта', measurement_unit='кг'
+            ),
+        ]
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author,
+                name=f'Рецепт {number}',
+                text='Строка\u2028с разделителем и </script>',
+                cooking_time=10 + number,
+                image=f'recipes/images/{number}.png'
+            )
+            recipe.tags.set(cls.tags[:number % 2 + 1])
+            for amount, ingredient in enumerate(cls.ingredients, 1):
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                )
+            cls.recipes.append(recipe)
+        Favorite.objects.create(owner=cls.reader, recipe=cls.recipes[0])
+
+    def _get(self, url, fast, user=None):
+        cache.clear()
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        with override_settings(API_FAST_READ=fast), ExitStack() as stack:
+            if not fast:
+                # Эталон: сериализаторы и стандартный JSONRenderer
+                for viewset in VIEWSETS:
+                    stack.enter_context(mock.patch.object(
+                        viewset, 'renderer_classes', [JSONRenderer]
+                    ))
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.content
+
+    def assertParity(self, url, user=None):
+        self.assertEqual(
+            self._get(url, fast=True, user=user),
+            self._get(url, fast=False, user=user),
+            url
+        )
+
+    def test_tags(self):
+        self.assertParity('/api/tags/')
+        self.assertParity(f'/api/tags/{self.tags[1].id}/')
+
+    def test_ingredients(self):
+        self.assertParity('/api/ingredients/')
+        self.assertParity('/api/ingredients/?name=му')
+        self.assertParity(f'/api/ingredients/{self.ingredients[1].id}/')
+
+    def test_recipes(self):
+        for user in (None, self.reader):
+            self.assertParity('/api/recipes/', user)
+            self.assertParity('/api/recipes/?limit=2&page=2', user)
+            self.assertParity(f'/api/recipes/{self.recipes[0].id}/', user)
+
+    def test_invalid_id_is_not_found(self):
+        for fast in (True, False):
+            with override_settings(API_FAST_READ=fast):
+                for url in ('/api/tags/abc/', '/api/ingredients/abc/'):
+                    self.assertEqual(
+                        APIClient().get(url).status_code, 404, url
+                    )
+
+
+class FastJSONRendererTest(TestCase):
+
+    def test_matches_json_renderer(self):
+        for data in (
+            {'text': 'a\u2028b\u2029 кириллица "q" </script>'},
+            {'created': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc
+            )},
+            {'date': datetime.date(2024, 1, 2), 'amount': Decimal('1.50')},
+            [None, True, 1, 1.5, 2 ** 70, {'nested': []}],
+        ):
+            self.assertEqual(
+                FastJSONRenderer().render(data), JSONRenderer().render(data)
+            )
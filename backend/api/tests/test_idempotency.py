@@ -0,0 +1,156 @@
+"""Заголовок Idempotency-Key и вставка связей с ON CONFLICT."""
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.idempotency import _cache_key
+from api.writes import create_links, delete_links
+from recipes.models import Favorite, Follow, FoodgramUser, Recipe
+
+MISSING_ID = 10 ** 6
+
+
+class IdempotencyTestMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = FoodgramUser.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        cls.author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Борис', last_name='Петров', password='pass'
+        )
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image=f'recipes/images/{number}.png'
+            )
+            for number in range(3)
+        )
+
+
+@override_settings(THROTTLE_ENABLED=False, IDEMPOTENCY_KEY_TIMEOUT=60)
+class IdempotencyKeyTest(IdempotencyTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/recipes/{self.recipes[0].id}/favorite/'
+
+    def _post(self, key, data=None, url=None):
+        return self.client.post(
+            url or self.url, data, format='json',
+            headers={'Idempotency-Key': key}
+        )
+
+    def test_replay(self):
+        first = self._post('key-1', {'note': 'a'})
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+        replay = self._post('key-1', {'note': 'a'})
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(Favorite.objects.count(), 1)
+        # Без ключа повтор выполняется и видит уже добавленный рецепт
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+
+    def test_conflicting_body(self):
+        self.assertEqual(self._post('key-1', {'note': 'a'}).status_code, 201)
+        response = self._post('key-1', {'note': 'b'})
+        self.assertEqual(response.status_code, 422)
+        self.assertNotIn('Idempotent-Replayed', response)
+        response = self.client.post(
+            f'{self.url}?note=b', {'note': 'a'}, format='json',
+            headers={'Idempotency-Key': 'key-1'}
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_scope(self):
+        self.assertEqual(self._post('key-1').status_code, 201)
+        other = f'/api/recipes/{self.recipes[1].id}/favorite/'
+        self.assertEqual(self._post('key-1', url=other).status_code, 201)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self._post('key-1').status_code, 201)
+        self.assertEqual(Favorite.objects.count(), 3)
+
+    def test_in_progress(self):
+        request = RequestFactory().post(self.url)
+        request.user = self.user
+        cache.add(f'{_cache_key(request, "key-1")}:lock', True)
+        self.assertEqual(self._post('key-1').status_code, 409)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_errors_are_not_stored(self):
+        url = f'/api/recipes/{MISSING_ID}/favorite/'
+        self.assertEqual(self._post('key-1', url=url).status_code, 404)
+        self.assertEqual(self._post('key-1', url=url).status_code, 404)
+
+    @override_settings(IDEMPOTENCY_KEY_TIMEOUT=0)
+    def test_disabled_without_shared_cache(self):
+        self.assertEqual(self._post('key-1').status_code, 201)
+        self.assertEqual(self._post('key-1').status_code, 400)
+
+
+class WriteLinksTest(IdempotencyTestMixin, TestCase):
+
+    def test_create_links_skips_duplicates(self):
+        first, second, third = (recipe.id for recipe in self.recipes)
+        self.assertEqual(
+            create_links(
+                Favorite, 'recipe', [first, second, first, MISSING_ID],
+                owner=self.user.pk
+            ),
+            {first, second}
+        )
+        # Повторная вставка упирается в уникальность и ничего не создаёт
+        self.assertEqual(
+            create_links(
+                Favorite, 'recipe', [second, third], owner=self.user.pk
+            ),
+            {third}
+        )
+        self.assertEqual(
+            sorted(
+                Favorite.objects.filter(owner=self.user).values_list(
+                    'recipe_id', flat=True
+                )
+            ),
+            [first, second, third]
+        )
+
+    def test_delete_links(self):
+        first, second, _ = (recipe.id for recipe in self.recipes)
+        create_links(Favorite, 'recipe', [first], owner=self.user.pk)
+        create_links(Favorite, 'recipe', [second], owner=self.author.pk)
+        self.assertEqual(
+            delete_links(
+                Favorite, 'recipe', [first, second], owner=self.user.pk
+            ),
+            {first}
+        )
+        self.assertEqual(
+            delete_links(Favorite, 'recipe', [first], owner=self.user.pk),
+            set()
+        )
+        self.assertTrue(
+            Favorite.objects.filter(owner=self.author, recipe=second).exists()
+        )
+
+    def test_follow(self):
+        self.assertEqual(
+            create_links(
+                Follow, 'following', [self.author.pk, self.author.pk],
+                user=self.user.pk
+            ),
+            {self.author.pk}
+        )
+        self.assertEqual(
+            create_links(
+                Follow, 'following', [self.author.pk], user=self.user.pk
+            ),
+            set()
+        )
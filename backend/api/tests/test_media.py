@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from api.media import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+from recipes.models import Recipe
+from recipes.uploads import UNIQUE_NAME
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT=False)
+class MediaCacheTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_uploads_get_unique_names(self):
+        field = Recipe._meta.get_field('image')
+        names = {
+            field.generate_filename(Recipe(), 'image.PNG') for _ in range(2)
+        }
+        self.assertEqual(len(names), 2)
+        for name in names:
+            directory, _, filename = name.rpartition('/')
+            self.assertEqual(directory, 'recipes/images')
+            self.assertRegex(filename, UNIQUE_NAME)
+            self.assertTrue(filename.endswith('.png'))
+
+    def test_only_unique_names_are_immutable(self):
+        unique = Recipe._meta.get_field('image').generate_filename(
+            Recipe(), 'image.png'
+        )
+        for name, cache_control in (
+            (unique, IMMUTABLE_CACHE_CONTROL),
+            ('recipes/images/image.png', REVALIDATE_CACHE_CONTROL),
+        ):
+            default_storage.save(name, ContentFile(b'png'))
+            response = self.client.get(f'/media/{name}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], cache_control)
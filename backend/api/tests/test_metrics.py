@@ -0,0 +1,15 @@
+from django.test import TestCase, override_settings
+
+
+class MetricsAccessTest(TestCase):
+
+    def test_localhost_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(
+            self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code,
+            404
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_empty_list_denies_everyone(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
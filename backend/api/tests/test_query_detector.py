@@ -0,0 +1,137 @@
+"""Поиск N+1 запросов и отсутствие N+1 в списках API."""
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.query_detector import NPlusOneError, QueryDetector, normalize_sql
+from api.serializers import FoodgramUserSerializer
+from recipes.models import (
+    Favorite,
+    Follow,
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+
+SIZE = 6
+
+
+class QueryDetectorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            FoodgramUser.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                first_name='Имя', last_name='Фамилия', password='pass'
+            )
+            for number in range(SIZE)
+        ]
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT * FROM t WHERE id IN (%s, %s)  AND name = 'a''b' "
+                'AND n = 10'
+            ),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? AND n = ?'
+        )
+
+    def test_below_threshold(self):
+        with QueryDetector(threshold=SIZE + 1) as detector:
+            for user in self.users:
+                Tag.objects.filter(pk=user.pk).exists()
+        self.assertEqual(detector.repeated, [])
+        self.assertEqual(max(detector.queries.values()), SIZE)
+
+    def test_raises_with_serializer_call_site(self):
+        request = RequestFactory().get('/api/users/')
+        request.user = self.users[0]
+        # По одному пользователю, без общего списка подписок
+        with self.assertRaises(NPlusOneError) as raised:
+            with QueryDetector(threshold=SIZE):
+                for user in self.users:
+                    FoodgramUserSerializer(
+                        user, context={'request': request}
+                    ).data
+        report = str(raised.exception)
+        self.assertIn(f'{SIZE} раз: SELECT', report)
+        self.assertIn('api/serializers.py', report)
+        self.assertIn('in get_is_subscribed', report)
+
+    def test_decorator(self):
+        @QueryDetector(threshold=2)
+        def repeat():
+            for _ in range(2):
+                Tag.objects.count()
+
+        with self.assertRaises(NPlusOneError):
+            repeat()
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False)
+class ListQueriesTest(TestCase):
+    """Число запросов списков не растёт с числом строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = FoodgramUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Борис', last_name='Петров', password='pass'
+        )
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        for number in range(SIZE):
+            author = FoodgramUser.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}', first_name='Анна',
+                last_name='Иванова', password='pass'
+            )
+            Follow.objects.create(user=cls.reader, following=author)
+            for recipe_number in range(2):
+                recipe = Recipe.objects.create(
+                    author=author, name=f'Рецепт {number}.{recipe_number}',
+                    text='Текст', cooking_time=10,
+                    image=f'recipes/images/{number}.png'
+                )
+                recipe.tags.set([tag])
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                Favorite.objects.create(owner=cls.reader, recipe=recipe)
+                ShoppingCart.objects.create(owner=cls.reader, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def _get(self, url):
+        with QueryDetector(threshold=SIZE):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_recipes(self):
+        for fast in (True, False):
+            with override_settings(API_FAST_READ=fast):
+                self._get('/api/recipes/?limit=20')
+                self._get('/api/recipes/?is_favorited=1&limit=20')
+
+    def test_subscriptions(self):
+        response = self._get('/api/users/subscriptions/?limit=20')
+        results = response.json()['results']
+        self.assertEqual(len(results), SIZE)
+        self.assertTrue(all(user['is_subscribed'] for user in results))
+        self._get('/api/users/subscriptions/?limit=20&recipes_limit=1')
+
+    def test_users(self):
+        results = self._get('/api/users/?limit=20').json()['results']
+        self.assertEqual(
+            [user['is_subscribed'] for user in results],
+            [user['id'] != self.reader.id for user in results]
+        )
+        self._get('/api/users/?limit=20&fields=id,username')
@@ -0,0 +1,150 @@
+"""Чтение с реплики на втором псевдониме БД."""
+import copy
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api import replicas
+from api.authentication import tokens
+from recipes.models import FoodgramUser, Recipe, Tag
+
+REPLICA = 'replica_0'
+
+
+@override_settings(
+    REPLICA_DATABASES=[REPLICA],
+    DATABASE_ROUTERS=['api.replicas.ReplicaRouter'],
+    MIDDLEWARE=[
+        *settings.MIDDLEWARE[:1], 'api.replicas.ReplicaMiddleware',
+        *settings.MIDDLEWARE[1:],
+    ],
+    RESPONSE_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Реплика — второе подключение к тестовой БД.
+
+    Данные на ней те же, поэтому база чтения видна по тому, через какое
+    подключение прошли запросы. TransactionTestCase: реплика не видит
+    незакоммиченную транзакцию TestCase.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Псевдоним добавляется после создания тестовой БД и указывает
+        # на неё; тестовый раннер о нём не знает
+        connections.settings[REPLICA] = dict(
+            copy.deepcopy(connections[DEFAULT_DB_ALIAS].settings_dict),
+            TEST={'MIRROR': DEFAULT_DB_ALIAS}
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        tokens.clear()
+        replicas._lag.clear()
+        self.user = FoodgramUser.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Каша', text='Текст', cooking_time=10,
+            image='recipes/images/porridge.png'
+        )
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    def _queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, url)
+        return (
+            [query['sql'] for query in primary.captured_queries],
+            [query['sql'] for query in replica.captured_queries],
+        )
+
+    def test_get_reads_from_replica(self):
+        primary, replica = self._queries('get', '/api/tags/')
+        self.assertEqual(primary, [])
+        self.assertTrue(any('recipes_tag' in sql for sql in replica))
+        self.assertEqual(replicas.read_database.get(), DEFAULT_DB_ALIAS)
+
+    def test_write_pins_client_to_primary(self):
+        # Запись идёт в основную БД
+        primary, replica = self._queries(
+            'post', f'/api/recipes/{self.recipe.id}/favorite/', **self.headers
+        )
+        self.assertTrue(any('recipes_favorite' in sql for sql in primary))
+        self.assertFalse(any('recipes_favorite' in sql for sql in replica))
+        # Следующее чтение того же клиента — с основной БД
+        primary, replica = self._queries(
+            'get', '/api/recipes/?is_favorited=1', **self.headers
+        )
+        self.assertEqual(replica, [])
+        self.assertTrue(any('recipes_recipe' in sql for sql in primary))
+        # Другой клиент читает с реплики
+        primary, replica = self._queries('get', '/api/recipes/')
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+    def test_read_database_is_per_request(self):
+        seen = []
+        original = replicas.ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            seen.append(original(router, model, **hints))
+            return seen[-1]
+
+        with mock.patch.object(
+            replicas.ReplicaRouter, 'db_for_read', db_for_read
+        ):
+            self.client.get('/api/tags/')
+            self.assertEqual(set(seen), {REPLICA})
+            seen.clear()
+            # Вне запроса — основная БД
+            list(Tag.objects.all())
+        self.assertEqual(seen, [DEFAULT_DB_ALIAS])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        for lag in (settings.REPLICA_MAX_LAG + 1, None):
+            replicas._lag.clear()
+            with mock.patch.object(replicas, 'replica_lag', return_value=lag):
+                primary, replica = self._queries('get', '/api/tags/')
+            self.assertEqual(replica, [], lag)
+            self.assertNotEqual(primary, [], lag)
+
+    def test_lag_is_rechecked_after_interval(self):
+        with mock.patch.object(
+            replicas, 'replica_lag', return_value=0
+        ) as replica_lag:
+            replicas.healthy_replicas()
+            replicas.healthy_replicas()
+            self.assertEqual(replica_lag.call_count, 1)
+            checked_at, lag = replicas._lag[REPLICA]
+            replicas._lag[REPLICA] = (
+                checked_at - settings.REPLICA_CHECK_INTERVAL, lag
+            )
+            self.assertEqual(replicas.healthy_replicas(), [REPLICA])
+            self.assertEqual(replica_lag.call_count, 2)
+
+    def test_tokens_read_from_primary(self):
+        primary, replica = self._queries(
+            'get', '/api/recipes/', **self.headers
+        )
+        self.assertTrue(any('authtoken_token' in sql for sql in primary))
+        self.assertFalse(any('authtoken_token' in sql for sql in replica))
+        self.assertTrue(any('recipes_recipe' in sql for sql in replica))
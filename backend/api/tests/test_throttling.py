@@ -0,0 +1,128 @@
+"""Лимиты запросов: арифметика GCRA, Retry-After и хранилище корзин."""
+import copy
+from unittest import mock
+
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import throttling
+from api.throttling import (
+    AnonBucketThrottle,
+    LocalStore,
+    TokenBucketThrottle,
+    parse_rate,
+    store,
+)
+
+
+def _rates(**rates):
+    config = copy.deepcopy(settings.REST_FRAMEWORK)
+    config['DEFAULT_THROTTLE_RATES'].update(rates)
+    return config
+
+
+class ClientThrottle(TokenBucketThrottle):
+    scope = 'test'
+
+    def get_client(self, request, view):
+        return 'client'
+
+
+@override_settings(THROTTLE_ENABLED=True, REST_FRAMEWORK=_rates(test='3/min'))
+class BucketMathTest(TestCase):
+
+    def setUp(self):
+        store._data.clear()
+        self.now = 1000.0
+        patcher = mock.patch.object(
+            throttling.time, 'time', lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().get('/')
+
+    def _allow(self):
+        throttle = ClientThrottle()
+        return throttle.allow_request(self.request, None), throttle.wait()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('3/min'), (3, 60))
+        self.assertEqual(parse_rate('100/day'), (100, 86400))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+
+    def test_burst_then_refill(self):
+        # Вместимость — 3 запроса, один запрос возвращается за 20 секунд
+        for _ in range(3):
+            self.assertEqual(self._allow(), (True, None))
+        self.assertEqual(self._allow(), (False, 20))
+        self.now += 15
+        self.assertEqual(self._allow(), (False, 5))
+        self.now += 5
+        self.assertEqual(self._allow(), (True, None))
+        self.assertEqual(self._allow(), (False, 20))
+
+    def test_denied_requests_are_not_counted(self):
+        for _ in range(10):
+            self._allow()
+        self.assertEqual(store.get('test:client'), self.now + 60)
+        # Через период корзина снова полная
+        self.now += 60
+        for _ in range(3):
+            self.assertTrue(self._allow()[0])
+
+    def test_idle_client_does_not_save_up(self):
+        self._allow()
+        self.now += 3600
+        for _ in range(3):
+            self.assertTrue(self._allow()[0])
+        self.assertFalse(self._allow()[0])
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(10):
+            self.assertTrue(self._allow()[0])
+        self.assertIsNone(store.get('test:client'))
+
+
+@override_settings(
+    THROTTLE_ENABLED=True, RESPONSE_CACHE_TIMEOUT=0,
+    REST_FRAMEWORK=_rates(anon='2/min')
+)
+class RetryAfterTest(TestCase):
+
+    def setUp(self):
+        store._data.clear()
+
+    def test_retry_after_header(self):
+        client = APIClient()
+        with mock.patch.object(throttling.time, 'time', return_value=1000.0):
+            for _ in range(2):
+                self.assertEqual(client.get('/api/tags/').status_code, 200)
+            response = client.get('/api/tags/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        # Другой IP — своя корзина
+        self.assertEqual(
+            client.get('/api/tags/', REMOTE_ADDR='10.0.0.2').status_code, 200
+        )
+
+    def test_anon_throttle_skips_users(self):
+        request = RequestFactory().get('/')
+        request.user = mock.Mock(is_authenticated=True)
+        self.assertIsNone(AnonBucketThrottle().get_client(request, None))
+
+
+class LocalStoreTest(TestCase):
+
+    @mock.patch.object(throttling, 'MAX_KEYS', 3)
+    def test_evicts_least_recently_set(self):
+        local = LocalStore()
+        for key in 'abc':
+            local.set(key, 1, 60)
+        local.set('a', 2, 60)
+        local.set('d', 1, 60)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(len(local._data), 3)
+        self.assertEqual(list(local._data), ['c', 'a', 'd'])
+        self.assertEqual(local.get('a'), 2)
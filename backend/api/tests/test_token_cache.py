@@ -0,0 +1,79 @@
+"""Кэш токенов сбрасывается при выходе, смене пароля и блокировке."""
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import _shared_key, get_cached_token, tokens
+from recipes.models import FoodgramUser
+
+PASSWORD = 'old-password-1'
+
+
+@override_settings(THROTTLE_ENABLED=False, TOKEN_CACHE_SHARED=True)
+class TokenCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = FoodgramUser.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Анна', last_name='Иванова', password=PASSWORD
+        )
+
+    def setUp(self):
+        cache.clear()
+        tokens.clear()
+        self.key = APIClient().post('/api/auth/token/login/', {
+            'email': self.user.email, 'password': PASSWORD,
+        }).json()['auth_token']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def _me(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/me/')
+        token_queries = [
+            query for query in queries.captured_queries
+            if 'authtoken_token' in query['sql']
+        ]
+        return response.status_code, len(token_queries)
+
+    def assertForgotten(self):
+        self.assertIsNone(tokens.get(self.key))
+        self.assertIsNone(cache.get(_shared_key(self.key)))
+
+    def test_token_is_cached(self):
+        self.assertEqual(self._me(), (200, 1))
+        self.assertIsNotNone(get_cached_token(self.key))
+        self.assertIsNotNone(cache.get(_shared_key(self.key)))
+        self.assertEqual(self._me(), (200, 0))
+        # Вход меняет только last_login и кэш не сбрасывает
+        APIClient().post('/api/auth/token/login/', {
+            'email': self.user.email, 'password': PASSWORD,
+        })
+        self.assertIsNotNone(tokens.get(self.key))
+
+    def test_logout(self):
+        self._me()
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertForgotten()
+        self.assertEqual(self._me()[0], 401)
+
+    def test_password_change(self):
+        self._me()
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': PASSWORD, 'new_password': 'new-password-2',
+        })
+        self.assertEqual(response.status_code, 204)
+        self.assertForgotten()
+        # Токен djoser остаётся действительным, но читается заново
+        self.assertEqual(self._me(), (200, 1))
+
+    def test_deactivation(self):
+        self._me()
+        self.user.is_active = False
+        self.user.save()
+        self.assertForgotten()
+        self.assertEqual(self._me()[0], 401)
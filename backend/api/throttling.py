@@ -0,0 +1,148 @@
+"""
+Ограничение частоты запросов алгоритмом token bucket.
+
+Корзина хранится как одно число — теоретическое время следующего
+запроса (GCRA, эквивалент token bucket), поэтому проверка — это чтение
+и запись одного ключа словаря без блокировок. Гонка двух потоков может
+пропустить лишний запрос, но не заблокирует клиента по ошибке.
+"""
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Сколько корзин держать в памяти процесса
+MAX_KEYS = 100000
+
+
+class LocalStore:
+    """
+    Хранилище корзин в словаре процесса.
+
+    Словарь упорядочен по времени записи: сверх MAX_KEYS вытесняются
+    давно не обновлявшиеся корзины, они же первыми истекают.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, timeout):
+        # pop и вставка вместо move_to_end: ключ мог вытеснить другой поток
+        self._data.pop(key, None)
+        self._data[key] = value
+        while len(self._data) > MAX_KEYS:
+            try:
+                self._data.popitem(last=False)
+            except KeyError:
+                break
+
+
+class SharedStore:
+    """Хранилище корзин в общем кэше CACHES для нескольких процессов."""
+
+    def get(self, key):
+        return cache.get(f'throttle:{key}')
+
+    def set(self, key, value, timeout):
+        cache.set(f'throttle:{key}', value, timeout)
+
+
+store = SharedStore() if settings.THROTTLE_SHARED else LocalStore()
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'10/min' -> (10, 60), как в SimpleRateThrottle."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Базовый класс: корзина на (scope, клиент).
+
+    Вместимость и скорость пополнения задаются строкой 'число/период' в
+    DEFAULT_THROTTLE_RATES: за период корзина наполняется на число
+    запросов, и столько же можно сделать разом.
+    """
+
+    scope = None
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_client(self, request, view):
+        """Идентификатор клиента или None, если ограничение не действует."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = self.get_scope(view)
+        rate = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].get(scope)
+        client = self.get_client(request, view) if rate else None
+        if client is None:
+            return True
+        count, period = parse_rate(rate)
+        interval = period / count
+        now = time.time()
+        key = f'{scope}:{client}'
+        arrival = max(store.get(key) or now, now) + interval
+        # Корзина пуста, если очередь запросов ушла дальше, чем на период
+        if arrival - now > period:
+            self.retry_after = arrival - now - period
+            return False
+        store.set(key, arrival, period)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """Общий лимит авторизованного пользователя."""
+
+    scope = 'user'
+
+    def get_client(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """Общий лимит анонимного клиента по IP."""
+
+    scope = 'anon'
+
+    def get_client(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    """
+    Лимит дорогого эндпоинта на пользователя или IP.
+
+    Scope берётся из throttle_scope представления или из словаря
+    throttle_scopes по имени действия вьюсета.
+    """
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None) or getattr(
+            view, 'throttle_scopes', {}
+        ).get(getattr(view, 'action', None))
+
+    def get_client(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -12,9 +13,36 @@ router.register(
     'ingredients', views.IngredientViewSet, basename='ingredients'
 )
 router.register('tags', views.TagViewSet)
+router.register('jobs', views.JobViewSet, basename='jobs')
 
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views
+
+    urlpatterns = [
+        path(
+            'recipes/', async_views.recipe_list_view, name='recipes-list'
+        ),
+        path(
+            'recipes/<int:pk>/', async_views.recipe_detail_view,
+            name='recipes-detail'
+        ),
+        path(
+            'ingredients/', async_views.ingredient_list_view,
+            name='ingredients-list'
+        ),
+        path(
+            'ingredients/<int:pk>/', async_views.ingredient_detail_view,
+            name='ingredients-detail'
+        ),
+        path('tags/', async_views.tag_list_view, name='tag-list'),
+        path(
+            'tags/<int:pk>/', async_views.tag_detail_view,
+            name='tag-detail'
+        ),
+    ] + urlpatterns
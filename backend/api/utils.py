@@ -1,7 +1,8 @@
-from collections import defaultdict
 from django.template.loader import render_to_string
 from django.utils import timezone
 
+from recipes.shopping_list import shopping_list_totals
+
 
 def generate_shopping_list(user):
     MONTH_NAMES = {
@@ -16,19 +17,13 @@ def generate_shopping_list(user):
     formatted_date = f'{day} {month} {year}'
 
     recipes = [
-        item.recipe for item in user.shopping_carts.select_related('recipe')
+        item.recipe for item in
+        user.shopping_carts.select_related('recipe__author')
     ]
-    ingredients = defaultdict(lambda: {'amount': 0, 'unit': ''})
-    for cart_item in user.shopping_carts.all():
-        for ingredient in cart_item.recipe.ingredients.all():
-            amount = ingredient.recipe_ingredients.get(
-                recipe=cart_item.recipe).amount
-            ingredients[ingredient.name]['amount'] += amount
-            ingredients[ingredient.name]['unit'] = ingredient.measurement_unit
 
     context = {
         'date': formatted_date,
         'recipes': recipes,
-        'total_ingredients': sorted(ingredients.items())
+        'total_ingredients': shopping_list_totals(user.pk)
     }
     return render_to_string('shopping_list.txt', context)
@@ -1,44 +1,191 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import FileResponse
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import serializers, status, viewsets
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
+from jobs.models import Job
+from recipes.deletion import delete_recipes, delete_users
 from recipes.models import (
     Favorite,
     Follow,
     Ingredient,
     Recipe,
     ShoppingCart,
+    SimilarRecipe,
     Tag,
 )
+from recipes.shopping_list import (
+    add_to_shopping_lists,
+    remove_from_shopping_lists,
+    shopping_list_totals,
+)
+from .cache import (
+    GLOBAL_VERSION_KEY,
+    RECIPE_LIST_VERSION_KEY,
+    cache_response,
+    get_cached_response,
+    response_cache_key,
+)
+from .facets import recipe_facets
+from .fast_read import INGREDIENT_FIELDS, TAG_FIELDS
+from .fieldsets import only_fields, parse_fieldset
 from .filters import RecipeFilter, IngredientFilter
+from .idempotency import idempotent
+from .media import media_response
+from .metrics import registry, track
 from .pagination import Pagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     AvatarSerializer,
     IngredientSerializer,
+    JobSerializer,
     RecipeEditCreateSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     ShortRecipeSerializer,
     SubscribedUserSerializer,
     TagSerializer,
 )
 from .utils import generate_shopping_list
+from .writes import create_link, create_links, delete_link, delete_links
 
 User = get_user_model()
 
 
-class FoodgramUserViewSet(UserViewSet):
+class FastReadMixin:
+    """Отдаёт list и retrieve строками .values() в обход сериализатора."""
+
+    fast_read_fields = None
+
+    def get_fast_queryset(self):
+        return self.filter_queryset(self.get_queryset()).values(
+            *self.fast_read_fields
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_FAST_READ:
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_fast_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.API_FAST_READ:
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            row = self.get_fast_queryset().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            # Как get_object_or_404 в DRF: некорректный id — это 404
+            row = None
+        if row is None:
+            raise Http404(
+                f'No {self.queryset.model._meta.object_name} '
+                'matches the given query.'
+            )
+        return Response(row)
+
+
+class CachedListMixin:
+    """
+    Хранит готовые JSON-ответы list в кэше вместе со сжатыми вариантами.
+
+    Ответы действуют до смены версии response_version_key. При
+    cache_anonymous_only кэшируются только ответы анонимам.
+    """
+
+    response_version_key = None
+    cache_anonymous_only = False
+
+    def _list_cache_key(self, request):
+        if (
+            not settings.RESPONSE_CACHE_TIMEOUT
+            or request.accepted_renderer.format != 'json'
+            or self.cache_anonymous_only and request.user.is_authenticated
+        ):
+            return None
+        return response_cache_key(request, self.response_version_key)
+
+    def list(self, request, *args, **kwargs):
+        key = self._list_cache_key(request)
+        if key is not None:
+            cached = get_cached_response(key)
+            if cached is not None:
+                return cached
+        self.list_cache_key = key
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key = getattr(self, 'list_cache_key', None)
+        if key is not None and response.status_code == status.HTTP_200_OK:
+            cache_response(key, response.render())
+        return response
+
+
+class FieldsetMixin:
+    """Выбор полей ответа параметрами ?fields= и ?omit= при чтении."""
+
+    fieldset_actions = ('list', 'retrieve')
+
+    def get_fieldset(self):
+        if (
+            self.action not in self.fieldset_actions
+            or self.request.method not in SAFE_METHODS
+        ):
+            return None
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = parse_fieldset(
+                self.request.query_params,
+                self.get_serializer_class().Meta.fields
+            )
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            context['fields'] = fieldset
+        return context
+
+
+class FoodgramUserViewSet(FieldsetMixin, UserViewSet):
     """Вьюсет для работы с пользователями."""
 
     pagination_class = Pagination
+    fieldset_actions = ('list', 'retrieve', 'me')
+    throttle_scopes = {
+        'me_avatar': 'uploads',
+        'subscriptions': 'subscriptions',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        return only_fields(queryset, fieldset)
+
+    def perform_destroy(self, instance):
+        delete_users([instance.pk])
 
     @action(
         detail=False,
@@ -80,35 +227,45 @@ class FoodgramUserViewSet(UserViewSet):
         pagination_class=Pagination
     )
     def subscriptions(self, request):
+        fieldset = parse_fieldset(
+            request.query_params, SubscribedUserSerializer.Meta.fields
+        )
+        queryset = User.objects.filter(authors__user=request.user)
+        context = {'request': request}
+        if fieldset is not None:
+            queryset = only_fields(queryset, fieldset)
+            context['fields'] = fieldset
+        if fieldset is None or {'recipes', 'recipes_count'} & set(fieldset):
+            queryset = queryset.prefetch_related('recipes')
         serializer = SubscribedUserSerializer(
-            self.paginate_queryset(
-                User.objects.filter(authors__user=request.user)
-                .prefetch_related('recipes')
-            ),
-            many=True, context={'request': request}
+            self.paginate_queryset(queryset), many=True, context=context
         )
-        return self.get_paginated_response(serializer.data)
+        with track('serializer'):
+            data = serializer.data
+        return self.get_paginated_response(data)
 
     @action(
         detail=True,
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,),
     )
+    @idempotent
     def subscribe(self, request, id):
         if request.method == 'DELETE':
-            get_object_or_404(
-                Follow, user=request.user, following_id=id
-            ).delete()
+            if not delete_link(
+                Follow, 'following', id, user=request.user.pk
+            ):
+                raise Http404('No Follow matches the given query.')
             return Response(status=status.HTTP_204_NO_CONTENT)
 
-        following = get_object_or_404(User, pk=id)
-        if request.user == following:
+        if str(request.user.pk) == str(id):
             raise serializers.ValidationError(
                 {'error': 'Нельзя подписываться на себя!'}
             )
-        _, created = Follow.objects.get_or_create(
-            user=request.user, following=following
+        created = create_link(
+            Follow, 'following', id, user=request.user.pk
         )
+        following = get_object_or_404(User, pk=id)
         if not created:
             raise serializers.ValidationError(
                 {'error': f'Вы уже подписаны на {following.username}'}
@@ -121,14 +278,33 @@ class FoodgramUserViewSet(UserViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin, FieldsetMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с рецептами."""
 
+    response_version_key = RECIPE_LIST_VERSION_KEY
+    fieldset_actions = ('list', 'retrieve', 'similar')
+    # Признаки избранного и корзины зависят от пользователя
+    cache_anonymous_only = True
     pagination_class = Pagination
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.select_related('author')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
+    # Декодирование изображений из Base64 и сборка списка покупок
+    throttle_scopes = {
+        'create': 'uploads',
+        'partial_update': 'uploads',
+        'download_shopping_cart': 'shopping_list',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        if 'author' not in fieldset:
+            queryset = queryset.select_related(None)
+        return only_fields(queryset, fieldset)
 
     def get_serializer_class(self):
         if self.action in ['partial_update', 'create']:
@@ -138,6 +314,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_recipes([instance.pk])
+
     @action(
         detail=True,
         methods=('get',),
@@ -159,11 +338,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=True, methods=('get',))
+    def similar(self, request, pk):
+        recipes = [
+            # При равном сходстве выше более старый, как в индексе
+            link.similar for link in SimilarRecipe.objects.filter(
+                recipe_id=pk
+            ).select_related('similar').order_by('-score', 'similar_id')
+        ]
+        if not recipes and not Recipe.objects.filter(pk=pk).exists():
+            raise NotFound(
+                detail={'error': f'Рецепт с id={pk} не найден.'}
+            )
+        return Response(self.get_serializer(recipes, many=True).data)
+
+    @action(detail=False, methods=('get',))
+    def facets(self, request):
+        return Response(recipe_facets(request))
+
     @action(
         detail=True,
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def favorite(self, request, pk):
         return self._handle_favorite_or_cart(request, pk, Favorite)
 
@@ -172,9 +370,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         return self._handle_favorite_or_cart(request, pk, ShoppingCart)
 
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite/batch'
+    )
+    def favorite_batch(self, request):
+        return self._handle_batch(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart/batch'
+    )
+    def shopping_cart_batch(self, request):
+        return self._handle_batch(request, ShoppingCart)
+
     @action(
         detail=False,
         methods=('get',),
@@ -188,21 +405,81 @@ class RecipeViewSet(viewsets.ModelViewSet):
             content_type='text/plain'
         )
 
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_list'
+    )
+    def shopping_list(self, request):
+        return Response(shopping_list_totals(request.user.pk))
+
+    def _handle_batch(self, request, model):
+        """Добавляет или удаляет пачку рецептов одним запросом к БД."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                removed = delete_links(
+                    model, 'recipe', recipe_ids, owner=request.user.pk
+                )
+                if model is ShoppingCart:
+                    remove_from_shopping_lists(removed, request.user.pk)
+                return Response({'results': [
+                    {
+                        'id': pk,
+                        'status': 'removed' if pk in removed else 'absent'
+                    }
+                    for pk in recipe_ids
+                ]})
+
+            added = create_links(
+                model, 'recipe', recipe_ids, owner=request.user.pk
+            )
+            if model is ShoppingCart:
+                add_to_shopping_lists(added, request.user.pk)
+        rest = [pk for pk in recipe_ids if pk not in added]
+        existing = set(
+            Recipe.objects.filter(pk__in=rest).values_list('pk', flat=True)
+        ) if rest else set()
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': (
+                    'added' if pk in added
+                    else 'exists' if pk in existing else 'not_found'
+                )
+            }
+            for pk in recipe_ids
+        ]})
+
     def _handle_favorite_or_cart(self, request, pk, model):
-        user = request.user
         if request.method == 'DELETE':
-            get_object_or_404(model, owner=request.user, recipe_id=pk).delete()
+            with transaction.atomic():
+                removed = delete_links(
+                    model, 'recipe', [pk], owner=request.user.pk
+                )
+                if model is ShoppingCart:
+                    remove_from_shopping_lists(removed, request.user.pk)
+            if not removed:
+                raise Http404(
+                    f'No {model._meta.object_name} matches the given query.'
+                )
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+        with transaction.atomic():
+            added = create_links(
+                model, 'recipe', [pk], owner=request.user.pk
+            )
+            if model is ShoppingCart:
+                add_to_shopping_lists(added, request.user.pk)
         recipe = get_object_or_404(Recipe, pk=pk)
-        _, created = model.objects.get_or_create(
-            owner=user,
-            recipe=recipe,
-        )
-        if not created:
+        if not added:
             raise serializers.ValidationError(
                 {'error': f'Рецепт {recipe.name} уже добавлен в '
-                          f'{self._get_model_name(model)}'}
+                          f'{model._meta.verbose_name.lower()}'}
             )
 
         return Response(
@@ -210,17 +487,75 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class JobViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet
+):
+    """Фоновые задачи пользователя: постановка, статус и результат."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = Pagination
+    throttle_scopes = {'create': 'jobs'}
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        response['Location'] = reverse(
+            'api:jobs-detail', kwargs={'pk': response.data['id']}
+        )
+        return response
+
+    @action(detail=True, methods=('get',))
+    def download(self, request, pk):
+        job = self.get_object()
+        if job.status != Job.Status.DONE or not job.result_file:
+            raise NotFound(detail={'error': 'Результат ещё не готов.'})
+        return media_response(
+            job.result_file.name,
+            filename=(job.result or {}).get(
+                'filename', os.path.basename(job.result_file.name)
+            ),
+            cache_control='private, no-store'
+        )
+
+
+class TagViewSet(
+    CachedListMixin, FastReadMixin, viewsets.ReadOnlyModelViewSet
+):
     """Вьюсет для просмотра тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    response_version_key = GLOBAL_VERSION_KEY
+    fast_read_fields = TAG_FIELDS
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    CachedListMixin, FastReadMixin, viewsets.ReadOnlyModelViewSet
+):
     """Вьюсет для просмотра ингредиентов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    response_version_key = GLOBAL_VERSION_KEY
+    fast_read_fields = INGREDIENT_FIELDS
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
+
+
+def metrics(request):
+    """Гистограммы производительности в формате Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
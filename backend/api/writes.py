@@ -0,0 +1,66 @@
+from django.db import connection
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def create_links(model, target_field, target_ids, **values):
+    """
+    Создаёт связи одним запросом INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+    Строки вставляются только для существующих объектов target_ids, а
+    повторная или одновременная вставка той же связи не ломается на
+    уникальном ограничении. Возвращает множество id, для которых связь
+    действительно создана.
+    """
+    target = model._meta.get_field(target_field).related_model._meta
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        _column(model, name) for name in (*values, target_field)
+    )
+    target_pk = quote(target.pk.column)
+    placeholders = ''.join('%s, ' for _ in values)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'SELECT {placeholders}{target_pk} '
+            f'FROM {quote(target.db_table)} '
+            f'WHERE {target_pk} IN ({", ".join("%s" for _ in target_ids)}) '
+            f'ON CONFLICT DO NOTHING '
+            f'RETURNING {_column(model, target_field)}',
+            [*values.values(), *target_ids]
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def delete_links(model, target_field, target_ids, **values):
+    """
+    Удаляет связи одним запросом DELETE ... RETURNING.
+
+    Возвращает множество id, связь с которыми действительно удалена, так
+    что при одновременных запросах каждое удаление учитывается один раз.
+    """
+    conditions = ' AND '.join(
+        f'{_column(model, name)} = %s' for name in values
+    )
+    target = _column(model, target_field)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+            f'WHERE {conditions} '
+            f'AND {target} IN ({", ".join("%s" for _ in target_ids)}) '
+            f'RETURNING {target}',
+            [*values.values(), *target_ids]
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_link(model, target_field, target_id, **values):
+    """Создаёт одну связь, возвращает True, если строка вставлена."""
+    return bool(create_links(model, target_field, [target_id], **values))
+
+
+def delete_link(model, target_field, target_id, **values):
+    """Удаляет одну связь, возвращает True, если она была."""
+    return bool(delete_links(model, target_field, [target_id], **values))
@@ -24,10 +24,13 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework.authtoken',
     'recipes.apps.RecipesConfig',
-    'api.apps.ApiConfig'
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -38,6 +41,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Повторы запроса с одного места вызова, начиная с которых это N+1
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 5))
+
+if DEBUG:
+    MIDDLEWARE.append('api.query_detector.QueryDetectorMiddleware')
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -77,15 +86,162 @@ else:
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', ''),
             'PORT': os.getenv('DB_PORT', 5432),
+            # Под ASGI постоянные соединения не переиспользуются между
+            # запросами, поэтому там они по умолчанию выключены.
+            'CONN_MAX_AGE': int(os.getenv(
+                'CONN_MAX_AGE',
+                0 if os.getenv('ASYNC_READ_VIEWS') == 'True' else 60
+            )),
+            'CONN_HEALTH_CHECKS': True,
+            # pgbouncer в режиме transaction pooling не поддерживает
+            # серверные курсоры.
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_PGBOUNCER', 'False') == 'True'
+            ),
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
         }
     }
 
+# Реплики только для чтения: хосты PostgreSQL (host или host:port) или,
+# при DB_ENGINE=sqlite, пути к файлам, через запятую
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+    replica for replica in os.getenv('DB_REPLICAS', '').split(',') if replica
+):
+    config = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if os.getenv('DB_ENGINE') == 'sqlite':
+        config['NAME'] = replica
+    else:
+        host, _, port = replica.partition(':')
+        config.update(HOST=host, PORT=port or config['PORT'])
+    DATABASES[f'replica_{number}'] = config
+    REPLICA_DATABASES.append(f'replica_{number}')
+
+# Сколько секунд после записи клиент читает только с основной БД
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+# Реплика с большим отставанием, секунды, не используется
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+# Как часто перепроверять отставание реплик, секунды
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+
+if REPLICA_DATABASES:
+    DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'api.replicas.ReplicaMiddleware')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Общий для всех процессов кэш (Redis, Memcached). Версии фрагментов и
+# ответов в LocMemCache у каждого процесса свои: изменения из другого
+# воркера или команды импорта их не сбрасывают, поэтому без общего кэша
+# кэш фрагментов и ответов по умолчанию выключен
+CACHE_SHARED = 'LocMemCache' not in CACHES['default']['BACKEND']
+
+# Время жизни кэшированных фрагментов рецептов, секунды; 0 отключает кэш
+RECIPE_FRAGMENT_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', 60 * 60 if CACHE_SHARED else 0)
+)
+
+# Готовые ответы списков тегов, ингредиентов и рецептов для анонимов со
+# сжатыми вариантами, секунды; 0 отключает кэш
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 60 if CACHE_SHARED else 0)
+)
+
+# Сжатие ответов API в br (если установлен brotli) или gzip; ответы
+# короче COMPRESSION_MIN_SIZE байт не сжимаются
+API_COMPRESSION = os.getenv('API_COMPRESSION', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+# Сколько хранить ответы на запросы с заголовком Idempotency-Key, секунды;
+# 0 — заголовок не учитывается. Ответы и блокировки должны быть видны всем
+# процессам, поэтому без общего кэша по умолчанию выключено
+IDEMPOTENCY_KEY_TIMEOUT = int(
+    os.getenv('IDEMPOTENCY_KEY_TIMEOUT', 24 * 60 * 60 if CACHE_SHARED else 0)
+)
+
+# Кэш токенов авторизации: размер и время жизни в процессе, секунды, и
+# дублирование в общий кэш CACHES
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 30))
+TOKEN_CACHE_SHARED = os.getenv('TOKEN_CACHE_SHARED', 'False') == 'True'
+
+# Чтение рецептов, тегов и ингредиентов в обход ModelSerializer
+API_FAST_READ = os.getenv('API_FAST_READ', 'True') == 'True'
+
+# Асинхронные представления чтения, имеют смысл только под ASGI-сервером
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Адреса, которым доступен /metrics; пустой список — недоступен никому
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+    if ip
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'api.query_detector': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonBucketThrottle',
+        'api.throttling.UserBucketThrottle',
+        'api.throttling.ScopedBucketThrottle',
+    ],
+    # 'число/период': вместимость корзины и скорость её пополнения
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON', '300/min'),
+        'user': os.getenv('THROTTLE_USER', '1200/min'),
+        'shopping_list': os.getenv('THROTTLE_SHOPPING_LIST', '10/min'),
+        'uploads': os.getenv('THROTTLE_UPLOADS', '30/min'),
+        'subscriptions': os.getenv('THROTTLE_SUBSCRIPTIONS', '60/min'),
+        'jobs': os.getenv('THROTTLE_JOBS', '10/min'),
+    },
+    # Число прокси перед приложением, для IP клиента из X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
+# Ограничение частоты запросов; выключается для нагрузочных тестов
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+# Корзины лимитов в общем кэше CACHES, а не в памяти процесса
+THROTTLE_SHARED = os.getenv('THROTTLE_SHARED', 'False') == 'True'
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -143,6 +299,12 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Файлы из MEDIA_ROOT отдаёт nginx по X-Accel-Redirect из internal-локации
+# MEDIA_ACCEL_PREFIX; без nginx (DEBUG) их отдаёт Django
+MEDIA_ACCEL_REDIRECT = os.getenv(
+    'MEDIA_ACCEL_REDIRECT', str(not DEBUG)
+) == 'True'
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -1,15 +1,17 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from api.media import serve_media
+from api.views import metrics
+
 urlpatterns = [
+    path('metrics', metrics, name='metrics'),
+    path(
+        f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media,
+        name='media'
+    ),
     path('api/', include('api.urls')),
     path('', include('recipes.urls')),
     path('admin/', admin.site.urls),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
@@ -0,0 +1,42 @@
+"""
+Продакшен-профиль gunicorn.
+
+Количество воркеров считается от числа ядер, по умолчанию используются
+gthread-воркеры, а при ASYNC_READ_VIEWS=True — ASGI-воркеры uvicorn.
+Приложение загружается до fork, чтобы воркеры делили память
+копированием при записи.
+"""
+import multiprocessing
+import os
+
+ASYNC = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+wsgi_app = (
+    'backend.asgi:application' if ASYNC else 'backend.wsgi:application'
+)
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS',
+    'uvicorn.workers.UvicornWorker' if ASYNC else 'gthread'
+)
+workers = int(
+    os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+# Перезапуск воркеров ограничивает рост памяти из-за утечек
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Соединения с БД, открытые мастером при preload, не должны
+    # разделяться между воркерами.
+    from django.db import connections
+
+    connections.close_all()
@@ -0,0 +1,31 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'task', 'owner', 'status', 'attempts', 'created_at',
+        'finished_at'
+    )
+    list_filter = ('status', 'task')
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
+    search_fields = ('task', 'owner__email')
+    readonly_fields = (
+        'attempts', 'locked_by', 'locked_at', 'result', 'result_file',
+        'error', 'created_at', 'finished_at'
+    )
+    actions = ('retry',)
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+            error='',
+            finished_at=None
+        )
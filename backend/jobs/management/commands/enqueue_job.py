@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.registry import TASKS, enqueue
+
+
+class Command(BaseCommand):
+    """Постановка фоновой задачи в очередь."""
+
+    help = 'Ставит задачу в очередь, её выполнит run_workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('task', help=f'Одна из: {", ".join(TASKS)}')
+        parser.add_argument(
+            '--kwargs', default='{}', help='Параметры задачи в JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['task'] not in TASKS:
+            raise CommandError(
+                f'Неизвестная задача {options["task"]}, '
+                f'доступны: {", ".join(sorted(TASKS))}'
+            )
+        try:
+            kwargs = json.loads(options['kwargs'])
+        except json.JSONDecodeError as error:
+            raise CommandError(f'Некорректный --kwargs: {error}')
+        job = enqueue(options['task'], **kwargs)
+        self.stdout.write(self.style.SUCCESS(
+            f'Задача {job.task} #{job.id} поставлена в очередь'
+        ))
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import requeue_stale, work
+
+
+class Command(BaseCommand):
+    """Обработчики очереди фоновых задач."""
+
+    help = (
+        'Запускает пул обработчиков очереди задач из БД: --processes '
+        'процессов по --threads потоков. Внешний брокер не нужен.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Пауза между опросами пустой очереди, секунды'
+        )
+        parser.add_argument(
+            '--stale-timeout', type=int, default=60 * 60,
+            help='Через сколько секунд задача без ответа от обработчика '
+                 'возвращается в очередь'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+
+    def _run_threads(self, options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(
+                target=work,
+                args=(
+                    f'{prefix}:{number}', stop, options['poll_interval'],
+                    options['burst']
+                ),
+                daemon=True
+            )
+            for number in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        # join с таймаутом, чтобы главный поток получал сигналы
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(options['stale_timeout'])
+        if requeued:
+            self.stdout.write(
+                f'Возвращено в очередь зависших задач: {requeued}'
+            )
+        self.stdout.write(
+            f'Обработчики: {options["processes"]} x {options["threads"]}'
+        )
+        if options['processes'] <= 1:
+            self._run_threads(options)
+            return
+        # Соединения с БД не должны переходить в дочерние процессы
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=self._run_threads, args=(options,))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop_processes(*args):
+            # SIGTERM дочерним: они доделают текущие задачи и выйдут
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop_processes)
+        for process in processes:
+            process.join()
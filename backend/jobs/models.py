@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди на таблице БД."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    task = models.CharField('Задача', max_length=64)
+    kwargs = models.JSONField('Параметры', default=dict, blank=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Владелец'
+    )
+    status = models.CharField(
+        'Статус', max_length=16, choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3
+    )
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    locked_by = models.CharField('Обработчик', max_length=64, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    result = models.JSONField('Результат', null=True, blank=True)
+    result_file = models.FileField('Файл результата', upload_to='jobs/',
+                                   blank=True)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        default_related_name = 'jobs'
+        ordering = ('-created_at',)
+        indexes = [
+            models.Index(
+                fields=('status', 'run_after'), name='job_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.id} ({self.get_status_display()})'
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import transaction
+
+from .models import Job
+
+TASKS = {}
+# Сколько значений enqueue_merged собирает в одну задачу
+MERGE_LIMIT = 1000
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    max_attempts: int
+    access: str
+    keep_done: bool
+
+    def allowed_for(self, user):
+        """Может ли пользователь поставить задачу через API."""
+        if self.access == USER:
+            return user.is_authenticated
+        if self.access == STAFF:
+            return user.is_staff
+        return False
+
+
+# Кто может ставить задачу через API; без access — только из кода и CLI
+USER = 'user'
+STAFF = 'staff'
+
+
+def task(name, max_attempts=3, access=None, keep_done=True):
+    """
+    Регистрирует функцию как фоновую задачу.
+
+    Функция получает объект Job и его kwargs, возвращает JSON-совместимый
+    результат и может сохранить файл в job.result_file. Выполненные
+    задачи с keep_done=False удаляются, а не копятся в таблице.
+    """
+    def decorator(func):
+        TASKS[name] = Task(name, func, max_attempts, access, keep_done)
+        return func
+    return decorator
+
+
+def enqueue(name, /, owner=None, **kwargs):
+    """Ставит задачу в очередь и возвращает созданный Job."""
+    if name not in TASKS:
+        raise KeyError(f'Неизвестная задача: {name}')
+    return Job.objects.create(
+        task=name,
+        kwargs=kwargs,
+        owner=owner,
+        max_attempts=TASKS[name].max_attempts
+    )
+
+
+def enqueue_merged(name, field, values, limit=MERGE_LIMIT):
+    """
+    Добавляет values в список kwargs[field] задачи name, которую ещё не
+    взял обработчик, или ставит новую задачу.
+
+    Так значение, изменённое несколько раз до обработки, попадает в
+    очередь один раз. Список одной задачи не больше limit значений.
+    """
+    values = set(values)
+    with transaction.atomic():
+        # Блокировка строки не даёт обработчику взять задачу, пока
+        # меняется её список
+        job = Job.objects.select_for_update().filter(
+            task=name, status=Job.Status.PENDING, attempts=0
+        ).order_by('id').first()
+        if job is not None:
+            merged = values | set(job.kwargs[field])
+            if len(merged) <= limit:
+                job.kwargs = {**job.kwargs, field: sorted(merged)}
+                job.save(update_fields=('kwargs',))
+                return job
+        return enqueue(name, **{field: sorted(values)})
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.worker import claim, execute
+from recipes.models import FoodgramUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT=False, THROTTLE_ENABLED=False
+)
+class JobApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.stranger = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass'
+            )
+            for name in ('owner', 'stranger')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def _create(self, task='shopping_list'):
+        return self.client.post('/api/jobs/', {'task': task}, format='json')
+
+    def test_create(self):
+        response = self._create()
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual(job.owner, self.owner)
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertTrue(response['Location'].endswith(f'/api/jobs/{job.id}/'))
+        self.assertIsNone(response.json()['download'])
+
+    def test_task_access(self):
+        # export_recipes только для персонала, management_command — только
+        # из кода
+        for task in ('export_recipes', 'management_command', 'unknown'):
+            response = self._create(task)
+            self.assertEqual(response.status_code, 400, task)
+            self.assertIn('task', response.json())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(APIClient().get('/api/jobs/').status_code, 401)
+
+    def test_only_owner_sees_job(self):
+        job_id = self._create().json()['id']
+        self.assertEqual(
+            self.client.get(f'/api/jobs/{job_id}/download/').status_code, 404
+        )
+        with self.assertLogs('jobs', 'INFO'):
+            execute(claim('w1'))
+        response = self.client.get(f'/api/jobs/{job_id}/')
+        self.assertEqual(response.json()['status'], Job.Status.DONE)
+        download = self.client.get(f'/api/jobs/{job_id}/download/')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Cache-Control'], 'private, no-store')
+        self.assertIn('shopping_list.txt', download['Content-Disposition'])
+
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.client.get('/api/jobs/').json()['count'], 0)
+        for url in (f'/api/jobs/{job_id}/', f'/api/jobs/{job_id}/download/'):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
@@ -0,0 +1,175 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import TASKS, enqueue, enqueue_merged, task
+from jobs.worker import (
+    MAX_RETRY_DELAY,
+    claim,
+    execute,
+    requeue_stale,
+    retry_delay,
+    work,
+)
+
+
+class WorkerTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(TASKS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+        @task('test_echo')
+        def echo(job, **kwargs):
+            self.calls.append(kwargs)
+            return kwargs
+
+        @task('test_fail', max_attempts=2)
+        def fail(job):
+            raise RuntimeError('сбой')
+
+        @task('test_internal', keep_done=False)
+        def internal(job, **kwargs):
+            self.calls.append(kwargs)
+
+    def test_claim_takes_job_once(self):
+        job = enqueue('test_echo')
+        claimed = claim('w1')
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claimed.locked_by, 'w1')
+        self.assertIsNone(claim('w2'))
+
+    def test_claim_skips_jobs_taken_by_others(self):
+        first, second = enqueue('test_echo'), enqueue('test_echo')
+        update = QuerySet.update
+
+        def rival_first(queryset, **kwargs):
+            # Другой обработчик успел забрать задачу между выбором
+            # кандидатов и UPDATE
+            if not Job.objects.filter(locked_by='rival').exists():
+                update(
+                    Job.objects.filter(pk=first.id),
+                    status=Job.Status.RUNNING, locked_by='rival'
+                )
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', rival_first):
+            claimed = claim('w1')
+        self.assertEqual(claimed.id, second.id)
+        first.refresh_from_db()
+        self.assertEqual(first.locked_by, 'rival')
+        self.assertEqual(first.attempts, 0)
+
+    def test_claim_waits_for_run_after(self):
+        job = enqueue('test_echo')
+        Job.objects.filter(pk=job.id).update(
+            run_after=timezone.now() + timedelta(minutes=1)
+        )
+        self.assertIsNone(claim('w1'))
+
+    def test_execute_done(self):
+        enqueue('test_echo', value=1)
+        with self.assertLogs('jobs', 'INFO'):
+            job = execute(claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.result, {'value': 1})
+        self.assertEqual(job.locked_by, '')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_with_backoff(self):
+        enqueue('test_fail')
+        before = timezone.now()
+        with self.assertLogs('jobs', 'ERROR'):
+            job = execute(claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertIn('RuntimeError: сбой', job.error)
+        self.assertGreaterEqual(job.run_after, before + retry_delay(1))
+        self.assertIsNone(claim('w1'))
+
+    def test_terminal_failure(self):
+        enqueue('test_fail')
+        Job.objects.update(attempts=1)
+        with self.assertLogs('jobs', 'ERROR'):
+            job = execute(claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIsNotNone(job.finished_at)
+        # Неизвестную задачу не повторяют
+        unknown = Job.objects.create(task='test_unknown')
+        with self.assertLogs('jobs', 'ERROR'):
+            execute(claim('w1'))
+        unknown.refresh_from_db()
+        self.assertEqual(unknown.status, Job.Status.FAILED)
+        self.assertIn('LookupError', unknown.error)
+
+    def test_retry_delay(self):
+        self.assertEqual(
+            [retry_delay(attempts).total_seconds() for attempts in (1, 2, 3)],
+            [2, 4, 8]
+        )
+        self.assertEqual(retry_delay(50).total_seconds(), MAX_RETRY_DELAY)
+
+    def test_keep_done_false_deletes_job(self):
+        enqueue('test_internal', ids=[1])
+        with self.assertLogs('jobs', 'INFO'):
+            execute(claim('w1'))
+        self.assertEqual(self.calls, [{'ids': [1]}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_enqueue_merged(self):
+        job = enqueue_merged('test_internal', 'ids', [3, 1])
+        self.assertEqual(
+            enqueue_merged('test_internal', 'ids', [2, 3]).id, job.id
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.kwargs, {'ids': [1, 2, 3]})
+        # Взятую обработчиком задачу не дополняют
+        claim('w1')
+        other = enqueue_merged('test_internal', 'ids', [4])
+        self.assertNotEqual(other.id, job.id)
+        # Задачу после неудачной попытки тоже
+        Job.objects.filter(pk=other.id).update(attempts=1)
+        self.assertNotEqual(
+            enqueue_merged('test_internal', 'ids', [5]).id, other.id
+        )
+
+    def test_enqueue_merged_limit(self):
+        job = enqueue_merged('test_internal', 'ids', [1, 2], limit=3)
+        self.assertEqual(
+            enqueue_merged('test_internal', 'ids', [3], limit=3).id, job.id
+        )
+        self.assertNotEqual(
+            enqueue_merged('test_internal', 'ids', [4], limit=3).id, job.id
+        )
+
+    def test_requeue_stale(self):
+        enqueue('test_echo')
+        job = claim('w1')
+        Job.objects.filter(pk=job.id).update(
+            locked_at=timezone.now() - timedelta(minutes=10)
+        )
+        self.assertEqual(requeue_stale(60), 1)
+        self.assertEqual(claim('w2').attempts, 2)
+
+    def test_work_burst(self):
+        for value in range(3):
+            enqueue('test_internal', value=value)
+        with mock.patch('jobs.worker.connection.close'), \
+                self.assertLogs('jobs', 'INFO'):
+            work('w1', threading.Event(), 0.1, burst=True)
+        self.assertEqual(
+            self.calls, [{'value': value} for value in range(3)]
+        )
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,107 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import TASKS
+
+logger = logging.getLogger('jobs')
+
+# Сколько кандидатов просматривать за одну попытку взять задачу
+CLAIM_CANDIDATES = 10
+MAX_RETRY_DELAY = 60 * 60
+
+
+def claim(worker_id):
+    """
+    Берёт в работу следующую готовую задачу или возвращает None.
+
+    Задачу забирает тот, чей UPDATE ... WHERE status = 'pending' изменил
+    строку, поэтому одновременные обработчики не получат одну задачу.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.Status.PENDING, run_after__lte=now
+    ).order_by('run_after', 'id').values_list('id', flat=True)
+    for job_id in candidates[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(
+            pk=job_id, status=Job.Status.PENDING
+        ).update(
+            status=Job.Status.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед повтором: 2, 4, 8 ... секунд."""
+    return timedelta(seconds=min(2 ** attempts, MAX_RETRY_DELAY))
+
+
+def execute(job):
+    """Выполняет задачу и сохраняет результат, ошибку или повтор."""
+    task = TASKS.get(job.task)
+    try:
+        if task is None:
+            raise LookupError(f'Неизвестная задача: {job.task}')
+        job.result = task.func(job, **job.kwargs)
+    except Exception:
+        logger.exception('Задача %s #%s завершилась ошибкой', job.task, job.id)
+        job.error = traceback.format_exc()
+        if task is not None and job.attempts < job.max_attempts:
+            job.status = Job.Status.PENDING
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+    else:
+        logger.info('Задача %s #%s выполнена', job.task, job.id)
+        if not task.keep_done:
+            job.delete()
+            return job
+        job.status = Job.Status.DONE
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=(
+        'status', 'result', 'result_file', 'error', 'run_after',
+        'locked_by', 'locked_at', 'finished_at'
+    ))
+    return job
+
+
+def requeue_stale(timeout):
+    """Возвращает в очередь задачи упавших обработчиков."""
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=Job.Status.PENDING, locked_by='', locked_at=None)
+
+
+def work(worker_id, stop, poll_interval, burst=False):
+    """
+    Цикл обработчика: берёт задачи, пока не выставлено событие stop.
+
+    В режиме burst выходит, как только очередь опустела.
+    """
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim(worker_id)
+            if job is None:
+                if burst:
+                    return
+                stop.wait(poll_interval)
+                continue
+            execute(job)
+    finally:
+        connection.close()
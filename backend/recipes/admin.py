@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
 from django.utils.safestring import mark_safe
 
-from .filters import CookingTimeFilter
+from .deletion import delete_recipes, delete_users, deleted_counts
+from .filters import AutocompleteFilter, CookingTimeFilter
 from .models import (
     FoodgramUser,
     Follow,
@@ -14,6 +15,7 @@ from .models import (
     Tag,
     Favorite,
 )
+from .shopping_list import changing_recipe_ingredients
 
 
 def count_method(field_name, description):
@@ -45,14 +47,70 @@ def image_display(
     return method
 
 
+class AutocompleteFilterMixin:
+    """Подключает к странице списка скрипты фильтров AutocompleteFilter."""
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        context = getattr(response, 'context_data', None) or {}
+        if 'cl' in context:
+            for spec in context['cl'].filter_specs:
+                if isinstance(spec, AutocompleteFilter):
+                    context['media'] += spec.media
+        return response
+
+
+class BulkDeleteMixin:
+    """
+    Удаление через recipes.deletion: подтверждение показывает число
+    строк по моделям, а не каждую зависимую запись, удаление идёт
+    запросами по пачкам.
+
+    Админка задаёт методы deleted_counts(ids) и bulk_delete(ids).
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        counts = {
+            model: count
+            for model, count in self.deleted_counts(
+                [obj.pk for obj in objs]
+            ).items()
+            if count
+        }
+        perms_needed = {
+            model._meta.verbose_name for model in counts
+            if model in self.admin_site._registry
+            and not self.admin_site._registry[model].has_delete_permission(
+                request
+            )
+        }
+        return (
+            [str(obj) for obj in objs],
+            {
+                model._meta.verbose_name_plural: count
+                for model, count in counts.items()
+            },
+            perms_needed,
+            []
+        )
+
+    def delete_model(self, request, obj):
+        self.bulk_delete([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.bulk_delete(list(queryset.values_list('pk', flat=True)))
+
+
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(FoodgramUser)
-class FoodgramUserAdmin(UserAdmin):
+class FoodgramUserAdmin(BulkDeleteMixin, UserAdmin):
     list_display = (
         'id', 'email', 'full_name', 'username', 'avatar_display',
         'recipe_count', 'follower_count', 'following_count'
@@ -83,18 +141,29 @@ class FoodgramUserAdmin(UserAdmin):
     def full_name(self, obj):
         return f'{obj.last_name} {obj.first_name}'
 
+    def deleted_counts(self, ids):
+        return deleted_counts(users=ids)
+
+    def bulk_delete(self, ids):
+        delete_users(ids)
+
 
 @admin.register(ShoppingCart, Favorite)
-class UserRecipeRelationAdmin(admin.ModelAdmin):
+class UserRecipeRelationAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Базовый класс для моделей связи пользователь-рецепт."""
 
     list_display = ('id', 'owner', 'recipe')
-    list_filter = ('owner', 'recipe__tags')
+    list_select_related = ('owner', 'recipe')
+    list_filter = (('owner', AutocompleteFilter), 'recipe__tags')
+    autocomplete_fields = ('owner', 'recipe')
+    show_full_result_count = False
     search_fields = ('recipe__name', 'owner__email')
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(
+    BulkDeleteMixin, AutocompleteFilterMixin, admin.ModelAdmin
+):
     list_display = (
         'id', 'name', 'cooking_time', 'author',
         'favorites_count', 'ingredients_list',
@@ -102,12 +171,31 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_display_links = ('id', 'name')
     search_fields = ('name', 'author__username')
-    list_filter = ('tags', 'author', CookingTimeFilter)
+    list_filter = ('tags', ('author', AutocompleteFilter), CookingTimeFilter)
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
     readonly_fields = ('favorites_count', 'image_preview')
     favorites_count = count_method('favorites', 'В избранном')
     image_preview = image_display('image')
     inlines = (RecipeIngredientInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related('tags', 'recipe_ingredients__ingredient')
+
+    def deleted_counts(self, ids):
+        return deleted_counts(recipes=ids)
+
+    def bulk_delete(self, ids):
+        delete_recipes(ids)
+
+    def save_related(self, request, form, formsets, change):
+        if not change:
+            return super().save_related(request, form, formsets, change)
+        with changing_recipe_ingredients([form.instance.id]):
+            super().save_related(request, form, formsets, change)
+
     @admin.display(description='Ингредиенты')
     @mark_safe
     def ingredients_list(self, recipe):
@@ -145,20 +233,47 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    list_filter = ('recipe', 'ingredient')
+    list_select_related = ('recipe', 'ingredient')
+    list_filter = (
+        ('recipe', AutocompleteFilter), ('ingredient', AutocompleteFilter)
+    )
+    autocomplete_fields = ('recipe', 'ingredient')
+    show_full_result_count = False
     search_fields = ('recipe__name', 'ingredient__name')
 
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id}
+        if change:
+            recipe_ids.add(form.initial['recipe'])
+        with changing_recipe_ingredients(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with changing_recipe_ingredients([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with changing_recipe_ingredients(
+            set(queryset.values_list('recipe_id', flat=True))
+        ):
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'following')
+    list_select_related = ('user', 'following')
     search_fields = (
         'following__username', 'user__username',
         'following__email', 'user__email'
     )
-    list_filter = ('user', 'following')
+    list_filter = (
+        ('user', AutocompleteFilter), ('following', AutocompleteFilter)
+    )
+    autocomplete_fields = ('user', 'following')
+    show_full_result_count = False
 
 
 admin.site.unregister(Group)
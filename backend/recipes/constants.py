@@ -3,3 +3,21 @@ EMAIL_LENGTH = 254
 FIRST_NAME_LENGTH = 150
 LAST_NAME_LENGTH = 150
 MIN_AMOUNT = 1
+MAX_BATCH_SIZE = 100
+# Единица измерения -> (базовая единица, множитель); суммы в списке
+# покупок считаются в базовых единицах
+UNIT_CONVERSIONS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+# Базовая единица -> (крупная единица, во сколько раз крупнее) для вывода
+LARGER_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+# Сколько похожих рецептов хранить для каждого рецепта
+SIMILAR_RECIPES_COUNT = 10
+# Вес тега относительно продукта при поиске похожих рецептов
+SIMILAR_TAG_WEIGHT = 0.5
@@ -0,0 +1,182 @@
+"""
+Массовое удаление пользователей и рецептов.
+
+Коллектор Django перед удалением загружает каждую зависимую строку и
+вызывает сигналы по одной: удаление автора с тысячами рецептов тянет
+в память все их продукты, избранное и корзины. Здесь зависимые таблицы
+чистятся запросами DELETE ... WHERE ... IN пачками по id, а работа
+построчных сигналов делается одним запросом на пачку. Файлы удаляются
+фоновой задачей после коммита.
+"""
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+
+from jobs.models import Job
+from jobs.registry import enqueue
+from .models import (
+    Favorite,
+    Follow,
+    FoodgramUser,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+    SimilarRecipe,
+)
+from .shopping_list import remove_from_shopping_lists
+from .signals import bulk_changed
+from .similarity import schedule_similar_update
+
+BATCH_SIZE = 500
+# Сколько файлов удаляет одна фоновая задача
+FILES_PER_JOB = 1000
+# Строки, которые удаляются вместе с рецептом: (модель, поле связи)
+RECIPE_RELATIONS = (
+    (RecipeIngredient, 'recipe'),
+    (Recipe.tags.through, 'recipe'),
+    (Favorite, 'recipe'),
+    (ShoppingCart, 'recipe'),
+    (SimilarRecipe, 'recipe'),
+    (SimilarRecipe, 'similar'),
+)
+# Строки, которые удаляются вместе с пользователем, кроме рецептов.
+# Остальное (токен, журнал админки, группы) — единицы строк, их
+# удаляет коллектор вместе с сигналами.
+USER_RELATIONS = (
+    (Favorite, 'owner'),
+    (ShoppingCart, 'owner'),
+    (ShoppingListItem, 'owner'),
+    (Follow, 'user'),
+    (Follow, 'following'),
+    (Job, 'owner'),
+)
+
+
+def _batches(ids, size):
+    ids = iter(ids)
+    while True:
+        batch = list(islice(ids, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _delete_in(model, field, values):
+    """DELETE строк, у которых поле field из values; число строк."""
+    quote = connection.ops.quote_name
+    column = quote(model._meta.get_field(field).column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {column} IN ({", ".join("%s" for _ in values)})',
+            list(values)
+        )
+        return cursor.rowcount
+
+
+def delete_files_later(names):
+    """Ставит удаление файлов в очередь в текущей транзакции."""
+    names = sorted({name for name in names if name})
+    for batch in _batches(names, FILES_PER_JOB):
+        enqueue('delete_media_files', names=batch)
+
+
+def delete_unused_files(names):
+    """Удаляет файлы, на которые больше не ссылается ни одна запись."""
+    used = set(
+        Recipe.objects.filter(image__in=names).values_list('image', flat=True)
+    ) | set(
+        FoodgramUser.objects.filter(avatar__in=names).values_list(
+            'avatar', flat=True
+        )
+    ) | set(
+        Job.objects.filter(result_file__in=names).values_list(
+            'result_file', flat=True
+        )
+    )
+    deleted = 0
+    for name in names:
+        if name not in used:
+            default_storage.delete(name)
+            deleted += 1
+    return deleted
+
+
+def delete_recipes(recipe_ids, batch_size=BATCH_SIZE):
+    """Удаляет рецепты пачками, возвращает число удалённых."""
+    total = 0
+    for batch in _batches(recipe_ids, batch_size):
+        with transaction.atomic():
+            # Продукты вычитаются из чужих корзин, пока состав на месте
+            remove_from_shopping_lists(batch)
+            schedule_similar_update(
+                set(SimilarRecipe.objects.filter(
+                    similar_id__in=batch
+                ).values_list('recipe_id', flat=True)) - set(batch)
+            )
+            delete_files_later(
+                Recipe.objects.filter(pk__in=batch).values_list(
+                    'image', flat=True
+                )
+            )
+            for model, field in RECIPE_RELATIONS:
+                _delete_in(model, field, batch)
+            total += _delete_in(Recipe, 'id', batch)
+            bulk_changed.send(sender=Recipe, ids=batch)
+    return total
+
+
+def delete_users(user_ids, batch_size=BATCH_SIZE):
+    """Удаляет пользователей с их рецептами, возвращает их число."""
+    total = 0
+    for batch in _batches(user_ids, batch_size):
+        with transaction.atomic():
+            delete_recipes(
+                list(Recipe.objects.filter(author_id__in=batch).values_list(
+                    'id', flat=True
+                )),
+                batch_size
+            )
+            delete_files_later(
+                FoodgramUser.objects.filter(pk__in=batch).values_list(
+                    'avatar', flat=True
+                )
+            )
+            delete_files_later(
+                Job.objects.filter(owner_id__in=batch).values_list(
+                    'result_file', flat=True
+                )
+            )
+            for model, field in USER_RELATIONS:
+                _delete_in(model, field, batch)
+            _, deleted = FoodgramUser.objects.filter(pk__in=batch).delete()
+            total += deleted.get(FoodgramUser._meta.label, 0)
+    return total
+
+
+def deleted_counts(users=(), recipes=()):
+    """
+    Сколько строк каждой модели удалят delete_users(users) и
+    delete_recipes(recipes) — по запросу COUNT на модель.
+    """
+    recipe_condition = Q(pk__in=recipes) | Q(author_id__in=users)
+    recipe_ids = Recipe.objects.filter(recipe_condition).values('pk')
+    conditions = {}
+    for model, field in RECIPE_RELATIONS:
+        conditions[model] = conditions.get(model, Q()) | Q(
+            **{f'{field}__in': recipe_ids}
+        )
+    for model, field in USER_RELATIONS:
+        conditions[model] = conditions.get(model, Q()) | Q(
+            **{f'{field}__in': users}
+        )
+    counts = {
+        FoodgramUser: FoodgramUser.objects.filter(pk__in=users).count(),
+        Recipe: Recipe.objects.filter(recipe_condition).count(),
+    }
+    for model, condition in conditions.items():
+        counts[model] = model.objects.filter(condition).count()
+    return counts
@@ -1,4 +1,18 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
+
+COOKING_TIME_CHOICES = (
+    ('fast', 'Быстрые'),
+    ('medium', 'Средние'),
+    ('long', 'Долгие'),
+)
+# Условия корзин времени приготовления, общие для админки и API
+COOKING_TIME_BUCKETS = {
+    'fast': Q(cooking_time__lt=30),
+    'medium': Q(cooking_time__gte=30, cooking_time__lte=60),
+    'long': Q(cooking_time__gt=60),
+}
 
 
 class CookingTimeFilter(admin.SimpleListFilter):
@@ -8,17 +22,64 @@ class CookingTimeFilter(admin.SimpleListFilter):
     parameter_name = 'cooking_time'
 
     def lookups(self, request, model_admin):
-        return (
-            ('fast', 'Быстрые'),
-            ('medium', 'Средние'),
-            ('long', 'Долгие'),
-        )
+        return COOKING_TIME_CHOICES
 
     def queryset(self, request, recipe):
-        if self.value() == 'fast':
-            return recipe.filter(cooking_time__lt=30)
-        if self.value() == 'medium':
-            return recipe.filter(cooking_time__gte=30, cooking_time__lte=60)
-        if self.value() == 'long':
-            return recipe.filter(cooking_time__gt=60)
+        if self.value() in COOKING_TIME_BUCKETS:
+            return recipe.filter(COOKING_TIME_BUCKETS[self.value()])
         return recipe
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Фильтр по связанному объекту с автодополнением.
+
+    В боковую панель попадает только выбранный объект, а не вся таблица.
+    Модель поля и связанная модель должны быть зарегистрированы
+    в админке, у связанной — заданы search_fields.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = (
+            f'{field_path}__{field.target_field.name}__exact'
+        )
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.form_field = field.formfield(
+            widget=AutocompleteSelect(
+                field, model_admin.admin_site, attrs={'style': 'width: 100%'}
+            ),
+            required=False
+        )
+
+    @property
+    def media(self):
+        return self.form_field.widget.media
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is not None,
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            'params': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.lookup_kwarg
+            ],
+            'widget': self.form_field.widget.render(
+                self.lookup_kwarg,
+                self.lookup_val,
+                attrs={'id': f'filter-{self.lookup_kwarg}'}
+            ),
+        }
@@ -0,0 +1,405 @@
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Job
+from jobs.registry import enqueue
+from jobs.worker import execute
+from recipes.deletion import delete_users
+from recipes.models import FoodgramUser, Ingredient, Recipe, Tag
+from .seed_benchmark_data import BENCHMARK_PASSWORD, USERNAME_PREFIX
+
+# PNG 1x1 из примера запроса в README
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNo'
+    'AAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+# Ожидаемые статусы ответа по методу; ответ с другим статусом делает
+# замер маршрута недействительным
+EXPECTED_STATUS = {
+    'get': 200, 'post': 201, 'put': 200, 'patch': 200, 'delete': 204,
+}
+ROUTE_STATUS = {
+    'auth-token-login': 200,
+    'auth-token-logout': 204,
+    'jobs-create': 202,
+    'recipes-favorite-batch-post': 200,
+    'recipes-favorite-batch-delete': 200,
+    'recipes-shopping-cart-batch-post': 200,
+    'recipes-shopping-cart-batch-delete': 200,
+    'short-link': 302,
+    'users-set-password': 204,
+}
+# Подготовка удаляет связь, которой может и не быть
+SETUP_STATUS = {200, 201, 204, 404}
+NEW_PASSWORD = 'benchmark-password-2'
+BATCH_SIZE = 20
+
+
+def created_recipe(prepared):
+    """Путь рецепта, созданного подготовкой маршрута."""
+    return f'/api/recipes/{prepared["id"]}/'
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    """Бенчмарк маршрутов api/urls.py через тестовый клиент Django."""
+
+    help = (
+        'Прогоняет все маршруты API в процессе, печатает перцентили '
+        'задержки и число запросов к БД и сохраняет результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Куда сохранить результат')
+        parser.add_argument(
+            '--compare', help='Базовый JSON для сравнения'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=20,
+            help='Допустимый рост p50 в процентах при сравнении'
+        )
+        parser.add_argument(
+            '--writes', action='store_true',
+            help='Включить создание, изменение и удаление рецептов, '
+                 'пользователей и аватаров, смену пароля, вход и выход '
+                 '(создаёт файлы в MEDIA_ROOT)'
+        )
+
+    def _fixtures(self):
+        users = list(
+            FoodgramUser.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            ).order_by('id')[:2]
+        )
+        recipe = (
+            Recipe.objects.exclude(author=users[0]).first()
+            if len(users) == 2 else None
+        )
+        if recipe is None:
+            raise CommandError(
+                'Нет данных. Сначала выполните seed_benchmark_data.'
+            )
+        return (
+            users[0], users[1], recipe,
+            Ingredient.objects.first(), Tag.objects.first()
+        )
+
+    def _routes(self, user, other, recipe, ingredient, tag, writes):
+        """
+        Маршруты в виде (имя, метод, путь, данные, подготовка, откат).
+
+        Подготовка и откат — запросы (метод, путь, данные), которые
+        выполняются вне замера, чтобы каждая итерация начиналась в одном
+        состоянии. Путь может быть функцией от JSON ответа подготовки.
+        """
+        subscribe = f'/api/users/{other.id}/subscribe/'
+        favorite = f'/api/recipes/{recipe.id}/favorite/'
+        cart = f'/api/recipes/{recipe.id}/shopping_cart/'
+        # Рецепты не из избранного и корзины пользователя, чтобы откат
+        # пакетных маршрутов не удалял его связи
+        batch = {'recipes': list(
+            Recipe.objects.exclude(favorites__owner=user).exclude(
+                shopping_carts__owner=user
+            ).order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+        )}
+        favorite_batch = '/api/recipes/favorite/batch/'
+        cart_batch = '/api/recipes/shopping_cart/batch/'
+        routes = [
+            ('users-list', 'get', '/api/users/', None, None, None),
+            ('users-detail', 'get', f'/api/users/{other.id}/', None,
+             None, None),
+            ('users-me', 'get', '/api/users/me/', None, None, None),
+            ('users-subscriptions', 'get',
+             '/api/users/subscriptions/?recipes_limit=3', None, None, None),
+            ('users-subscribe-post', 'post', subscribe, None,
+             ('delete', subscribe, None), ('delete', subscribe, None)),
+            ('users-subscribe-delete', 'delete', subscribe, None,
+             ('post', subscribe, None), None),
+            ('recipes-list', 'get', '/api/recipes/', None, None, None),
+            ('recipes-list-filtered', 'get',
+             f'/api/recipes/?tags={tag.slug}&limit=50', None, None, None),
+            ('recipes-facets', 'get',
+             f'/api/recipes/facets/?tags={tag.slug}', None, None, None),
+            ('recipes-detail', 'get', f'/api/recipes/{recipe.id}/', None,
+             None, None),
+            ('recipes-get-link', 'get',
+             f'/api/recipes/{recipe.id}/get-link/', None, None, None),
+            ('recipes-similar', 'get', f'/api/recipes/{recipe.id}/similar/',
+             None, None, None),
+            ('recipes-favorite-post', 'post', favorite, None,
+             ('delete', favorite, None), ('delete', favorite, None)),
+            ('recipes-favorite-delete', 'delete', favorite, None,
+             ('post', favorite, None), None),
+            ('recipes-shopping-cart-post', 'post', cart, None,
+             ('delete', cart, None), ('delete', cart, None)),
+            ('recipes-shopping-cart-delete', 'delete', cart, None,
+             ('post', cart, None), None),
+            ('recipes-favorite-batch-post', 'post', favorite_batch, batch,
+             ('delete', favorite_batch, batch),
+             ('delete', favorite_batch, batch)),
+            ('recipes-favorite-batch-delete', 'delete', favorite_batch,
+             batch, ('post', favorite_batch, batch), None),
+            ('recipes-shopping-cart-batch-post', 'post', cart_batch, batch,
+             ('delete', cart_batch, batch), ('delete', cart_batch, batch)),
+            ('recipes-shopping-cart-batch-delete', 'delete', cart_batch,
+             batch, ('post', cart_batch, batch), None),
+            ('recipes-download-shopping-cart', 'get',
+             '/api/recipes/download_shopping_cart/', None, None, None),
+            ('recipes-shopping-list', 'get', '/api/recipes/shopping_list/',
+             None, None, None),
+            ('jobs-list', 'get', '/api/jobs/', None, None, None),
+            ('ingredients-list', 'get', '/api/ingredients/', None,
+             None, None),
+            ('ingredients-search', 'get', '/api/ingredients/?name=кар',
+             None, None, None),
+            ('ingredients-detail', 'get',
+             f'/api/ingredients/{ingredient.id}/', None, None, None),
+            ('tags-list', 'get', '/api/tags/', None, None, None),
+            ('tags-detail', 'get', f'/api/tags/{tag.id}/', None,
+             None, None),
+            ('short-link', 'get', f'/s/{recipe.id}/', None, None, None),
+        ]
+        if writes:
+            edit = {
+                'ingredients': [{'id': ingredient.id, 'amount': 10}],
+                'tags': [tag.id],
+                'name': 'Бенчмарк',
+                'text': 'Бенчмарк',
+                'cooking_time': 10,
+            }
+            create = ('post', '/api/recipes/', {**edit, 'image': PIXEL})
+            routes += [
+                ('recipes-create', 'post', '/api/recipes/', create[2],
+                 None, None),
+                ('recipes-partial-update', 'patch', created_recipe, edit,
+                 create, ('delete', created_recipe, None)),
+                ('recipes-delete', 'delete', created_recipe, None,
+                 create, None),
+                ('users-create', 'post', '/api/users/', {
+                    'email': f'{USERNAME_PREFIX}new@example.com',
+                    'username': f'{USERNAME_PREFIX}new',
+                    'first_name': 'Бенчмарк',
+                    'last_name': 'Бенчмарк',
+                    'password': BENCHMARK_PASSWORD,
+                }, None, None),
+                ('users-me-avatar-put', 'put', '/api/users/me/avatar/',
+                 {'avatar': PIXEL}, None, None),
+                ('users-me-avatar-delete', 'delete', '/api/users/me/avatar/',
+                 None, None, None),
+                ('users-set-password', 'post', '/api/users/set_password/', {
+                    'current_password': BENCHMARK_PASSWORD,
+                    'new_password': NEW_PASSWORD,
+                }, None, ('post', '/api/users/set_password/', {
+                    'current_password': NEW_PASSWORD,
+                    'new_password': BENCHMARK_PASSWORD,
+                })),
+                # djoser возвращает уже выданный токен
+                ('auth-token-login', 'post', '/api/auth/token/login/', {
+                    'email': user.email, 'password': BENCHMARK_PASSWORD,
+                }, None, None),
+                ('auth-token-logout', 'post', '/api/auth/token/logout/',
+                 None, None, None),
+                ('jobs-create', 'post', '/api/jobs/',
+                 {'task': 'shopping_list'}, None, None),
+                ('jobs-download', 'get',
+                 f'/api/jobs/{self._finished_job(user).id}/download/',
+                 None, None, None),
+            ]
+        return routes
+
+    def _finished_job(self, user):
+        """Выполненная выгрузка списка покупок для jobs-download."""
+        job = enqueue('shopping_list', owner=user)
+        job.attempts = 1
+        execute(job)
+        self.jobs.append(job.id)
+        return job
+
+    def _request(self, client, method, path, data, headers, prepared=None):
+        if callable(path):
+            path = path(prepared)
+        kwargs = dict(headers)
+        if data is not None:
+            kwargs.update(
+                data=json.dumps(data), content_type='application/json'
+            )
+        return getattr(client, method)(path, **kwargs)
+
+    def _cleanup(self, name, response, client, headers, token):
+        """Удаляет то, что создали пишущие маршруты из --writes."""
+        if name == 'recipes-create' and response.status_code == 201:
+            client.delete(
+                f'/api/recipes/{json.loads(response.content)["id"]}/',
+                **headers
+            )
+        elif name == 'users-create' and response.status_code == 201:
+            delete_users([json.loads(response.content)['id']])
+        elif name == 'jobs-create' and response.status_code == 202:
+            self.jobs.append(json.loads(response.content)['id'])
+        elif name == 'auth-token-logout':
+            # Остальные маршруты ходят с тем же токеном
+            Token.objects.get_or_create(key=token.key, user=token.user)
+
+    def _run(self, client, route, headers, token, iterations):
+        name, method, path, data, setup, rollback = route
+        expected = ROUTE_STATUS.get(name, EXPECTED_STATUS[method])
+        stats = {'queries': 0}
+
+        def execute_wrapper(execute, sql, params, many, context):
+            stats['queries'] += 1
+            return execute(sql, params, many, context)
+
+        latencies, queries, statuses = [], [], set()
+        for _ in range(iterations):
+            prepared = None
+            if setup:
+                response = self._request(client, *setup, headers)
+                if response.status_code not in SETUP_STATUS:
+                    return {
+                        'error': f'подготовка {setup[0].upper()} {setup[1]} '
+                                 f'вернула {response.status_code}',
+                        'valid': False,
+                    }
+                prepared = json.loads(response.content or 'null')
+            stats['queries'] = 0
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(execute_wrapper)
+                    )
+                start = time.perf_counter()
+                response = self._request(
+                    client, method, path, data, headers, prepared
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(stats['queries'])
+            statuses.add(response.status_code)
+            if rollback:
+                self._request(client, *rollback, headers, prepared)
+            self._cleanup(name, response, client, headers, token)
+        return {
+            'p50': round(percentile(latencies, 50), 2),
+            'p90': round(percentile(latencies, 90), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'mean': round(statistics.mean(latencies), 2),
+            'queries': max(queries),
+            'statuses': sorted(statuses),
+            'valid': statuses == {expected},
+        }
+
+    def _measure(self, client, route, headers, token, options):
+        """Прогрев и замер маршрута, печатает строку результата."""
+        result = None
+        if options['warmup']:
+            result = self._run(
+                client, route, headers, token, options['warmup']
+            )
+        if result is None or 'error' not in result:
+            result = self._run(
+                client, route, headers, token, options['iterations']
+            )
+        if 'error' in result:
+            self.stdout.write(
+                self.style.ERROR(f'{route[0]:<36} {result["error"]}')
+            )
+            return result
+        line = (
+            f'{route[0]:<36} {result["p50"]:>8.2f} {result["p90"]:>8.2f} '
+            f'{result["p99"]:>8.2f} {result["queries"]:>9}  '
+            f'{result["statuses"]}'
+        )
+        self.stdout.write(line if result['valid'] else self.style.ERROR(line))
+        return result
+
+    def _compare(self, results, path, threshold):
+        """Сравнивает с базовой линией, возвращает регрессии."""
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = []
+        self.stdout.write(f'\nСравнение с {path}:')
+        for name, result in results.items():
+            before = baseline.get(name)
+            # Замеры с неожиданными статусами сравнивать не с чем
+            if (
+                before is None or not before.get('valid', True)
+                or 'error' in before or not result['valid']
+            ):
+                continue
+            change = (
+                (result['p50'] - before['p50']) / before['p50'] * 100
+                if before['p50'] else 0
+            )
+            line = (
+                f'{name:<36} p50 {before["p50"]:>8.2f} -> '
+                f'{result["p50"]:>8.2f} ({change:+.0f}%), '
+                f'запросов {before["queries"]} -> {result["queries"]}'
+            )
+            if change > threshold or result['queries'] > before['queries']:
+                regressions.append(name)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return regressions
+
+    def handle(self, *args, **options):
+        # Все итерации идут от одного пользователя и упёрлись бы в лимиты
+        settings.THROTTLE_ENABLED = False
+        user, other, recipe, ingredient, tag = self._fixtures()
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+        self.stdout.write(
+            f'{"маршрут":<36} {"p50":>8} {"p90":>8} {"p99":>8} '
+            f'{"запросов":>9}  статусы'
+        )
+        results = {}
+        self.jobs = []
+        try:
+            routes = self._routes(
+                user, other, recipe, ingredient, tag, options['writes']
+            )
+            for route in routes:
+                results[route[0]] = self._measure(
+                    client, route, headers, token, options
+                )
+        finally:
+            for job in Job.objects.filter(pk__in=self.jobs):
+                job.result_file.delete(save=False)
+                job.delete()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результат сохранён в {options["output"]}')
+        errors = []
+        invalid = [name for name, result in results.items()
+                   if not result['valid']]
+        if invalid:
+            errors.append(
+                f'Неожиданные статусы или ошибки подготовки: '
+                f'{", ".join(invalid)}'
+            )
+        if options['compare']:
+            regressions = self._compare(
+                results, options['compare'], options['threshold']
+            )
+            if regressions:
+                errors.append(f'Регрессии: {", ".join(regressions)}')
+        if errors:
+            raise CommandError('. '.join(errors))
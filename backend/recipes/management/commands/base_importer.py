@@ -1,35 +1,208 @@
-import os
+import csv
+import io
 import json
+import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from recipes.signals import bulk_changed
 
 DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+READ_CHUNK_SIZE = 64 * 1024
+FORMATS = {'.csv': 'csv', '.json': 'json', '.ndjson': 'ndjson'}
+
+
+def read_csv(file, fields):
+    """Строки CSV без заголовка в порядке полей fields."""
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+def read_ndjson(file, fields):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json(file, fields):
+    """Потоково читает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started:
+                if position == len(buffer):
+                    break
+                if buffer[position] != '[':
+                    raise ValueError('Ожидался JSON-массив объектов')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item
+        if not chunk:
+            return
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'ndjson': read_ndjson}
 
 
 class BaseImportCommand(BaseCommand):
-    """Базовый класс для импорта данных."""
+    """
+    Базовый класс для импорта данных.
+
+    Файл CSV, JSON или NDJSON читается потоком и записывается пачками
+    фиксированного размера с upsert по unique_fields, поэтому память не
+    растёт с размером справочника. На PostgreSQL пачки грузятся через COPY.
+    """
 
     filename = None
     model = None
+    fields = None
+    unique_fields = None
+    update_fields = ()
     help = 'Загружает данные из файла'
 
-    def handle(self, *args, **options):
-        try:
-            filepath = os.path.join(DATA_DIR, self.filename)
-            with open(filepath, 'r', encoding='utf-8') as file:
-                count = len(
-                    self.model.objects.bulk_create(
-                        [self.model(**item) for item in json.load(file)],
-                        ignore_conflicts=True
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', help=f'Путь к файлу, по умолчанию data/{self.filename}'
+        )
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL'
+        )
+
+    def _batches(self, rows, batch_size):
+        rows = iter(rows)
+        key_indexes = [
+            self.fields.index(field) for field in self.unique_fields
+        ]
+        while True:
+            batch = {}
+            for row in islice(rows, batch_size):
+                values = tuple(row[field] for field in self.fields)
+                # Один ключ дважды в пачке ломает ON CONFLICT DO UPDATE
+                batch[tuple(values[index] for index in key_indexes)] = values
+            if not batch:
+                return
+            yield list(batch.values())
+
+    def _write_bulk(self, batch):
+        objects = [self.model(**dict(zip(self.fields, row))) for row in batch]
+        if self.update_fields:
+            self.model.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=self.unique_fields,
+                update_fields=self.update_fields
+            )
+        else:
+            self.model.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def _write_copy(self, cursor, batch):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(
+                self.model._meta.get_field(field).column
+            )
+            for field in self.fields
+        )
+        keys = ', '.join(
+            connection.ops.quote_name(
+                self.model._meta.get_field(field).column
+            )
+            for field in self.unique_fields
+        )
+        if self.update_fields:
+            conflict = 'DO UPDATE SET ' + ', '.join(
+                f'{column} = EXCLUDED.{column}'
+                for column in (
+                    connection.ops.quote_name(
+                        self.model._meta.get_field(field).column
                     )
-                )
-                self.stdout.write(self.style.SUCCESS(
-                    f'Добавлено {count} записей из {self.filename}'
-                ))
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(
-                    f'Ошибка при загрузке данных в файле {self.filename}: {e}'
+                    for field in self.update_fields
                 )
             )
+        else:
+            conflict = 'DO NOTHING'
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        # Только загружаемые столбцы: у id в LIKE-копии остаётся NOT NULL
+        # без identity, и COPY без id на нём падает
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS import_batch ON COMMIT DROP '
+            f'AS SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.execute('TRUNCATE import_batch')
+        cursor.copy_expert(
+            f'COPY import_batch ({columns}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM import_batch '
+            f'ON CONFLICT ({keys}) {conflict}'
+        )
+
+    def handle(self, *args, **options):
+        filepath = options['file'] or os.path.join(DATA_DIR, self.filename)
+        file_format = options['format'] or FORMATS.get(
+            os.path.splitext(filepath)[1].lower(), 'json'
+        )
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        total = 0
+        started = reported = time.monotonic()
+        try:
+            with open(filepath, 'r', encoding='utf-8', newline='') as file:
+                rows = READERS[file_format](file, self.fields)
+                for batch in self._batches(rows, options['batch_size']):
+                    with transaction.atomic():
+                        if use_copy:
+                            with connection.cursor() as cursor:
+                                self._write_copy(cursor.cursor, batch)
+                        else:
+                            self._write_bulk(batch)
+                    total += len(batch)
+                    now = time.monotonic()
+                    if now - reported >= 1:
+                        reported = now
+                        self.stdout.write(
+                            f'{total} записей, '
+                            f'{total / (now - started):.0f} записей/с'
+                        )
+            bulk_changed.send(sender=self.model)
+            elapsed = max(time.monotonic() - started, 1e-9)
+            self.stdout.write(self.style.SUCCESS(
+                f'Обработано {total} записей из {filepath} '
+                f'за {elapsed:.1f} с ({total / elapsed:.0f} записей/с)'
+            ))
+        except (OSError, ValueError, KeyError, csv.Error, DatabaseError) as e:
+            # Пачки до ошибки уже записаны, повторный запуск их обновит
+            raise CommandError(
+                f'Ошибка при загрузке данных в файле {filepath} '
+                f'после {total} записей: {e}'
+            ) from e
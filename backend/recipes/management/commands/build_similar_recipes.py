@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SIMILAR_RECIPES_COUNT
+from recipes.similarity import rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    """Пересчёт похожих рецептов."""
+
+    help = (
+        'Заново считает похожие рецепты для всех рецептов по общим '
+        'продуктам и тегам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--count', type=int, default=SIMILAR_RECIPES_COUNT,
+            help='Сколько похожих рецептов хранить для каждого'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_similar_recipes(
+            options['batch_size'], options['count']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны для {total} рецептов '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,58 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from recipes.models import FoodgramUser
+from recipes.shopping_list import (
+    expected_totals,
+    rebuild_shopping_lists,
+    stored_totals,
+)
+
+
+class Command(BaseCommand):
+    """Сверка таблицы списков покупок с корзинами."""
+
+    help = (
+        'Пересчитывает суммы продуктов по корзинам и сравнивает с '
+        'сохранёнными. С --repair пересобирает расходящиеся списки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        owner_ids = FoodgramUser.objects.filter(
+            Q(shopping_carts__isnull=False)
+            | Q(shopping_list_items__isnull=False)
+        ).distinct().order_by('id').values_list('id', flat=True).iterator()
+        broken = []
+        checked = 0
+        while batch := list(islice(owner_ids, options['batch_size'])):
+            expected = expected_totals(batch)
+            stored = stored_totals(batch)
+            broken.extend(
+                owner_id for owner_id in batch
+                if expected.get(owner_id, {}) != stored.get(owner_id, {})
+            )
+            checked += len(batch)
+        if broken and options['repair']:
+            for start in range(0, len(broken), options['batch_size']):
+                rebuild_shopping_lists(
+                    broken[start:start + options['batch_size']]
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересобрано списков: {len(broken)} из {checked}'
+            ))
+        elif broken:
+            raise CommandError(
+                f'Расходятся списки {len(broken)} пользователей из '
+                f'{checked}, например id {broken[:10]}. '
+                f'Запустите с --repair.'
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки покупок согласованы: {checked}'
+            ))
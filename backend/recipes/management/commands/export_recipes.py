@@ -0,0 +1,95 @@
+import json
+import shutil
+import zipfile
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.models import Recipe, RecipeIngredient
+
+
+def recipe_record(recipe):
+    """Рецепт в виде строки NDJSON без внутренних id связанных объектов."""
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'image': recipe.image.name,
+        'author': author and {
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    """Выгрузка рецептов в NDJSON и архив изображений."""
+
+    help = (
+        'Потоково выгружает рецепты с ингредиентами, тегами и авторами '
+        'в NDJSON, а изображения — в zip-архив.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл NDJSON')
+        parser.add_argument('--media', help='Zip-архив для изображений')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                RecipeIngredient.objects.select_related('ingredient')
+            )
+        ).order_by('id')
+        archive = (
+            zipfile.ZipFile(options['media'], 'w', zipfile.ZIP_STORED)
+            if options['media'] else None
+        )
+        count = 0
+        archived = set()
+        try:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                for recipe in recipes.iterator(
+                    chunk_size=options['batch_size']
+                ):
+                    output.write(
+                        json.dumps(recipe_record(recipe), ensure_ascii=False)
+                        + '\n'
+                    )
+                    if (
+                        archive is not None and recipe.image
+                        and recipe.image.name not in archived
+                    ):
+                        self._archive_image(archive, recipe.image)
+                        archived.add(recipe.image.name)
+                    count += 1
+        finally:
+            if archive is not None:
+                archive.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {count} в {options["output"]}'
+        ))
+
+    def _archive_image(self, archive, image):
+        if not image.storage.exists(image.name):
+            self.stderr.write(f'Нет файла изображения {image.name}')
+            return
+        with image.storage.open(image.name, 'rb') as source:
+            with archive.open(image.name, 'w') as target:
+                shutil.copyfileobj(source, target)
@@ -0,0 +1,122 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Что загружается при старте: wsgi и asgi — как воркер gunicorn к первому
+# запросу (приложение и URLconf), setup — как любой вызов manage.py
+ENTRIES = {
+    'wsgi': 'from backend.wsgi import application',
+    'asgi': 'from backend.asgi import application',
+    'setup': 'import django; django.setup()',
+}
+URLCONF = (
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+BOOT = '''
+import json, resource, sys, time
+start = time.perf_counter()
+{code}
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+}}))
+'''
+
+
+def parse_importtime(output):
+    """Строки -X importtime: [(модуль, собственное, суммарное время, мкс)]."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+class Command(BaseCommand):
+    """Аудит времени импорта при старте приложения."""
+
+    help = (
+        'Запускает старт приложения в чистых процессах и показывает время '
+        'холодного старта, пиковый RSS и стоимость импорта по пакетам '
+        'или модулям (python -X importtime).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry', choices=ENTRIES, default='wsgi')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--by', choices=('package', 'module'), default='package',
+            help='package — собственное время по пакетам верхнего уровня, '
+                 'module — суммарное время модулей с зависимостями'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько холодных стартов замерить'
+        )
+
+    def _run(self, code, importtime=False):
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        result = subprocess.run(
+            command + ['-c', BOOT.format(code=code)],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': os.environ.get(
+                    'DJANGO_SETTINGS_MODULE', 'backend.settings'
+                ),
+            },
+            capture_output=True,
+            text=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        code = ENTRIES[options['entry']]
+        if options['entry'] != 'setup':
+            code = f'{code}\n{URLCONF}'
+        runs = [self._run(code)[0] for _ in range(options['repeat'])]
+        _, output = self._run(code, importtime=True)
+        rows = parse_importtime(output)
+        self.stdout.write(
+            f'Холодный старт ({options["entry"]}): '
+            f'{statistics.median(run["seconds"] for run in runs) * 1000:.0f}'
+            f' мс (медиана из {len(runs)}), RSS '
+            f'{max(run["rss_kb"] for run in runs) / 1024:.1f} МБ, '
+            f'модулей {runs[0]["modules"]}'
+        )
+        if options['by'] == 'module':
+            self.stdout.write(
+                f'{"Модуль":<50} {"Своё, мс":>9} {"Всего, мс":>10}'
+            )
+            for name, own, cumulative in sorted(
+                rows, key=lambda row: row[2], reverse=True
+            )[:options['top']]:
+                self.stdout.write(
+                    f'{name:<50} {own / 1000:>9.1f} {cumulative / 1000:>10.1f}'
+                )
+            return
+        packages = defaultdict(lambda: [0, 0])
+        for name, own, _ in rows:
+            package = packages[name.split('.')[0]]
+            package[0] += own
+            package[1] += 1
+        self.stdout.write(f'{"Пакет":<30} {"Импорт, мс":>11} {"Модулей":>8}')
+        for name, (own, count) in sorted(
+            packages.items(), key=lambda item: item[1][0], reverse=True
+        )[:options['top']]:
+            self.stdout.write(f'{name:<30} {own / 1000:>11.1f} {count:>8}')
@@ -0,0 +1,7 @@
+from .import_ingredients_json import Command as JSONCommand
+
+
+class Command(JSONCommand):
+    """Импорт ингредиентов из CSV."""
+
+    filename = 'ingredients.csv'
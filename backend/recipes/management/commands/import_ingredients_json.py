@@ -7,3 +7,6 @@ class Command(BaseImportCommand):
 
     filename = 'ingredients.json'
     model = Ingredient
+    fields = ('name', 'measurement_unit')
+    unique_fields = ('name',)
+    update_fields = ('measurement_unit',)
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import zipfile
+from itertools import islice
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import (
+    FoodgramUser,
+    ImportProgress,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+from recipes.signals import bulk_changed
+
+DIGEST_CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(file):
+    """SHA-256 содержимого файла, читается частями."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(DIGEST_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    """Загрузка рецептов из NDJSON, выгруженного export_recipes."""
+
+    help = (
+        'Загружает рецепты пачками в отдельных транзакциях. После сбоя '
+        'повторный запуск продолжает с первой незагруженной пачки: '
+        'прогресс хранится в БД и пишется в транзакции пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл NDJSON')
+        parser.add_argument('--media', help='Zip-архив с изображениями')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать отсутствующих авторов без пароля'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не учитывая сохранённый прогресс'
+        )
+
+    def _resolve_authors(self, records, create):
+        orphans = [
+            record['name'] for record in records if not record['author']
+        ]
+        if orphans:
+            raise CommandError(
+                f'Нет автора у рецептов: {orphans[:10]}. '
+                'Укажите автора в выгрузке'
+            )
+        authors = {
+            record['author']['email']: record['author']
+            for record in records
+        }
+        if create:
+            new_users = [
+                FoodgramUser(**data) for email, data in authors.items()
+            ]
+            for user in new_users:
+                user.set_unusable_password()
+            FoodgramUser.objects.bulk_create(
+                new_users, ignore_conflicts=True
+            )
+        found = dict(
+            FoodgramUser.objects.filter(
+                email__in=authors
+            ).values_list('email', 'id')
+        )
+        missing = authors.keys() - found.keys()
+        if missing:
+            raise CommandError(
+                f'Нет авторов: {sorted(missing)[:10]}. '
+                'Создайте их или запустите с --create-authors'
+            )
+        return found
+
+    def _resolve_tags(self, records):
+        slugs = {slug for record in records for slug in record['tags']}
+        tags = dict(
+            Tag.objects.filter(slug__in=slugs).values_list('slug', 'id')
+        )
+        missing = slugs - tags.keys()
+        if missing:
+            self.stderr.write(
+                f'Нет тегов {sorted(missing)}, рецепты загружены без них'
+            )
+        return tags
+
+    def _resolve_ingredients(self, records):
+        names = {
+            item['name'] for record in records
+            for item in record['ingredients']
+        }
+        ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.filter(name__in=names).values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+        missing = {
+            (item['name'], item['measurement_unit'])
+            for record in records for item in record['ingredients']
+        } - ingredients.keys()
+        if missing:
+            raise CommandError(
+                f'Нет продуктов в справочнике: {sorted(missing)[:10]}'
+            )
+        return ingredients
+
+    def _save_image(self, archive, name, saved):
+        """
+        Сохраняет изображение из архива. Файл с тем же именем в хранилище
+        используется, только если совпадает содержимое, иначе хранилище
+        выбирает свободное имя. Новые файлы добавляются в saved.
+        """
+        storage = Recipe._meta.get_field('image').storage
+        if not name or archive is None:
+            return name
+        try:
+            with archive.open(name) as source:
+                digest = file_digest(source)
+        except KeyError:
+            self.stderr.write(f'Нет изображения {name} в архиве')
+            return name
+        if storage.exists(name):
+            with storage.open(name) as existing:
+                if file_digest(existing) == digest:
+                    return name
+        with archive.open(name) as source:
+            saved.append(storage.save(name, File(source, name=name)))
+        return saved[-1]
+
+    def _import_batch(self, records, archive, create_authors, path, lines):
+        saved = []
+        try:
+            with transaction.atomic():
+                self._insert_batch(
+                    records, archive, create_authors, path, lines, saved
+                )
+        except BaseException:
+            # Файлы не откатываются вместе с транзакцией пачки
+            storage = Recipe._meta.get_field('image').storage
+            for name in saved:
+                storage.delete(name)
+            raise
+
+    def _insert_batch(self, records, archive, create_authors, path, lines,
+                      saved):
+        authors = self._resolve_authors(records, create_authors)
+        tags = self._resolve_tags(records)
+        ingredients = self._resolve_ingredients(records)
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author_id=authors[record['author']['email']],
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=self._save_image(archive, record['image'], saved),
+            )
+            for record in records
+        ])
+        # auto_now_add перезаписывает pub_date при вставке
+        for recipe, record in zip(recipes, records):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredients[
+                    (item['name'], item['measurement_unit'])
+                ],
+                amount=item['amount'],
+            )
+            for recipe, record in zip(recipes, records)
+            for item in record['ingredients']
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag_id=tags[slug])
+            for recipe, record in zip(recipes, records)
+            for slug in record['tags'] if slug in tags
+        )
+        # Прогресс в той же транзакции: пачка и отметка о ней
+        # сохраняются или откатываются вместе
+        ImportProgress.objects.update_or_create(
+            path=path, defaults={'lines': lines}
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        progress_path = os.path.abspath(path)
+        if options['restart']:
+            ImportProgress.objects.filter(path=progress_path).delete()
+        done = ImportProgress.objects.filter(
+            path=progress_path
+        ).values_list('lines', flat=True).first() or 0
+        if done:
+            self.stdout.write(f'Продолжаем с записи {done + 1}')
+        archive = (
+            zipfile.ZipFile(options['media']) if options['media'] else None
+        )
+        imported = 0
+        try:
+            with open(path, encoding='utf-8') as file:
+                lines = islice(file, done, None)
+                while True:
+                    batch = list(islice(lines, options['batch_size']))
+                    if not batch:
+                        break
+                    records = [
+                        json.loads(line) for line in batch if line.strip()
+                    ]
+                    self._import_batch(
+                        records, archive, options['create_authors'],
+                        progress_path, done + len(batch)
+                    )
+                    done += len(batch)
+                    imported += len(records)
+                    self.stdout.write(f'Загружено записей: {done}')
+        finally:
+            if archive is not None:
+                archive.close()
+        if imported:
+            bulk_changed.send(sender=Recipe)
+        ImportProgress.objects.filter(path=progress_path).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён, новых рецептов: {imported}'
+        ))
@@ -7,3 +7,6 @@ class Command(BaseImportCommand):
 
     filename = 'tags.json'
     model = Tag
+    fields = ('name', 'slug')
+    unique_fields = ('slug',)
+    update_fields = ('name',)
@@ -0,0 +1,109 @@
+import http.client
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=50',
+    '/api/ingredients/',
+    '/api/ingredients/?name=а',
+    '/api/tags/',
+)
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    """Нагрузочное сравнение запущенных серверов, например WSGI и ASGI."""
+
+    help = (
+        'Нагружает эндпоинты чтения на каждом из серверов и печатает '
+        'запросы в секунду и задержки p50/p99.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'servers', nargs='+',
+            help='Базовые адреса, например http://127.0.0.1:8080'
+        )
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность нагрузки на один эндпоинт, секунды'
+        )
+        parser.add_argument(
+            '--token', help='Токен для заголовка Authorization'
+        )
+
+    def _worker(self, server, path, headers, deadline, latencies, errors):
+        url = urlsplit(server)
+        connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        connection = connection_class(url.netloc, timeout=30)
+        path = quote(path, safe='/?=&')
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors.append(1)
+                connection.close()
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.status >= 400:
+                errors.append(1)
+        connection.close()
+
+    def _run(self, server, path, options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        latencies, errors = [], []
+        deadline = time.perf_counter() + options['duration']
+        threads = [
+            threading.Thread(
+                target=self._worker,
+                args=(server, path, headers, deadline, latencies, errors)
+            )
+            for _ in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(latencies, 50) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'errors': len(errors),
+        }
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        self.stdout.write(
+            f'{"сервер":<28} {"эндпоинт":<28} '
+            f'{"rps":>9} {"p50, мс":>9} {"p99, мс":>9} {"ошибки":>7}'
+        )
+        for path in paths:
+            for server in options['servers']:
+                result = self._run(server.rstrip('/'), path, options)
+                self.stdout.write(
+                    f'{server:<28} {path:<28} {result["rps"]:>9.1f} '
+                    f'{result["p50"]:>9.1f} {result["p99"]:>9.1f} '
+                    f'{result["errors"]:>7}'
+                )
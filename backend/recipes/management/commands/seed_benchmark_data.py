@@ -0,0 +1,180 @@
+import csv
+import os
+import random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import (
+    Favorite,
+    Follow,
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from recipes.shopping_list import rebuild_shopping_lists
+from recipes.similarity import rebuild_similar_recipes
+
+INGREDIENTS_CSV = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+BENCHMARK_PASSWORD = 'benchmark-password'
+USERNAME_PREFIX = 'bench_user_'
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+)
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для бенчмарков."""
+
+    help = (
+        'Создаёт пользователей, рецепты, подписки, избранное и корзины '
+        'на реальных продуктах из data/ingredients.csv.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Рецептов в корзине на пользователя')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def _ensure_catalog(self, batch_size):
+        with open(INGREDIENTS_CSV, encoding='utf-8') as file:
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in csv.reader(file)
+                ),
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slug) for name, slug in DEFAULT_TAGS],
+            ignore_conflicts=True
+        )
+
+    def _sample_pairs(self, rng, owners, targets, per_owner, model,
+                      owner_field, target_field):
+        objects = []
+        for owner in owners:
+            candidates = [
+                target for target in rng.sample(
+                    targets, min(per_owner + 1, len(targets))
+                )
+                if target != owner
+            ][:per_owner]
+            objects.extend(
+                model(**{owner_field: owner, target_field: target})
+                for target in candidates
+            )
+        return objects
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        self._ensure_catalog(batch_size)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+
+        start = FoodgramUser.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).count()
+        password = make_password(BENCHMARK_PASSWORD)
+        users = FoodgramUser.objects.bulk_create(
+            [
+                FoodgramUser(
+                    username=f'{USERNAME_PREFIX}{number}',
+                    email=f'{USERNAME_PREFIX}{number}@example.com',
+                    first_name=f'Имя{number}',
+                    last_name=f'Фамилия{number}',
+                    password=password,
+                )
+                for number in range(start, start + options['users'])
+            ],
+            batch_size=batch_size
+        )
+        user_ids = [user.id for user in users]
+
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author_id=rng.choice(user_ids),
+                    name=f'Рецепт {number}',
+                    text='Синтетический рецепт для бенчмарка. ' * 10,
+                    cooking_time=rng.randint(5, 180),
+                    image='recipes/images/benchmark.png',
+                )
+                for number in range(options['recipes'])
+            ],
+            batch_size=batch_size
+        )
+        recipe_ids = [recipe.id for recipe in recipes]
+
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500)
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rng.sample(
+                    ingredient_ids,
+                    min(options['ingredients_per_recipe'],
+                        len(ingredient_ids))
+                )
+            ),
+            batch_size=batch_size
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in rng.sample(tag_ids, rng.randint(1, 2))
+            ),
+            batch_size=batch_size
+        )
+        Follow.objects.bulk_create(
+            self._sample_pairs(
+                rng, user_ids, user_ids, options['follows'],
+                Follow, 'user_id', 'following_id'
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        for model, per_user in (
+            (Favorite, options['favorites']),
+            (ShoppingCart, options['carts']),
+        ):
+            model.objects.bulk_create(
+                self._sample_pairs(
+                    rng, user_ids, recipe_ids, per_user,
+                    model, 'owner_id', 'recipe_id'
+                ),
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+        # bulk_create обходит сигналы, поэтому суммы корзин и похожие
+        # рецепты — разом
+        rebuild_shopping_lists(user_ids)
+        rebuild_similar_recipes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)}. '
+            f'Пароль пользователей: {BENCHMARK_PASSWORD}'
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:52
+
+from django.db import migrations, models
+import recipes.uploads
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_importprogress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='foodgramuser',
+            name='avatar',
+            field=models.ImageField(default=None, null=True, upload_to=recipes.uploads.UniqueUploadTo('users'), verbose_name='Аватар'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(upload_to=recipes.uploads.UniqueUploadTo('recipes/images'), verbose_name='Фото'),
+        ),
+    ]
@@ -9,6 +9,7 @@ from .constants import (
     MIN_AMOUNT,
     MIN_COOKING_TIME
 )
+from .uploads import UniqueUploadTo
 
 
 class FoodgramUser(AbstractUser):
@@ -30,7 +31,8 @@ class FoodgramUser(AbstractUser):
     )
     email = models.EmailField('Почта', unique=True, max_length=EMAIL_LENGTH)
     avatar = models.ImageField(
-        'Аватар', upload_to='users', default=None, null=True
+        'Аватар', upload_to=UniqueUploadTo('users'), default=None,
+        null=True
     )
     first_name = models.CharField('Имя', max_length=FIRST_NAME_LENGTH)
     last_name = models.CharField('Фамилия', max_length=LAST_NAME_LENGTH)
@@ -126,7 +128,9 @@ class Recipe(models.Model):
         verbose_name='Ингредиенты'
     )
     name = models.CharField('Название', max_length=256)
-    image = models.ImageField('Фото', upload_to='recipes/images')
+    image = models.ImageField(
+        'Фото', upload_to=UniqueUploadTo('recipes/images')
+    )
     text = models.TextField('Описание')
     cooking_time = models.PositiveIntegerField(
         'Время (мин)',
@@ -182,6 +186,68 @@ class ShoppingCart(BaseUserRecipeModel):
         default_related_name = 'shopping_carts'
 
 
+class ShoppingListItem(models.Model):
+    """Сумма продукта по всем рецептам в корзине пользователя."""
+
+    owner = models.ForeignKey(
+        FoodgramUser,
+        on_delete=models.CASCADE,
+        verbose_name='Владелец'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Продукт'
+    )
+    amount = models.PositiveIntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Продукт в списке покупок'
+        verbose_name_plural = 'Продукты в списках покупок'
+        default_related_name = 'shopping_list_items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('owner', 'ingredient'),
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.owner} - {self.ingredient}: {self.amount}'
+
+
+class SimilarRecipe(models.Model):
+    """Заранее посчитанный похожий рецепт."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        ordering = ('recipe', '-score', 'similar')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}: {self.score:.2f}'
+
+
 class Favorite(BaseUserRecipeModel):
     """Модель избранных рецептов пользователя."""
 
@@ -224,3 +290,17 @@ class Follow(models.Model):
 
     def __str__(self) -> str:
         return f'{self.user.username} - {self.following.username}'
+
+
+class ImportProgress(models.Model):
+    """Сколько строк файла уже загрузил import_recipes."""
+
+    path = models.CharField('Файл', max_length=1024, unique=True)
+    lines = models.PositiveBigIntegerField('Загружено строк', default=0)
+
+    class Meta:
+        verbose_name = 'Прогресс импорта'
+        verbose_name_plural = 'Прогресс импорта'
+
+    def __str__(self):
+        return f'{self.path}: {self.lines}'
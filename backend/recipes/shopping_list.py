@@ -0,0 +1,198 @@
+"""
+Поддержка таблицы ShoppingListItem — сумм продуктов в корзинах.
+
+Суммы меняются на разницу при добавлении и удалении рецептов из корзины
+и при изменении состава рецепта, поэтому список покупок читается одним
+запросом по индексу (owner, ingredient).
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Case, CharField, F, Sum, Value, When
+
+from .constants import LARGER_UNITS, UNIT_CONVERSIONS
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return (
+        quote(ShoppingListItem._meta.db_table),
+        quote(RecipeIngredient._meta.db_table),
+        quote(ShoppingCart._meta.db_table),
+    )
+
+
+def _delta(recipe_ids, owner_id):
+    """SELECT (owner_id, ingredient_id, total) для рецептов из корзин."""
+    items, recipe_ingredients, carts = _tables()
+    recipes = ', '.join('%s' for _ in recipe_ids)
+    if owner_id is not None:
+        return (
+            f'SELECT %s AS owner_id, ri.ingredient_id, SUM(ri.amount) '
+            f'AS total FROM {recipe_ingredients} ri '
+            f'WHERE ri.recipe_id IN ({recipes}) GROUP BY ri.ingredient_id',
+            [owner_id, *recipe_ids]
+        )
+    return (
+        f'SELECT sc.owner_id, ri.ingredient_id, SUM(ri.amount) AS total '
+        f'FROM {carts} sc JOIN {recipe_ingredients} ri '
+        f'ON ri.recipe_id = sc.recipe_id WHERE sc.recipe_id IN ({recipes}) '
+        f'GROUP BY sc.owner_id, ri.ingredient_id',
+        list(recipe_ids)
+    )
+
+
+def add_to_shopping_lists(recipe_ids, owner_id=None):
+    """
+    Прибавляет продукты рецептов к спискам покупок.
+
+    С owner_id — к списку одного пользователя, только что положившего
+    рецепты в корзину. Без него — ко всем корзинам, где лежат рецепты.
+    """
+    if not recipe_ids:
+        return
+    items = _tables()[0]
+    select, params = _delta(recipe_ids, owner_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {items} (owner_id, ingredient_id, amount) '
+            f'{select} ON CONFLICT (owner_id, ingredient_id) '
+            f'DO UPDATE SET amount = {items}.amount + EXCLUDED.amount',
+            params
+        )
+
+
+def remove_from_shopping_lists(recipe_ids, owner_id=None):
+    """Вычитает продукты рецептов из списков покупок, как add_."""
+    if not recipe_ids:
+        return
+    items = _tables()[0]
+    select, params = _delta(recipe_ids, owner_id)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {items} SET amount = CASE '
+            f'WHEN {items}.amount > delta.total '
+            f'THEN {items}.amount - delta.total ELSE 0 END '
+            f'FROM ({select}) delta '
+            f'WHERE {items}.owner_id = delta.owner_id '
+            f'AND {items}.ingredient_id = delta.ingredient_id',
+            params
+        )
+        if owner_id is not None:
+            owners, owner_params = '%s', [owner_id]
+        else:
+            owners = (
+                f'SELECT owner_id FROM {_tables()[2]} '
+                f'WHERE recipe_id IN ({", ".join("%s" for _ in recipe_ids)})'
+            )
+            owner_params = list(recipe_ids)
+        cursor.execute(
+            f'DELETE FROM {items} WHERE amount = 0 '
+            f'AND owner_id IN ({owners})',
+            owner_params
+        )
+
+
+def expected_totals(owner_ids):
+    """Суммы продуктов, посчитанные заново по корзинам пользователей."""
+    totals = defaultdict(dict)
+    rows = ShoppingCart.objects.filter(
+        owner_id__in=owner_ids,
+        recipe__recipe_ingredients__isnull=False
+    ).values_list(
+        'owner_id', 'recipe__recipe_ingredients__ingredient_id'
+    ).annotate(
+        total=Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+    for owner_id, ingredient_id, total in rows:
+        totals[owner_id][ingredient_id] = total
+    return totals
+
+
+def stored_totals(owner_ids):
+    totals = defaultdict(dict)
+    for owner_id, ingredient_id, amount in ShoppingListItem.objects.filter(
+        owner_id__in=owner_ids
+    ).values_list('owner_id', 'ingredient_id', 'amount'):
+        totals[owner_id][ingredient_id] = amount
+    return totals
+
+
+@transaction.atomic
+def rebuild_shopping_lists(owner_ids):
+    """Пересчитывает списки покупок пользователей с нуля."""
+    ShoppingListItem.objects.filter(owner_id__in=owner_ids).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            owner_id=owner_id, ingredient_id=ingredient_id, amount=amount
+        )
+        for owner_id, ingredients in expected_totals(owner_ids).items()
+        for ingredient_id, amount in ingredients.items()
+    )
+
+
+@contextmanager
+def changing_recipe_ingredients(recipe_ids):
+    """
+    Оборачивает изменение состава рецептов.
+
+    Продукты вычитаются из корзин по старому составу и прибавляются по
+    новому в одной транзакции с изменением.
+    """
+    recipe_ids = list(recipe_ids)
+    with transaction.atomic():
+        remove_from_shopping_lists(recipe_ids)
+        yield
+        add_to_shopping_lists(recipe_ids)
+
+
+def _readable(amount, unit):
+    """1500 г -> 1.5 кг, 2000 мл -> 2 л; прочие единицы как есть."""
+    larger, ratio = LARGER_UNITS.get(unit, (None, None))
+    if larger is None or amount < ratio:
+        return amount, unit
+    amount = round(amount / ratio, 3)
+    return int(amount) if amount == int(amount) else amount, larger
+
+
+def shopping_list_totals(owner_id):
+    """
+    Итоговый список покупок пользователя.
+
+    Количества переводятся в базовые единицы из UNIT_CONVERSIONS и
+    суммируются по (название, единица) одним запросом в БД, поэтому
+    граммы и килограммы одного продукта складываются, а разные
+    единицы не смешиваются.
+    """
+    unit = 'ingredient__measurement_unit'
+    rows = ShoppingListItem.objects.filter(owner_id=owner_id).annotate(
+        name=F('ingredient__name'),
+        unit=Case(
+            *(
+                When(**{unit: source}, then=Value(base))
+                for source, (base, _) in UNIT_CONVERSIONS.items()
+            ),
+            default=F(unit),
+            output_field=CharField()
+        ),
+        factor=Case(
+            *(
+                When(**{unit: source}, then=Value(factor))
+                for source, (_, factor) in UNIT_CONVERSIONS.items()
+            ),
+            default=Value(1)
+        )
+    ).values('name', 'unit').annotate(
+        total=Sum(F('amount') * F('factor'))
+    ).order_by('name', 'unit')
+    totals = []
+    for row in rows:
+        amount, measurement_unit = _readable(row['total'], row['unit'])
+        totals.append({
+            'name': row['name'],
+            'amount': amount,
+            'measurement_unit': measurement_unit,
+        })
+    return totals
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import Signal, receiver
+
+from jobs.registry import enqueue
+from .models import Recipe, RecipeIngredient, ShoppingCart, SimilarRecipe
+from .shopping_list import (
+    add_to_shopping_lists,
+    rebuild_shopping_lists,
+    remove_from_shopping_lists,
+)
+from .similarity import schedule_similar_update
+
+# Массовые операции в обход save(): bulk_create, COPY, set-based delete.
+# Аргумент sender — изменённая модель, ids — id изменённых объектов,
+# если они известны.
+bulk_changed = Signal()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        add_to_shopping_lists([instance.recipe_id], instance.owner_id)
+    else:
+        rebuild_shopping_lists([instance.owner_id])
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    # До удаления: при каскаде от рецепта его продукты ещё на месте
+    remove_from_shopping_lists([instance.recipe_id], instance.owner_id)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_similar_update([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        schedule_similar_update([instance.id])
+    elif pk_set:
+        schedule_similar_update(pk_set)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # Каскад удалит рецепт из чужих списков похожих, их надо дополнить
+    schedule_similar_update(
+        SimilarRecipe.objects.filter(similar=instance).values_list(
+            'recipe_id', flat=True
+        )
+    )
+
+
+@receiver(bulk_changed)
+def rebuild_similar_after_bulk_change(sender, ids=None, **kwargs):
+    # С ids затронутые рецепты пересчитывает сам отправитель
+    if sender is Recipe and ids is None:
+        transaction.on_commit(
+            lambda: enqueue('rebuild_similar_recipes')
+        )
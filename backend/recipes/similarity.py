@@ -0,0 +1,231 @@
+"""
+Похожие рецепты по продуктам и тегам.
+
+Рецепт — разреженный вектор признаков (продукты и теги) с весами IDF,
+так что частые продукты вроде соли почти не влияют на сходство.
+Сходство — косинус между векторами. Строка произведения матрицы
+рецепт×признак на транспонированную считается через обратный индекс
+признак -> рецепты: кандидаты берутся только по редким признакам,
+частые лишь добавляют вклад в скалярное произведение. Результат
+хранится в SimilarRecipe, запрос похожих — выборка по индексу.
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count
+
+from jobs.registry import enqueue_merged
+from .constants import SIMILAR_RECIPES_COUNT, SIMILAR_TAG_WEIGHT
+from .models import Recipe, RecipeIngredient, SimilarRecipe
+
+INGREDIENT = 'i'
+TAG = 't'
+# Признак частый, если он есть больше чем у этой доли рецептов, но не
+# меньше чем у MIN_COMMON рецептов
+COMMON_SHARE = 0.05
+MIN_COMMON = 100
+
+
+def _pairs(recipe_ids=None):
+    """Пары (рецепт, признак); None — все рецепты."""
+    ingredients = RecipeIngredient.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    for recipe_id, ingredient_id in ingredients.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator():
+        yield recipe_id, (INGREDIENT, ingredient_id)
+    for recipe_id, tag_id in tags.values_list(
+        'recipe_id', 'tag_id'
+    ).iterator():
+        yield recipe_id, (TAG, tag_id)
+
+
+def _frequencies():
+    """Число рецептов и число рецептов с каждым признаком."""
+    counts = {}
+    for kind, model, field in (
+        (INGREDIENT, RecipeIngredient, 'ingredient_id'),
+        (TAG, Recipe.tags.through, 'tag_id'),
+    ):
+        for feature_id, count in model.objects.values_list(field).annotate(
+            count=Count('recipe_id', distinct=True)
+        ).order_by():
+            counts[(kind, feature_id)] = count
+    return Recipe.objects.count(), counts
+
+
+def _key(item):
+    # При равном сходстве выше более старый рецепт
+    return item[1], -item[0]
+
+
+class SimilarityIndex:
+    """Разреженная матрица рецепт×признак с обратным индексом."""
+
+    def __init__(self, pairs, total, counts):
+        self.common = max(MIN_COMMON, total * COMMON_SHARE)
+        self.counts = counts
+        self.vectors = defaultdict(dict)
+        self.postings = defaultdict(list)
+        for recipe_id, feature in pairs:
+            if feature in self.vectors[recipe_id]:
+                continue
+            self.vectors[recipe_id][feature] = (
+                (SIMILAR_TAG_WEIGHT if feature[0] == TAG else 1)
+                * math.log(1 + total / counts.get(feature, 1))
+            )
+            self.postings[feature].append(recipe_id)
+        self.norms = {
+            recipe_id: math.sqrt(sum(
+                weight * weight for weight in vector.values()
+            ))
+            for recipe_id, vector in self.vectors.items()
+        }
+
+    def candidate_features(self, recipe_id):
+        """Редкие признаки рецепта, а если их нет — все."""
+        vector = self.vectors.get(recipe_id, {})
+        rare = {
+            feature for feature in vector
+            if self.counts.get(feature, 0) <= self.common
+        }
+        return rare or set(vector)
+
+    def neighbours(self, recipe_id, count=SIMILAR_RECIPES_COUNT):
+        """Самые похожие рецепты: [(id, сходство)] по убыванию."""
+        vector = self.vectors.get(recipe_id)
+        norm = self.norms.get(recipe_id)
+        if not norm:
+            return []
+        rare = self.candidate_features(recipe_id)
+        dots = defaultdict(float)
+        for feature in rare:
+            for other in self.postings[feature]:
+                dots[other] += vector[feature] * self.vectors[other][feature]
+        dots.pop(recipe_id, None)
+        for feature in vector.keys() - rare:
+            for other in dots:
+                weight = self.vectors[other].get(feature)
+                if weight:
+                    dots[other] += vector[feature] * weight
+        return heapq.nlargest(
+            count,
+            (
+                (other, dot / (norm * self.norms[other]))
+                for other, dot in dots.items()
+            ),
+            key=_key
+        )
+
+
+def _save(rows):
+    """Заменяет сохранённых соседей рецептов из rows."""
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=rows).delete()
+        SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+            for recipe_id, neighbours in rows.items()
+            for other, score in neighbours
+        )
+
+
+def rebuild_similar_recipes(batch_size=500, count=SIMILAR_RECIPES_COUNT):
+    """Полный пересчёт похожих рецептов, возвращает число рецептов."""
+    index = SimilarityIndex(_pairs(), *_frequencies())
+    recipe_ids = Recipe.objects.values_list('id', flat=True).iterator()
+    total = 0
+    while True:
+        batch = list(islice(recipe_ids, batch_size))
+        if not batch:
+            break
+        _save({
+            recipe_id: index.neighbours(recipe_id, count)
+            for recipe_id in batch
+        })
+        total += len(batch)
+    return total
+
+
+def update_similar_recipes(recipe_ids, count=SIMILAR_RECIPES_COUNT):
+    """
+    Пересчёт после изменения продуктов или тегов рецептов recipe_ids.
+
+    Заново считаются сами рецепты и те, у кого они были в соседях;
+    в списки новых соседей изменённый рецепт вставляется, если
+    сходство выше худшего из сохранённых. Веса признаков со временем
+    уходят от точных, их выравнивает rebuild_similar_recipes.
+    """
+    recipe_ids = set(recipe_ids)
+    targets = recipe_ids | set(
+        SimilarRecipe.objects.filter(
+            similar_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    total, counts = _frequencies()
+    targets_index = SimilarityIndex(_pairs(targets), total, counts)
+    features = defaultdict(set)
+    for recipe_id in targets:
+        for kind, feature_id in targets_index.candidate_features(recipe_id):
+            features[kind].add(feature_id)
+    candidates = targets | set(
+        RecipeIngredient.objects.filter(
+            ingredient_id__in=features[INGREDIENT]
+        ).values_list('recipe_id', flat=True)
+    ) | set(
+        Recipe.tags.through.objects.filter(
+            tag_id__in=features[TAG]
+        ).values_list('recipe_id', flat=True)
+    )
+    index = SimilarityIndex(_pairs(candidates), total, counts)
+    rows = {
+        recipe_id: index.neighbours(recipe_id, count)
+        for recipe_id in targets
+    }
+    stored = defaultdict(dict)
+    for recipe_id, other, score in SimilarRecipe.objects.filter(
+        recipe_id__in={
+            other for recipe_id in recipe_ids
+            for other, _ in rows[recipe_id]
+        } - targets
+    ).values_list('recipe_id', 'similar_id', 'score'):
+        stored[recipe_id][other] = score
+    for recipe_id in recipe_ids:
+        for other, score in rows[recipe_id]:
+            if other in targets:
+                continue
+            stored[other][recipe_id] = score
+            rows[other] = heapq.nlargest(
+                count, stored[other].items(), key=_key
+            )
+    _save(rows)
+
+
+_pending = threading.local()
+
+
+def schedule_similar_update(recipe_ids):
+    """
+    Ставит пересчёт похожих рецептов в очередь после коммита.
+
+    Изменения за одну транзакцию уходят одной задачей, а рецепты, ещё
+    не взятые обработчиком, добавляются в уже ожидающую задачу.
+    """
+    pending = getattr(_pending, 'recipe_ids', None)
+    if pending is None:
+        pending = _pending.recipe_ids = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(_enqueue_pending)
+
+
+def _enqueue_pending():
+    recipe_ids = getattr(_pending, 'recipe_ids', None)
+    if recipe_ids:
+        _pending.recipe_ids = set()
+        enqueue_merged('update_similar_recipes', 'recipe_ids', recipe_ids)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from io import StringIO
+from uuid import uuid4
+
+from django.core.files import File
+from django.core.management import call_command
+
+from jobs.registry import STAFF, task
+from .deletion import delete_unused_files
+from .similarity import rebuild_similar_recipes, update_similar_recipes
+
+# Сколько последних символов вывода команды сохранять в результате
+OUTPUT_LIMIT = 10000
+
+
+@task('export_recipes', max_attempts=1, access=STAFF)
+def export_recipes(job):
+    """Выгрузка рецептов export_recipes в файл результата."""
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'recipes.ndjson')
+        call_command('export_recipes', output, stdout=StringIO())
+        with open(output, 'rb') as file:
+            job.result_file.save(
+                f'{uuid4().hex}.ndjson', File(file), save=False
+            )
+    return {'filename': 'recipes.ndjson'}
+
+
+@task('management_command', max_attempts=1)
+def management_command(job, name, args=(), options=None):
+    """Команда manage.py в фоне, например импорт продуктов."""
+    output = StringIO()
+    call_command(name, *args, stdout=output, stderr=output,
+                 **(options or {}))
+    return {'output': output.getvalue()[-OUTPUT_LIMIT:]}
+
+
+@task('update_similar_recipes', keep_done=False)
+def update_similar(job, recipe_ids):
+    """Пересчёт похожих рецептов после изменения рецептов."""
+    update_similar_recipes(recipe_ids)
+    return {'recipes': len(recipe_ids)}
+
+
+@task('rebuild_similar_recipes', max_attempts=1)
+def rebuild_similar(job):
+    """Полный пересчёт похожих рецептов."""
+    return {'recipes': rebuild_similar_recipes()}
+
+
+@task('delete_media_files', keep_done=False)
+def delete_media_files(job, names):
+    """Удаление файлов удалённых рецептов и пользователей."""
+    return {'files': delete_unused_files(names)}
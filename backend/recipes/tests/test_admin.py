@@ -0,0 +1,130 @@
+"""Страницы списков админки с фильтрами AutocompleteFilter."""
+import re
+
+from django.test import TestCase
+
+from recipes.models import (
+    Favorite,
+    Follow,
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+)
+
+
+class AutocompleteFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = FoodgramUser.objects.create_superuser(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Админ', last_name='Админов'
+        )
+        cls.chosen, cls.skipped = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass'
+            )
+            for name in ('chosen', 'skipped')
+        )
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        cls.recipes = {}
+        for author, cooking_time in (
+            (cls.chosen, 10), (cls.chosen, 90), (cls.skipped, 10),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {author} {cooking_time}',
+                text='Текст', cooking_time=cooking_time,
+                image='recipes/images/1.png'
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1
+            )
+            Favorite.objects.create(owner=author, recipe=recipe)
+            ShoppingCart.objects.create(owner=author, recipe=recipe)
+            cls.recipes[author.id, cooking_time] = recipe
+        Follow.objects.create(user=cls.chosen, following=cls.skipped)
+        Follow.objects.create(user=cls.skipped, following=cls.chosen)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _changelist(self, model, query=''):
+        response = self.client.get(f'/admin/recipes/{model}/?{query}')
+        self.assertEqual(response.status_code, 200, model)
+        return response
+
+    def _widget(self, response, lookup):
+        """Список выбора фильтра lookup на странице."""
+        match = re.search(
+            rf'<select[^>]*id="filter-{lookup}".*?</select>',
+            response.content.decode(), re.S
+        )
+        self.assertIsNotNone(match, lookup)
+        return match.group()
+
+    def test_changelists_render_and_filter(self):
+        chosen = self.chosen.id
+        for model, lookup, expected in (
+            ('recipe', 'author__id__exact', Recipe.objects.filter(
+                author=chosen
+            )),
+            ('favorite', 'owner__id__exact', Favorite.objects.filter(
+                owner=chosen
+            )),
+            ('shoppingcart', 'owner__id__exact', ShoppingCart.objects.filter(
+                owner=chosen
+            )),
+            ('recipeingredient', 'recipe__id__exact',
+             RecipeIngredient.objects.filter(
+                 recipe=self.recipes[chosen, 10]
+             )),
+            ('follow', 'user__id__exact', Follow.objects.filter(
+                user=chosen
+            )),
+        ):
+            value = (
+                self.recipes[chosen, 10].id
+                if lookup.startswith('recipe') else chosen
+            )
+            response = self._changelist(model)
+            # Без выбора в списке только пустой вариант
+            self.assertEqual(
+                re.findall(r'<option[^>]*>', self._widget(response, lookup)),
+                ['<option value="">']
+            )
+            self.assertContains(response, 'admin/js/autocomplete.js')
+            response = self._changelist(model, f'{lookup}={value}')
+            self.assertCountEqual(
+                response.context['cl'].result_list, expected, model
+            )
+            # В списке только выбранный объект, а не вся таблица
+            options = re.findall(
+                r'<option value="\d+"[^>]*>', self._widget(response, lookup)
+            )
+            self.assertEqual(len(options), 1, model)
+            self.assertIn(f'value="{value}"', options[0])
+            self.assertIn('selected', options[0])
+
+    def test_keeps_other_filters(self):
+        response = self._changelist(
+            'recipe', f'author__id__exact={self.chosen.id}&cooking_time=long'
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [self.recipes[self.chosen.id, 90]]
+        )
+        # Форма фильтра автора передаёт остальные фильтры скрытыми полями
+        form = re.search(
+            r'<form method="get">(?:(?!</form>).)*'
+            r'id="filter-author__id__exact".*?</form>',
+            response.content.decode(), re.S
+        ).group()
+        self.assertIn(
+            '<input type="hidden" name="cooking_time" value="long">', form
+        )
+        self.assertNotIn('type="hidden" name="author__id__exact"', form)
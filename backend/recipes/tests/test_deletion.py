@@ -0,0 +1,253 @@
+"""Массовое удаление пользователей и рецептов со всеми связями."""
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Job
+from jobs.worker import claim, execute
+from recipes import similarity
+from recipes.deletion import delete_recipes, delete_users, deleted_counts
+from recipes.models import (
+    Favorite,
+    Follow,
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+    SimilarRecipe,
+    Tag,
+)
+from recipes.shopping_list import expected_totals, stored_totals
+from recipes.similarity import rebuild_similar_recipes
+
+IMAGES = ('recipes/images/1.png', 'recipes/images/2.png')
+SHARED_IMAGE = 'recipes/images/shared.png'
+AVATAR = 'users/author.png'
+RESULT = 'jobs/result.ndjson'
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class DeletionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass'
+            )
+            for name in ('author', 'reader')
+        )
+        cls.author.avatar = AVATAR
+        cls.author.save()
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        salt, flour = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'мука')
+        )
+        cls.recipes = []
+        for author, image in (
+            (cls.author, IMAGES[0]), (cls.author, IMAGES[1]),
+            (cls.author, SHARED_IMAGE), (cls.reader, SHARED_IMAGE),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {len(cls.recipes)}',
+                text='Текст', cooking_time=10, image=image
+            )
+            recipe.tags.set([tag])
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=5
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=flour, amount=100
+            )
+            cls.recipes.append(recipe)
+        cls.own = cls.recipes[3]
+        for recipe in cls.recipes:
+            for user in (cls.author, cls.reader):
+                Favorite.objects.create(owner=user, recipe=recipe)
+                ShoppingCart.objects.create(owner=user, recipe=recipe)
+        Follow.objects.create(user=cls.reader, following=cls.author)
+        Follow.objects.create(user=cls.author, following=cls.reader)
+        for user in (cls.author, cls.reader):
+            Token.objects.create(user=user)
+        Job.objects.create(
+            task='export_recipes', owner=cls.author, result_file=RESULT
+        )
+        rebuild_similar_recipes()
+
+    def setUp(self):
+        # Изменения из setUpTestData не коммитятся и в очередь не уходят
+        similarity._pending.recipe_ids = set()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=directory)
+        media.enable()
+        self.addCleanup(media.disable)
+        for name in (*IMAGES, SHARED_IMAGE, AVATAR, RESULT):
+            default_storage.save(name, ContentFile(b'file'))
+
+    def _deleted_names(self):
+        return sorted(
+            name for job in Job.objects.filter(task='delete_media_files')
+            for name in job.kwargs['names']
+        )
+
+    def _run_media_jobs(self):
+        # Пересчёт похожих и выгрузки здесь не нужны
+        Job.objects.exclude(task='delete_media_files').delete()
+        job = claim('test')
+        while job is not None:
+            execute(job)
+            job = claim('test')
+
+    def assertTotalsConsistent(self):
+        owners = list(FoodgramUser.objects.values_list('id', flat=True))
+        self.assertEqual(stored_totals(owners), expected_totals(owners))
+
+    def _counts(self):
+        return {
+            model: model.objects.count()
+            for model in deleted_counts(users=[self.author.id])
+        }
+
+    def test_counts_match_deleted_rows(self):
+        for users, recipes in (
+            ([], [self.recipes[0].id]), ([self.author.id], []),
+        ):
+            before = self._counts()
+            with self.subTest(users=users, recipes=recipes):
+                expected = deleted_counts(users=users, recipes=recipes)
+                with self.captureOnCommitCallbacks(execute=True):
+                    delete_users(users)
+                    delete_recipes(recipes)
+                after = self._counts()
+                # Задачи не только удаляются: добавилось удаление файлов
+                for model, count in expected.items():
+                    if model is not Job:
+                        self.assertEqual(
+                            before[model] - after[model], count, model
+                        )
+
+    def test_delete_recipes(self):
+        deleted = self.recipes[:2]
+        ids = [recipe.id for recipe in deleted]
+        neighbours = set(SimilarRecipe.objects.filter(
+            similar_id__in=ids
+        ).values_list('recipe_id', flat=True)) - set(ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(delete_recipes(ids, batch_size=1), 2)
+        self.assertFalse(Recipe.objects.filter(pk__in=ids).exists())
+        for model in (Favorite, ShoppingCart, RecipeIngredient):
+            self.assertFalse(
+                model.objects.filter(recipe_id__in=ids).exists(), model
+            )
+        self.assertFalse(
+            Recipe.tags.through.objects.filter(recipe_id__in=ids).exists()
+        )
+        self.assertFalse(SimilarRecipe.objects.filter(
+            recipe_id__in=ids
+        ).exists())
+        self.assertFalse(SimilarRecipe.objects.filter(
+            similar_id__in=ids
+        ).exists())
+        self.assertTotalsConsistent()
+        salt, flour = Ingredient.objects.order_by('id')
+        self.assertEqual(
+            stored_totals([self.reader.id])[self.reader.id],
+            {salt.id: 10, flour.id: 200}
+        )
+        # Оставшиеся рецепты, у которых были удалённые, пересчитываются;
+        # рецепт из следующей пачки пересчёт пропустит
+        job = Job.objects.get(task='update_similar_recipes')
+        self.assertEqual(
+            set(job.kwargs['recipe_ids']) - set(ids), neighbours
+        )
+        self.assertEqual(self._deleted_names(), sorted(IMAGES))
+        self._run_media_jobs()
+        for name in IMAGES:
+            self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(SHARED_IMAGE))
+
+    def test_delete_users(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(delete_users([self.author.id]), 1)
+        self.assertFalse(
+            FoodgramUser.objects.filter(pk=self.author.id).exists()
+        )
+        self.assertEqual(list(Recipe.objects.all()), [self.own])
+        for model, field in (
+            (Favorite, 'owner'), (ShoppingCart, 'owner'),
+            (ShoppingListItem, 'owner'), (Follow, 'user'),
+            (Follow, 'following'), (Token, 'user'), (Job, 'owner'),
+        ):
+            self.assertFalse(
+                model.objects.filter(**{field: self.author.id}).exists(),
+                f'{model.__name__}.{field}'
+            )
+        # У читателя остались только его рецепт, токен и нет подписок
+        self.assertEqual(
+            list(Favorite.objects.values_list('owner_id', 'recipe_id')),
+            [(self.reader.id, self.own.id)]
+        )
+        self.assertEqual(
+            list(ShoppingCart.objects.values_list('owner_id', 'recipe_id')),
+            [(self.reader.id, self.own.id)]
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(Token.objects.filter(user=self.reader).exists())
+        self.assertFalse(SimilarRecipe.objects.exclude(
+            recipe=self.own, similar=self.own
+        ).exists())
+        self.assertTotalsConsistent()
+        self.assertEqual(
+            self._deleted_names(),
+            sorted((*IMAGES, SHARED_IMAGE, AVATAR, RESULT))
+        )
+        self._run_media_jobs()
+        for name in (*IMAGES, AVATAR, RESULT):
+            self.assertFalse(default_storage.exists(name), name)
+        # Картинка есть у рецепта читателя
+        self.assertTrue(default_storage.exists(SHARED_IMAGE))
+
+    def test_admin_bulk_delete(self):
+        admin = FoodgramUser.objects.create_superuser(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Админ', last_name='Админов'
+        )
+        self.client.force_login(admin)
+        recipe_ids = [self.recipes[0].id, self.recipes[1].id]
+        data = {'action': 'delete_selected', '_selected_action': recipe_ids}
+        response = self.client.post('/admin/recipes/recipe/', data)
+        self.assertEqual(response.status_code, 200)
+        # Подтверждение с числом строк по моделям
+        summary = dict(response.context['model_count'])
+        self.assertEqual(summary[Recipe._meta.verbose_name_plural], 2)
+        self.assertEqual(summary[Favorite._meta.verbose_name_plural], 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/admin/recipes/recipe/', {**data, 'post': 'yes'}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Recipe.objects.filter(pk__in=recipe_ids).exists())
+        self.assertTotalsConsistent()
+        self.assertEqual(self._deleted_names(), sorted(IMAGES))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/recipes/foodgramuser/', {
+                'action': 'delete_selected',
+                '_selected_action': [self.author.id],
+                'post': 'yes',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(
+            FoodgramUser.objects.filter(pk=self.author.id).exists()
+        )
+        self.assertFalse(Token.objects.filter(user=self.author.id).exists())
+        self.assertIn(AVATAR, self._deleted_names())
@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from recipes.models import FoodgramUser, ImportProgress, Ingredient, Recipe
+
+
+class ImportRecipesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        media = self.settings(
+            MEDIA_ROOT=os.path.join(self.directory, 'media')
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        self.archive = os.path.join(self.directory, 'media.zip')
+        with zipfile.ZipFile(self.archive, 'w') as archive:
+            archive.writestr('recipes/images/soup.png', b'png')
+
+    def _import(self, *records):
+        path = os.path.join(self.directory, 'recipes.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        call_command(
+            'import_recipes', path, media=self.archive, stdout=mock.Mock(),
+            stderr=mock.Mock()
+        )
+
+    def _record(self, **fields):
+        return {
+            'name': 'Суп',
+            'text': 'Текст',
+            'cooking_time': 10,
+            'pub_date': '2024-01-01T00:00:00+00:00',
+            'image': 'recipes/images/soup.png',
+            'author': {
+                'email': 'author@example.com', 'username': 'author',
+                'first_name': 'Анна', 'last_name': 'Иванова',
+            },
+            'tags': [],
+            'ingredients': [
+                {'name': 'соль', 'measurement_unit': 'г', 'amount': 5}
+            ],
+            **fields,
+        }
+
+    def test_import(self):
+        self._import(self._record())
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.author.email, 'author@example.com')
+        self.assertTrue(default_storage.exists(recipe.image.name))
+        self.assertFalse(ImportProgress.objects.exists())
+
+    def test_recipe_without_author(self):
+        with self.assertRaisesMessage(CommandError, "['Без автора']"):
+            self._import(self._record(), self._record(
+                name='Без автора', author=None
+            ))
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_rollback_deletes_saved_images(self):
+        with mock.patch.object(
+            ImportProgress.objects, 'update_or_create',
+            side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self._import(self._record())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(
+            default_storage.exists('recipes/images/soup.png')
+        )
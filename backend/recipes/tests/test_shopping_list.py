@@ -0,0 +1,219 @@
+"""Суммы ShoppingListItem совпадают с пересчётом по корзинам."""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.deletion import delete_recipes, delete_users
+from recipes.models import (
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+    Tag,
+)
+from recipes.shopping_list import expected_totals, stored_totals
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class ShoppingListTotalsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.buyer, cls.other = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass'
+            )
+            for name in ('author', 'buyer', 'other')
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.salt, cls.flour, cls.milk = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('соль', 'г'), ('мука', 'г'), ('молоко', 'мл'))
+        )
+        cls.recipes = []
+        for number, items in enumerate((
+            ((cls.salt, 5), (cls.flour, 200)),
+            ((cls.salt, 3), (cls.milk, 250)),
+            ((cls.flour, 100),),
+        )):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image=f'recipes/images/{number}.png'
+            )
+            recipe.tags.set([cls.tag])
+            for ingredient, amount in items:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def assertTotalsConsistent(self):
+        owner_ids = list(FoodgramUser.objects.values_list('id', flat=True))
+        expected = expected_totals(owner_ids)
+        self.assertEqual(stored_totals(owner_ids), expected)
+        self.assertFalse(ShoppingListItem.objects.filter(amount=0).exists())
+        return expected
+
+    def _fill_carts(self):
+        for owner in (self.buyer, self.other):
+            for recipe in self.recipes:
+                ShoppingCart.objects.create(owner=owner, recipe=recipe)
+
+    def test_single_add_and_remove(self):
+        first, second, _ = self.recipes
+        for recipe in (first, second):
+            response = self.client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertTotalsConsistent()
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.buyer.id][self.salt.id], 8
+        )
+        response = self.client.delete(
+            f'/api/recipes/{first.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.buyer.id],
+            {self.salt.id: 3, self.milk.id: 250}
+        )
+
+    def test_batch_add_and_remove(self):
+        url = '/api/recipes/shopping_cart/batch/'
+        ids = [recipe.id for recipe in self.recipes]
+        self.client.post(url, {'recipes': ids[:1]}, format='json')
+        self.client.post(url, {'recipes': ids}, format='json')
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.buyer.id][self.flour.id], 300
+        )
+        self.client.delete(url, {'recipes': ids[1:]}, format='json')
+        self.assertTotalsConsistent()
+        self.client.delete(url, {'recipes': ids}, format='json')
+        self.assertEqual(self.assertTotalsConsistent(), {})
+
+    def test_ingredient_update_through_api(self):
+        self._fill_carts()
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipes[0].id}/', {
+                'ingredients': [
+                    {'id': self.salt.id, 'amount': 1},
+                    {'id': self.milk.id, 'amount': 100},
+                ],
+                'tags': [self.tag.id],
+                'name': 'Рецепт 0',
+                'text': 'Текст',
+                'cooking_time': 10,
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.other.id],
+            {self.salt.id: 4, self.milk.id: 350, self.flour.id: 100}
+        )
+
+    def test_ingredient_update_through_admin(self):
+        self._fill_carts()
+        admin = FoodgramUser.objects.create_superuser(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Админ', last_name='Админов'
+        )
+        self.client.force_login(admin)
+        recipe = self.recipes[0]
+        items = list(recipe.recipe_ingredients.order_by('id'))
+        prefix = 'recipe_ingredients'
+        data = {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'author': self.author.id,
+            'tags': [self.tag.id],
+            f'{prefix}-TOTAL_FORMS': 3,
+            f'{prefix}-INITIAL_FORMS': 2,
+            f'{prefix}-MIN_NUM_FORMS': 1,
+            f'{prefix}-MAX_NUM_FORMS': 1000,
+            # Соль удаляется, мука меняется, молоко добавляется
+            f'{prefix}-0-id': items[0].id,
+            f'{prefix}-0-recipe': recipe.id,
+            f'{prefix}-0-ingredient': self.salt.id,
+            f'{prefix}-0-amount': 5,
+            f'{prefix}-0-DELETE': 'on',
+            f'{prefix}-1-id': items[1].id,
+            f'{prefix}-1-recipe': recipe.id,
+            f'{prefix}-1-ingredient': self.flour.id,
+            f'{prefix}-1-amount': 50,
+            f'{prefix}-2-recipe': recipe.id,
+            f'{prefix}-2-ingredient': self.milk.id,
+            f'{prefix}-2-amount': 10,
+        }
+        response = self.client.post(
+            f'/admin/recipes/recipe/{recipe.id}/change/', data
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.buyer.id],
+            {self.salt.id: 3, self.flour.id: 150, self.milk.id: 260}
+        )
+        # Отдельная строка продукта рецепта
+        item = RecipeIngredient.objects.get(
+            recipe=recipe, ingredient=self.milk
+        )
+        response = self.client.post(
+            f'/admin/recipes/recipeingredient/{item.id}/change/',
+            {'recipe': self.recipes[2].id, 'ingredient': self.milk.id,
+             'amount': 20}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.buyer.id][self.milk.id], 270
+        )
+
+    def test_recipe_deletion(self):
+        self._fill_carts()
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.recipes[1].id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.assertTotalsConsistent()[self.buyer.id],
+            {self.salt.id: 5, self.flour.id: 300}
+        )
+        delete_recipes([recipe.id for recipe in self.recipes])
+        self.assertEqual(self.assertTotalsConsistent(), {})
+
+    def test_user_deletion(self):
+        self._fill_carts()
+        ShoppingCart.objects.create(owner=self.author, recipe=self.recipes[0])
+        delete_users([self.buyer.id])
+        self.assertIn(self.other.id, self.assertTotalsConsistent())
+        self.assertFalse(
+            ShoppingListItem.objects.filter(owner=self.buyer).exists()
+        )
+        delete_users([self.author.id])
+        self.assertEqual(self.assertTotalsConsistent(), {})
+
+    def test_check_shopping_lists_repair(self):
+        self._fill_carts()
+        stdout = StringIO()
+        call_command('check_shopping_lists', stdout=stdout)
+        self.assertIn('согласованы: 2', stdout.getvalue())
+        ShoppingListItem.objects.filter(owner=self.buyer).update(amount=1)
+        ShoppingListItem.objects.filter(owner=self.other).delete()
+        ShoppingListItem.objects.create(
+            owner=self.author, ingredient=self.salt, amount=7
+        )
+        with self.assertRaisesMessage(CommandError, '3 пользователей'):
+            call_command('check_shopping_lists', stdout=StringIO())
+        call_command('check_shopping_lists', '--repair', stdout=stdout)
+        self.assertIn('Пересобрано списков: 3', stdout.getvalue())
+        self.assertNotIn(self.author.id, self.assertTotalsConsistent())
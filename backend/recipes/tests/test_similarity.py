@@ -0,0 +1,306 @@
+"""Похожие рецепты совпадают с косинусом IDF-векторов, посчитанным в лоб."""
+import math
+from collections import defaultdict
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.worker import claim, execute
+from recipes import similarity
+from recipes.constants import SIMILAR_TAG_WEIGHT
+from recipes.deletion import delete_recipes
+from recipes.models import (
+    FoodgramUser,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    SimilarRecipe,
+    Tag,
+)
+from recipes.similarity import (
+    SimilarityIndex,
+    _frequencies,
+    _pairs,
+    rebuild_similar_recipes,
+    update_similar_recipes,
+)
+
+# Продукты и теги рецептов: у последнего общих признаков нет
+RECIPES = (
+    ('abc', ('t1',)),
+    ('ab', ('t1',)),
+    ('cd', ('t2',)),
+    ('de', ()),
+    ('f', ()),
+    ('ae', ('t2',)),
+)
+
+
+def expected_similar(count):
+    """Косинус по всем парам рецептов: {id: [(id, сходство)]}."""
+    vectors = defaultdict(set)
+    for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        vectors[recipe_id].add(('i', ingredient_id))
+    for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+        'recipe_id', 'tag_id'
+    ):
+        vectors[recipe_id].add(('t', tag_id))
+    total = Recipe.objects.count()
+    frequency = defaultdict(int)
+    for features in vectors.values():
+        for feature in features:
+            frequency[feature] += 1
+    weights = {
+        recipe_id: {
+            feature: (
+                (SIMILAR_TAG_WEIGHT if feature[0] == 't' else 1)
+                * math.log(1 + total / frequency[feature])
+            )
+            for feature in features
+        }
+        for recipe_id, features in vectors.items()
+    }
+
+    def norm(vector):
+        return math.sqrt(sum(weight * weight for weight in vector.values()))
+
+    result = {}
+    for recipe_id in Recipe.objects.values_list('id', flat=True):
+        vector = weights.get(recipe_id, {})
+        scores = []
+        for other, other_vector in weights.items():
+            dot = sum(
+                weight * other_vector[feature]
+                for feature, weight in vector.items()
+                if feature in other_vector
+            )
+            if other != recipe_id and dot:
+                scores.append(
+                    (other, dot / (norm(vector) * norm(other_vector)))
+                )
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        result[recipe_id] = scores[:count]
+    return result
+
+
+def stored_similar():
+    """Сохранённые похожие рецепты: {id: [(id, сходство)]}."""
+    result = defaultdict(list)
+    for recipe_id, other, score in SimilarRecipe.objects.order_by(
+        'recipe_id', '-score', 'similar_id'
+    ).values_list('recipe_id', 'similar_id', 'score'):
+        result[recipe_id].append((other, score))
+    return {
+        recipe_id: result[recipe_id]
+        for recipe_id in Recipe.objects.values_list('id', flat=True)
+    }
+
+
+def run_jobs():
+    job = claim('test')
+    while job is not None:
+        execute(job)
+        job = claim('test')
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class SimilarRecipesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Анна', last_name='Иванова', password='pass'
+        )
+        cls.ingredients = {
+            letter: Ingredient.objects.create(
+                name=f'продукт {letter}', measurement_unit='г'
+            )
+            for letter in 'abcdef'
+        }
+        cls.tags = {
+            slug: Tag.objects.create(name=slug, slug=slug)
+            for slug in ('t1', 't2')
+        }
+        cls.recipes = []
+        for number, (letters, tags) in enumerate(RECIPES):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image=f'recipes/images/{number}.png'
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=cls.ingredients[letter],
+                    amount=1
+                )
+                for letter in letters
+            )
+            recipe.tags.set([cls.tags[slug] for slug in tags])
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        # Изменения из setUpTestData не коммитятся и в очередь не уходят
+        similarity._pending.recipe_ids = set()
+
+    def assertSimilar(self, actual, expected, exact=None):
+        """
+        У рецептов exact (по умолчанию у всех) совпадают порядок и
+        сходство похожих, у остальных — только состав: их сходства
+        посчитаны со старыми весами.
+        """
+        self.assertEqual(actual.keys(), expected.keys())
+        for recipe_id, rows in expected.items():
+            ids = [other for other, _ in actual[recipe_id]]
+            expected_ids = [other for other, _ in rows]
+            if exact is not None and recipe_id not in exact:
+                self.assertCountEqual(ids, expected_ids, recipe_id)
+                continue
+            self.assertEqual(ids, expected_ids, recipe_id)
+            for (_, score), (_, expected_score) in zip(
+                actual[recipe_id], rows
+            ):
+                self.assertAlmostEqual(score, expected_score)
+
+    def test_index_matches_brute_force(self):
+        index = SimilarityIndex(_pairs(), *_frequencies())
+        for count in (1, 2, 10):
+            self.assertSimilar(
+                {
+                    recipe.id: index.neighbours(recipe.id, count)
+                    for recipe in self.recipes
+                },
+                expected_similar(count)
+            )
+        self.assertEqual(index.neighbours(self.recipes[4].id), [])
+
+    def test_common_features_only_add_to_score(self):
+        # Продукт a частый: кандидаты берутся по b, c и t1
+        with mock.patch.multiple(similarity, MIN_COMMON=2, COMMON_SHARE=0):
+            index = SimilarityIndex(_pairs(), *_frequencies())
+        first = self.recipes[0].id
+        neighbours = dict(index.neighbours(first))
+        self.assertNotIn(self.recipes[5].id, neighbours)
+        self.assertAlmostEqual(
+            neighbours[self.recipes[1].id],
+            dict(expected_similar(10)[first])[self.recipes[1].id]
+        )
+
+    def test_build_command(self):
+        output = StringIO()
+        call_command(
+            'build_similar_recipes', batch_size=2, count=2, stdout=output
+        )
+        self.assertIn(
+            f'пересчитаны для {len(self.recipes)} рецептов', output.getvalue()
+        )
+        self.assertSimilar(stored_similar(), expected_similar(2))
+        # Повторный пересчёт заменяет строки, а не добавляет
+        self.assertEqual(rebuild_similar_recipes(count=2), len(self.recipes))
+        self.assertSimilar(stored_similar(), expected_similar(2))
+
+    def test_ingredient_edit(self):
+        rebuild_similar_recipes()
+        isolated = self.recipes[4]
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=isolated, ingredient=self.ingredients['a'], amount=1
+            )
+            RecipeIngredient.objects.create(
+                recipe=isolated, ingredient=self.ingredients['b'], amount=1
+            )
+        job = Job.objects.get(task='update_similar_recipes')
+        self.assertEqual(job.kwargs, {'recipe_ids': [isolated.id]})
+        run_jobs()
+        self.assertFalse(Job.objects.exists())
+        expected = expected_similar(10)
+        # Изменённый рецепт пересчитан точно, у остальных он вставлен
+        # с точным сходством
+        self.assertSimilar(stored_similar(), expected, exact={isolated.id})
+        for recipe_id, rows in stored_similar().items():
+            for other, score in rows:
+                if other == isolated.id:
+                    self.assertAlmostEqual(
+                        score, dict(expected[recipe_id])[other]
+                    )
+        response = APIClient().get(f'/api/recipes/{isolated.id}/similar/')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()],
+            [other for other, _ in expected[isolated.id]]
+        )
+
+    def test_top_n_after_edit(self):
+        rebuild_similar_recipes(count=1)
+        second = self.recipes[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            second.tags.set([self.tags['t2']])
+        update_similar_recipes(
+            Job.objects.get().kwargs['recipe_ids'], count=1
+        )
+        expected = expected_similar(1)
+        self.assertEqual(
+            stored_similar()[second.id], expected[second.id]
+        )
+
+    def test_delete(self):
+        rebuild_similar_recipes(count=2)
+        deleted = self.recipes[1]
+        affected = set(SimilarRecipe.objects.filter(
+            similar=deleted
+        ).values_list('recipe_id', flat=True))
+        self.assertTrue(affected)
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_recipes([deleted.id])
+        job = Job.objects.get(task='update_similar_recipes')
+        self.assertEqual(job.kwargs, {'recipe_ids': sorted(affected)})
+        update_similar_recipes(job.kwargs['recipe_ids'], count=2)
+        stored = stored_similar()
+        self.assertFalse(SimilarRecipe.objects.filter(
+            similar_id=deleted.id
+        ).exists())
+        # Списки, где был удалённый рецепт, снова полные и точные
+        expected = expected_similar(2)
+        self.assertSimilar(stored, expected, exact=affected)
+        # У первого рецепта два соседа с равным сходством: выше старый
+        first = self.recipes[0].id
+        self.assertEqual(expected[first][0][1], expected[first][1][1])
+        response = APIClient().get(f'/api/recipes/{first}/similar/')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()],
+            [other for other, _ in expected[first]]
+        )
+
+    def test_pending_job_merges_changes(self):
+        first, third = self.recipes[0], self.recipes[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=first, ingredient=self.ingredients['f'], amount=1
+            )
+            first.tags.add(self.tags['t2'])
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.filter(recipe=third).delete()
+        job = Job.objects.get(task='update_similar_recipes')
+        self.assertEqual(
+            job.kwargs, {'recipe_ids': sorted([first.id, third.id])}
+        )
+        # Задачу, взятую обработчиком, не дополняют
+        claim('test')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.tags.remove(self.tags['t2'])
+        self.assertEqual(
+            Job.objects.filter(
+                task='update_similar_recipes', status=Job.Status.PENDING
+            ).get().kwargs,
+            {'recipe_ids': [first.id]}
+        )
+
+    def test_nothing_scheduled_without_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.recipes[0].tags.add(self.tags['t2'])
+        self.assertTrue(callbacks)
+        self.assertFalse(Job.objects.exists())
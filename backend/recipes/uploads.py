@@ -0,0 +1,36 @@
+"""
+Имена загружаемых файлов.
+
+Хранилище отдаёт имя удалённого файла следующей загрузке, а Base64Field
+называет все загрузки image.<расширение>, поэтому по такому имени в
+разное время лежат разные файлы. Случайное имя не переиспользуется, и
+файл с ним можно кэшировать навсегда.
+"""
+import posixpath
+import re
+import uuid
+
+from django.utils.deconstruct import deconstructible
+
+# Имя файла, выданное UniqueUploadTo
+UNIQUE_NAME = re.compile(r'[0-9a-f]{32}\.[a-z0-9]+')
+
+
+@deconstructible
+class UniqueUploadTo:
+    """upload_to: каталог directory и случайное имя с расширением файла."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def __call__(self, instance, filename):
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(
+            self.directory, f'{uuid.uuid4().hex}{extension}'
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, UniqueUploadTo)
+            and self.directory == other.directory
+        )
@@ -1,11 +1,14 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import short_redirect
+from .views import async_short_redirect, short_redirect
 
 app_name = 'recipes'
 
 urlpatterns = [
     path(
-        's/<int:recipe_id>/', short_redirect, name='short-link'
+        's/<int:recipe_id>/',
+        async_short_redirect if settings.ASYNC_READ_VIEWS else short_redirect,
+        name='short-link'
     ),
 ]
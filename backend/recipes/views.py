@@ -11,3 +11,12 @@ def short_redirect(request, recipe_id):
     if not Recipe.objects.filter(pk=recipe_id).exists():
         raise Http404(f'Рецепт с id={recipe_id} не найден.')
     return redirect(f'/recipes/{recipe_id}')
+
+
+async def async_short_redirect(request, recipe_id):
+    """
+    Асинхронный обработчик коротких ссылок для запуска под ASGI.
+    """
+    if not await Recipe.objects.filter(pk=recipe_id).aexists():
+        raise Http404(f'Рецепт с id={recipe_id} не найден.')
+    return redirect(f'/recipes/{recipe_id}')